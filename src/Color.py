@@ -0,0 +1,67 @@
+import numpy as np
+from functools import lru_cache
+
+
+# Цвет RGBA, разобранный один раз.
+# Хранит компоненты, прозрачность и таблицу смешивания, поэтому при записи пикселей
+# строка "#RRGGBB[AA]" больше не разбирается, а полупрозрачная заливка смешивается целыми срезами.
+class Color:
+    def __init__(self, r, g, b, a=255):
+        self.r, self.g, self.b, self.a = int(r), int(g), int(b), int(a) # Компоненты 0..255
+        self.rgb = np.array([self.r, self.g, self.b], dtype=np.uint8) # Цвет для непрозрачной записи
+        self.is_opaque = self.a == 255
+        self._blend_table = None
+
+    @staticmethod
+    def parse(value):
+        # Цвет из строки "#RRGGBB" / "#RRGGBBAA", кортежа (r, g, b[, a]) или готового Color
+        if isinstance(value, Color):
+            return value
+        if isinstance(value, str):
+            return Color._parse_hex(value)
+        return Color(*value)
+
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def _parse_hex(hex_color):
+        # Разбор строки выполняется один раз для каждой уникальной строки
+        digits = hex_color.lstrip('#')
+        r, g, b = (int(digits[i:i+2], 16) for i in (0, 2, 4))
+        a = int(digits[6:8], 16) if len(digits) >= 8 else 255 # Байт прозрачности (если задан)
+        return Color(r, g, b, a)
+
+    @property
+    def hex(self):
+        # Строковое представление "#RRGGBB" (с "AA", если цвет полупрозрачный)
+        if self.is_opaque:
+            return '#%02x%02x%02x' % (self.r, self.g, self.b)
+        return '#%02x%02x%02x%02x' % (self.r, self.g, self.b, self.a)
+
+    def with_alpha(self, alpha):
+        # Тот же цвет с другой прозрачностью
+        return Color(self.r, self.g, self.b, alpha)
+
+    def blend_table(self):
+        # Таблица смешивания "цвет поверх фона" для каждого возможного байта фона (256, 3).
+        # Считается в предумноженном виде в uint16: out = (rgb * a + dst * (255 - a) + 127) // 255,
+        # после чего смешивание любого отрезка - это одна выборка из таблицы
+        if self._blend_table is None:
+            premultiplied = self.rgb.astype(np.uint16) * self.a
+            background = np.arange(256, dtype=np.uint16)[:, None] * (255 - self.a)
+            self._blend_table = ((premultiplied[None, :] + background + 127) // 255).astype(np.uint8)
+        return self._blend_table
+
+    def composite(self, destination):
+        # Смешивание цвета с массивом пикселей (..., 3) uint8; возвращает новый массив
+        if self.is_opaque:
+            return np.broadcast_to(self.rgb, destination.shape)
+        return self.blend_table()[destination, np.arange(3)]
+
+    def __eq__(self, other):
+        return isinstance(other, Color) and (self.r, self.g, self.b, self.a) == (other.r, other.g, other.b, other.a)
+
+    def __hash__(self):
+        return hash((self.r, self.g, self.b, self.a))
+
+    def __repr__(self):
+        return f"Color({self.hex})"
@@ -1,58 +1,244 @@
+import math
 import numpy as np
-from Point import Point # Убедитесь, что Point.py находится в той же директории или доступен в PYTHONPATH
+from Point import Point, PointArray # Убедитесь, что Point.py находится в той же директории или доступен в PYTHONPATH
+from Color import Color
+from Render import FrameBuffer
+from Spans import SpanShape
 
 
-# Базовый класс для всех графических фигур
+# Базовый класс для всех графических фигур.
+# Фигура хранит исходную геометрию и накопленную матрицу преобразования (transform): перемещение,
+# поворот и отражение только домножают матрицу, поэтому событие перетаскивания стоит O(1), а вершины
+# округляются один раз от исходных - повторные преобразования не накапливают ошибку округления.
+# Преобразованная геометрия (вершины, центр, габариты) вычисляется при первом обращении (отрисовка,
+# выбор кликом, ТМО) и кэшируется до следующего изменения версии геометрии
 class GraphicObject:
+    _stroke_width = 1 # Толщина контура по умолчанию (Line и BezierCurve задают свою)
+    IDENTITY = np.eye(3) # Начальное преобразование (общее, не изменяется: матрица заменяется, а не дополняется на месте)
+
     def __init__(self, color="#000000", fill_color="#0003AEFF"):
-        self.points = [] # Список вершин/ключевых точек фигуры (декартовы координаты)
+        self.observers = [] # Подписчики на изменения (кадровые буферы, результаты ТМО): получают object_changed(obj)
+        self.version = 0 # Номер версии геометрии: растет при каждом преобразовании (для кэшей, зависящих от фигуры)
+        self._geometry = None # (ключ геометрии, преобразованная геометрия): см. geometry()
+        self._bounds = None # (ключ геометрии, габариты): bounds() считается один раз на версию геометрии
+        self.points = [] # Вершины/ключевые точки фигуры (декартовы координаты, исходные - массив source_xy)
         self.color = color # Цвет контура
         self.fill_color = fill_color # Цвет заливки
         self.id = None
-        self.center = Point(0, 0) # Центр фигуры (вычисляется из points)
-        self.calculate_center() # Вычислить центр при создании
 
-    def draw(self, editor_instance, pixel_buffer=None):
+    @property
+    def points(self):
+        # Вершины в виде последовательности Point (для совместимости); координаты - массив xy (N, 2)
+        return PointArray(self.xy)
+
+    @points.setter
+    def points(self, value):
+        # Новая исходная геометрия (список Point, PointArray или массив (N, 2)); преобразование сбрасывается
+        self.source_xy = PointArray.coordinates(value)
+        self.transform = self.IDENTITY
+        self.touch()
+
+    @property
+    def xy(self):
+        # Преобразованные вершины (N, 2), округленные до целых
+        return self.geometry()[0]
+
+    @property
+    def center(self):
+        # Центр фигуры - среднее арифметическое преобразованных вершин
+        return self.geometry()[1]
+
+    @property
+    def extent(self):
+        # Габариты вершин (x0, y0, x1, y1) без запаса на перо; None - вершин нет
+        return self.geometry()[2]
+
+    @property
+    def stroke_width(self):
+        return self._stroke_width # Толщина контура в пикселях
+
+    @stroke_width.setter
+    def stroke_width(self, value):
+        # Толщина входит в габариты и ключ отрисовки: подписчики перерисовывают прежнюю и новую области
+        self._stroke_width = value
+        self.notify()
+
+    @property
+    def color(self):
+        return self._color # Цвет контура в исходном строковом виде
+
+    @color.setter
+    def color(self, value):
+        # Цвет разбирается один раз при назначении; при отрисовке используется готовый color_rgba
+        self.color_rgba = Color.parse(value)
+        self._color = value if isinstance(value, str) else self.color_rgba.hex
+        self.notify()
+
+    @property
+    def fill_color(self):
+        return self._fill_color # Цвет заливки в исходном строковом виде
+
+    @fill_color.setter
+    def fill_color(self, value):
+        # Байт прозрачности "#RRGGBBAA" учитывается при заливке
+        self.fill_rgba = Color.parse(value)
+        self._fill_color = value if isinstance(value, str) else self.fill_rgba.hex
+        self.notify()
+
+    def draw(self, renderer, pixel_buffer=None):
+        # renderer - ядро отрисовки (FrameBuffer из Render.py) или любой объект с теми же растеризаторами
         raise NotImplementedError # Должен быть переопределен для отрисовки конкретной фигуры
 
+    def coverage(self):
+        # Покрытие объекта в виде серий пикселей (SpanShape)
+        raise NotImplementedError # Поддерживается фигурами с заливкой
+
+    def outline_contours(self):
+        # Контуры фигуры в виде массивов вершин (k, 2) (для векторных ТМО)
+        raise NotImplementedError # Поддерживается многоугольниками
+
+    def detach(self):
+        # Объект удален со сцены: отписка от объектов, на изменения которых он подписан
+        # (переопределяется производными объектами - результатами ТМО)
+        pass
+
+    def touch(self):
+        # Геометрия изменилась: новая версия, сброс кэшей и уведомление подписчиков. Через touch проходит
+        # любое изменение геометрии (преобразование или присваивание points, контуров, формы, контрольных точек).
+        # Вызывается после замены геометрии, чтобы поток отрисовки, получивший уведомление, уже видел новые
+        # точки. В конструкторе подписчиков еще нет, поэтому начальная геометрия никого не уведомляет
+        self.version += 1
+        self._geometry = self._bounds = None
+        self.notify()
+
+    def notify(self):
+        # Уведомление подписчиков об изменении пикселей объекта (геометрии или цвета)
+        for observer in self.observers:
+            observer.object_changed(self)
+
+    def geometry_version(self):
+        # Ключ состояния геометрии; производные объекты (результаты ТМО) включают в него версии операндов
+        return self.version
+
+    def render_key(self):
+        # Все, от чего зависят нарисованные пиксели: геометрия, цвета и толщина
+        return self.geometry_version(), self.color_rgba, self.fill_rgba, self.stroke_width
+
+    def bounds(self):
+        # Габариты нарисованных пикселей (x0, y0, x1, y1) с запасом на перо; правая и нижняя границы
+        # не включаются. None - объекту нечего рисовать. Отрисовка, отсечение, выбор кликом и ТМО
+        # проверяют их до попиксельной работы, поэтому они кэшируются до изменения геометрии или толщины
+        key = self.geometry_version(), self.stroke_width
+        cached = self._bounds
+        if cached is None or cached[0] != key:
+            cached = self._bounds = key, self.compute_bounds()
+        return cached[1]
+
+    def compute_bounds(self):
+        # Габариты по вершинам (переопределяется фигурами, у которых рисуется не только ломаная вершин)
+        return self.extent_bounds(self.extent, self.stroke_width // 2 + 2)
+
+    def hit_box(self, x, y, margin=0):
+        # Быстрый отсев при выборе: точка (x, y) в габаритах, расширенных на margin
+        bounds = self.bounds()
+        return bounds is not None and bounds[0] - margin <= x < bounds[2] + margin and bounds[1] - margin <= y < bounds[3] + margin
+
+    def geometry_signature(self, origin):
+        # Геометрия в координатах относительно origin (байты): одинакова у фигур, отличающихся сдвигом
+        return (self.xy - origin).tobytes()
+
+    def sprite_key(self):
+        # Ключ растра для кэша FrameBuffer.sprites: (габариты тайла, ключ). Ключ составлен из геометрии
+        # относительно угла габаритов, цветов и толщины, поэтому перемещение на четное число пикселей
+        # не меняет ключ и объект выводится прежним тайлом. Четность угла входит в ключ: концы серий
+        # округляются round() к четному, и вершина на полупикселе после нечетного сдвига дает другой растр.
+        # None - кэшировать нечего
+        bounds = self.bounds()
+        if bounds is None:
+            return None
+        x0, y0, x1, y1 = bounds
+        return bounds, (type(self).__name__, x1 - x0, y1 - y0, x0 & 1, y0 & 1, self.geometry_signature((x0, y0)),
+                        self.color_rgba, self.fill_rgba, self.stroke_width)
+
+    @staticmethod
+    def points_bounds(points, margin):
+        # Габариты набора точек, расширенные на margin пикселей
+        if not len(points):
+            return None
+        xy = FrameBuffer.as_xy(points)
+        return GraphicObject.extent_bounds((*xy.min(axis=0), *xy.max(axis=0)), margin)
+
+    @staticmethod
+    def extent_bounds(extent, margin):
+        # Пиксельные габариты по габаритам вершин (x0, y0, x1, y1), расширенные на margin пикселей
+        if extent is None:
+            return None
+        x0, y0, x1, y1 = extent
+        return (math.floor(x0) - margin, math.floor(y0) - margin,
+                math.ceil(x1) + margin + 1, math.ceil(y1) + margin + 1)
+
+    def geometry(self):
+        # Преобразованная геометрия: (xy, центр, габариты вершин, данные фигуры...), см. materialize.
+        # Ключ читается до геометрии: если другой поток преобразует фигуру во время вычисления,
+        # результат запишется под старым ключом и при следующем обращении будет вычислен заново
+        key = self.geometry_version()
+        cached = self._geometry
+        if cached is None or cached[0] != key:
+            cached = self._geometry = key, self.materialize()
+        return cached[1]
+
+    def materialize(self):
+        # Применение накопленной матрицы к исходным вершинам (переопределяется фигурами с другой геометрией)
+        return self.vertex_geometry(self.transform_xy(self.source_xy, self.transform))
+
+    @staticmethod
+    def vertex_geometry(xy):
+        # (xy, центр, габариты) набора вершин: центр - sum(x_i) / N, sum(y_i) / N
+        if not len(xy):
+            return xy, Point(0, 0), None
+        meanX, meanY = xy.mean(axis=0).tolist()
+        x0, y0 = xy.min(axis=0).tolist()
+        x1, y1 = xy.max(axis=0).tolist()
+        return xy, Point(meanX, meanY), (x0, y0, x1, y1)
+
+    @staticmethod
+    def transform_xy(xy, transform_matrix):
+        # Все точки умножаются на матрицу одним матричным произведением: [X', Y', W'] = [x, y, 1] . M,
+        # затем (X'/W', Y'/W') с округлением до целых, как у Point (направления с W' = 0 не делятся)
+        if transform_matrix is GraphicObject.IDENTITY or not len(xy): # Исходные вершины уже округлены
+            return xy
+        transform_matrix = np.asarray(transform_matrix, dtype=float)
+        homogeneous = xy @ transform_matrix[:2] + transform_matrix[2] # Третья координата точки - 1
+        w = homogeneous[:, 2:3]
+        return PointArray.coordinates(homogeneous[:, :2] / np.where(w != 0, w, 1))
+
     def apply_transform(self, transform_matrix):
-        # Применение матрицы преобразования к каждой точке объекта
-        new_points_homogeneous = []
-        for p in self.points:
-            # 1. Точка в однородные: [x, y, 1]
-            hom_coords = p.to_uniform()
-            # 2. Умножение на матрицу преобразования: [X', Y', W'] = [x, y, 1] . M
-            transformed_hom_coords = np.dot(hom_coords, transform_matrix)
-            # 3. Обратно в декартовы: Point(X'/W', Y'/W')
-            new_points_homogeneous.append(Point.from_uniform(transformed_hom_coords))
-        self.points = new_points_homogeneous # Обновить точки фигуры
-        self.calculate_center() # Пересчитать центр
+        # Матрица домножается на накопленную: [x, y, 1] . T . M. Точки пересчитываются лениво (geometry)
+        self.transform = self.transform @ np.asarray(transform_matrix, dtype=float)
+        self.touch()
 
     def calculate_center(self):
-        # Вычисление среднего арифметического координат всех точек объекта
-        if not self.points:
-            self.center = Point(0, 0)
-            return
-
-        # Среднее по X: sum(x_i) / N
-        sum_x = sum(p.x for p in self.points)
-        meanX = sum_x / len(self.points)
-        # Среднее по Y: sum(y_i) / N
-        sum_y = sum(p.y for p in self.points)
-        meanY = sum_y / len(self.points)
-        # print(f'Result:{len(self.points)}') # Отладочный вывод
-        self.center = Point(meanX, meanY) # Установить центр
+        # Центр и габариты вершин вычисляются вместе с геометрией при первом обращении; метод объявляет
+        # геометрию измененной (например, после изменения исходной геометрии на месте)
+        self.touch()
 
 # Класс для рисования линии (отрезка)
 class Line(GraphicObject):
-    def __init__(self, p1, p2, color="#000000"):
+    def __init__(self, p1, p2, color="#000000", stroke_width=1):
         super().__init__(color=color)
         self.points = [p1, p2] # Две конечные точки линии: P1=(x1,y1), P2=(x2,y2)
-        self.calculate_center()
+        self.stroke_width = stroke_width # Толщина линии в пикселях
+
+    def draw(self, renderer, pixel_buffer=None):
+        # Отрисовка линии: тонкая - алгоритмом Брезенхэма, толстая - обводкой (многоугольник + заливка)
+        if self.stroke_width > 1:
+            renderer.stroke_polyline(self.points, self.color_rgba, self.stroke_width, cap="butt", pixel_buffer=pixel_buffer)
+        else:
+            renderer.bresenham_line(self.points[0], self.points[1], self.color_rgba, pixel_buffer=pixel_buffer)
 
-    def draw(self, editor_instance, pixel_buffer=None):
-        # Отрисовка линии: передача начальной и конечной точки для отрисовки
-        editor_instance.bresenham_line(self.points[0], self.points[1], self.color, pixel_buffer=pixel_buffer)
+    def coverage(self):
+        # Пиксели обводки линии той же толщины (для ТМО)
+        return FrameBuffer.stroke_coverage(self.points, self.stroke_width, cap="butt")
 
 # Класс для рисования креста (Kr)
 class Cross(GraphicObject):
@@ -75,11 +261,18 @@ class Cross(GraphicObject):
             Point(center_x - half_size, center_y - quarter_size), # Левая верхняя часть левой перекладины
             Point(center_x - quarter_size, center_y - quarter_size)  # Левый верхний угол центра
         ]
-        self.calculate_center()
 
-    def draw(self, editor_instance, pixel_buffer=None):
+    def draw(self, renderer, pixel_buffer=None):
         # Заливка и отрисовка контура по всем 12 точкам
-        editor_instance.scanline_fill(self.points, self.color, self.fill_color, pixel_buffer=pixel_buffer)
+        renderer.scanline_fill(self.points, self.color_rgba, self.fill_rgba, pixel_buffer=pixel_buffer)
+
+    def coverage(self):
+        # Пиксели заливки с контуром креста (для ТМО)
+        return FrameBuffer.polygon_coverage(self.points)
+
+    def outline_contours(self):
+        # Один контур по вершинам фигуры
+        return [FrameBuffer.as_xy(self.points)]
 
 # Класс для рисования флага (Flag)
 class Flag(GraphicObject):
@@ -93,24 +286,193 @@ class Flag(GraphicObject):
             Point(base_x + width, base_y),         # Нижний правый угол
             Point(base_x + width/2, base_y - height/2) # Точка среза (треугольный "хвост" флага)
         ]
-        self.calculate_center()
 
-    def draw(self, editor_instance, pixel_buffer=None):
+    def draw(self, renderer, pixel_buffer=None):
         # Заливка и отрисовка контура по 5 точкам
-        editor_instance.scanline_fill(self.points, self.color, self.fill_color, pixel_buffer=pixel_buffer)
+        renderer.scanline_fill(self.points, self.color_rgba, self.fill_rgba, pixel_buffer=pixel_buffer)
+
+    def coverage(self):
+        # Пиксели заливки с контуром флага (для ТМО)
+        return FrameBuffer.polygon_coverage(self.points)
+
+    def outline_contours(self):
+        # Один контур по вершинам фигуры
+        return [FrameBuffer.as_xy(self.points)]
+
+# Класс для произвольного многоугольника из нескольких контуров (результат векторных ТМО).
+# Контуры хранятся с дробными координатами, поэтому повторные ТМО и преобразования не накапливают
+# ошибку округления; внутренние контуры заливаются как дыры (правило четности)
+class Polygon(GraphicObject):
+    def __init__(self, contours, color="#000000", fill_color="#FFFFFFFF"):
+        super().__init__(color=color, fill_color=fill_color)
+        self.contours = contours # Контуры: массивы (k, 2)
+        self._shapes = None # (ключ геометрии, пиксели заливки и контура): строятся при первой отрисовке
+
+    @property
+    def contours(self):
+        # Преобразованные контуры (дробные координаты)
+        return self.geometry()[3]
+
+    @contours.setter
+    def contours(self, contours):
+        # Новые исходные контуры; преобразование сбрасывается
+        self.source_contours = [np.asarray(contour, dtype=float).reshape(-1, 2) for contour in contours]
+        self.transform = self.IDENTITY
+        self.touch()
+
+    def materialize(self):
+        # Все вершины всех контуров преобразуются одним умножением: [x, y, 1] . M;
+        # вершины для центра, выбора и выделения - округленные вершины контуров
+        contours = self.source_contours
+        xy = np.concatenate(contours) if contours else np.zeros((0, 2))
+        if self.transform is not self.IDENTITY and len(xy):
+            homogeneous = np.hstack([xy, np.ones((len(xy), 1))]) @ self.transform
+            w = np.where(homogeneous[:, 2:3] != 0, homogeneous[:, 2:3], 1) # Направления (W = 0) не делятся
+            xy = homogeneous[:, :2] / w
+            contours = np.split(xy, np.cumsum([len(contour) for contour in contours])[:-1])
+        return (*self.vertex_geometry(PointArray.coordinates(xy)), contours)
+
+    def shapes(self):
+        # Закэшированные пиксели заливки и контура: повторная отрисовка - только вывод серий
+        key = self.geometry_version()
+        if self._shapes is None or self._shapes[0] != key:
+            contours = self.contours
+            self._shapes = key, (FrameBuffer.fill_shape(contours), FrameBuffer.outline_shape(contours))
+        return self._shapes[1]
+
+    def draw(self, renderer, pixel_buffer=None):
+        # Заливка с дырами и отрисовка всех контуров из кэша серий
+        fill, outline = self.shapes()
+        renderer.blit(fill, self.fill_rgba, pixel_buffer)
+        renderer.blit(outline, self.color_rgba, pixel_buffer)
+
+    def coverage(self):
+        # Пиксели заливки с контурами многоугольника (для ТМО)
+        fill, outline = self.shapes()
+        return fill.union(outline)
+
+    def outline_contours(self):
+        return self.contours
+
+    def geometry_signature(self, origin):
+        # Длины контуров и их вершины относительно origin
+        lengths = np.array([len(contour) for contour in self.contours], dtype=np.int64)
+        xy = np.concatenate(self.contours) - origin if len(lengths) else np.zeros((0, 2))
+        return lengths.tobytes() + xy.tobytes()
+
+    def compute_bounds(self):
+        contours = [contour for contour in self.contours if len(contour)]
+        return self.points_bounds(np.concatenate(contours), 2) if contours else None
+
+# Класс для растрового результата ТМО (если среди операндов есть линии или кривые).
+# Хранит форму из серий пикселей (SpanShape) и выводит ее построчными срезами
+class CoverageShape(GraphicObject):
+    def __init__(self, shape, fill_color="#FFFFFFFF"):
+        super().__init__(color=fill_color, fill_color=fill_color)
+        self.shape = shape # Закрашенные пиксели (SpanShape)
+
+    @property
+    def shape(self):
+        # Преобразованная форма
+        return self.geometry()[3]
+
+    @shape.setter
+    def shape(self, shape):
+        # Новая исходная форма; преобразование сбрасывается
+        self.source_shape = shape
+        self.transform = self.IDENTITY
+        self.touch()
+
+    def materialize(self):
+        # Форма переносится из исходной одним преобразованием накопленной матрицей (целый сдвиг - сдвигом серий),
+        # поэтому повторные повороты не накапливают ошибку выборки. Вершины - углы габаритов формы
+        shape, matrix = self.source_shape, self.transform
+        if matrix is not self.IDENTITY and not shape.is_empty():
+            dx, dy, w = matrix[2].tolist()
+            if np.array_equal(matrix[:2], self.IDENTITY[:2]) and w == 1 and dx.is_integer() and dy.is_integer():
+                shape = shape.translate(int(dx), int(dy))
+            else:
+                shape = self.resample(shape, matrix)
+        box = shape.bbox()
+        if box is None:
+            corners = np.zeros((0, 2))
+        else:
+            x0, y0, x1, y1 = box
+            corners = np.array([(x0, y0), (x1 - 1, y0), (x1 - 1, y1 - 1), (x0, y1 - 1)], dtype=float)
+        return (*self.vertex_geometry(PointArray.coordinates(corners)), shape)
+
+    def contains(self, x, y):
+        # Попадание точки холста в закрашенный пиксель
+        return self.shape.contains(x, y)
+
+    @staticmethod
+    def resample(shape, transform_matrix):
+        # Обратное отображение: каждый пиксель новых габаритов берет значение ближайшего исходного пикселя
+        source_mask, (x0, y0) = shape.to_mask()
+        h, w = source_mask.shape
+        corners = np.array([[x0, y0, 1], [x0 + w - 1, y0, 1], [x0 + w - 1, y0 + h - 1, 1], [x0, y0 + h - 1, 1]]) @ transform_matrix
+        corners = corners[:, :2] / corners[:, 2:3]
+        nx0, ny0 = np.floor(corners.min(axis=0)).astype(int)
+        nx1, ny1 = np.ceil(corners.max(axis=0)).astype(int)
+        ys, xs = np.mgrid[ny0:ny1 + 1, nx0:nx1 + 1]
+        source = np.stack([xs, ys, np.ones_like(xs)], axis=-1) @ np.linalg.inv(transform_matrix)
+        sx = np.rint(source[..., 0] / source[..., 2]).astype(int) - x0
+        sy = np.rint(source[..., 1] / source[..., 2]).astype(int) - y0
+        valid = (sx >= 0) & (sx < w) & (sy >= 0) & (sy < h)
+        mask = np.zeros(xs.shape, dtype=bool)
+        mask[valid] = source_mask[sy[valid], sx[valid]]
+        return SpanShape.from_mask(mask, (int(nx0), int(ny0)))
+
+    def draw(self, renderer, pixel_buffer=None):
+        # Вывод серий закрашенных пикселей
+        renderer.blit(self.shape, self.fill_rgba, pixel_buffer)
+
+    def coverage(self):
+        return self.shape
+
+    def geometry_signature(self, origin):
+        # Серии формы относительно origin
+        shape = self.shape.translate(-origin[0], -origin[1])
+        return shape.ys.tobytes() + shape.x0s.tobytes() + shape.x1s.tobytes()
+
+    def compute_bounds(self):
+        return self.shape.bbox()
 
 # Класс для рисования кривой Безье
 class BezierCurve(GraphicObject):
-    def __init__(self, control_points, color="#000000"):
+    def __init__(self, control_points, color="#000000", stroke_width=1):
         super().__init__(color=color)
-        self.control_points = control_points # Список контрольных точек: C_j=(cx_j, cy_j)
-        self.points = [] # Список вычисленных точек, лежащих на кривой (для отрисовки)
-        self.recalculate_curve_points() # Генерируем точки кривой из контрольных
-        self.calculate_center() # Центр вычисляется по сгенерированным точкам
+        self.control_points = control_points # Контрольные точки: C_j=(cx_j, cy_j) (исходные - массив source_control)
+        self.stroke_width = stroke_width # Толщина кривой в пикселях
+        self.recalculate_curve_points() # Точки кривой (points) строятся из преобразованных контрольных точек
+
+    @property
+    def control_points(self):
+        # Контрольные точки в виде последовательности Point (для совместимости); координаты - массив control_xy
+        return PointArray(self.control_xy)
+
+    @control_points.setter
+    def control_points(self, value):
+        # Новые исходные контрольные точки; преобразование сбрасывается
+        self.source_control = PointArray.coordinates(value)
+        self.transform = self.IDENTITY
+        self.touch()
+
+    @property
+    def control_xy(self):
+        # Преобразованные контрольные точки (N, 2)
+        return self.geometry()[3]
 
     def recalculate_curve_points(self, num_segments=None):
-        # Автоматическое определение плотности точек на кривой
-        if num_segments is None:
+        # Плотность точек на кривой; сами точки вычисляются вместе с геометрией (materialize).
+        # Явно заданное число отрезков сохраняется при смене контрольных точек, None - автоматическая плотность
+        self.segments = num_segments
+        self.touch()
+
+    @property
+    def num_segments(self):
+        # Автоматическое определение плотности точек на кривой (пересчитывается при смене контрольных точек)
+        if self.segments is None:
             # num_segments определяет, на сколько отрезков будет разбита кривая.
             # Чем больше сегментов, тем больше точек будет сгенерировано на кривой,
             # и тем более гладкой она будет выглядеть.
@@ -138,51 +500,51 @@ class BezierCurve(GraphicObject):
             #   и больше точек для отрисовки, что может снизить производительность для очень сложных кривых
             #   или большого количества кривых.
             #
-            num_segments = 50 + 10 * len(self.control_points)
+            return 50 + 10 * len(self.source_control)
+        return self.segments
 
-        self.points = []
-        for i in range(num_segments + 1):
-            t = i / num_segments # Параметр t от 0 до 1
-            self.points.append(self._de_casteljau(t)) # Вычислить точку на кривой для текущего t
+    def materialize(self):
+        # Контрольные точки - исходные, умноженные на накопленную матрицу; по ним строятся точки кривой
+        control_xy = self.transform_xy(self.source_control, self.transform)
+        t = np.arange(self.num_segments + 1) / self.num_segments # Параметр t от 0 до 1
+        return (*self.vertex_geometry(PointArray.coordinates(self._de_casteljau(control_xy, t))), control_xy) # Точки кривой сразу для всех t
 
-    def _de_casteljau(self, t):
+    @staticmethod
+    def _de_casteljau(control_xy, t):
         # Алгоритм Де Кастельжо: итеративная линейная интерполяция
         # P(t) = sum( Binomial(N-1, i) * (1-t)^(N-1-i) * t^i * C_i )
         # Где N - число контрольных точек, C_i - i-я контрольная точка.
-        points = list(self.control_points) # Создать копию для избежания изменения оригинала
-
-        while len(points) > 1: # Пока не останется одна точка
-            new_points = []
-            for i in range(len(points) - 1):
-                # Линейная интерполяция между соседними точками: (1-t)*P_i + t*P_{i+1}
-                x = (1 - t) * points[i].x + t * points[i+1].x
-                y = (1 - t) * points[i].y + t * points[i+1].y
-                new_points.append(Point(x, y))
-            points = new_points # Обновить список точек для следующей итерации
-        return points[0] # Остается одна точка - это точка на кривой Безье для данного t
+        # t - массив параметров: каждый уровень интерполяции выполняется для всех t и всех пар точек
+        # одной операцией. Промежуточные точки округляются до целых, как при построении через Point
+        t = np.asarray(t, dtype=float)[:, None, None]
+        points = control_xy[None, :, :] # (1, N, 2), по всем t одинаково
+
+        while points.shape[1] > 1: # Пока не останется одна точка
+            # Линейная интерполяция между соседними точками: (1-t)*P_i + t*P_{i+1}
+            points = np.rint((1 - t) * points[:, :-1] + t * points[:, 1:])
+        return points[:, 0] # Остается одна точка для каждого t - это точки кривой Безье (len(t), 2)
+
+    def compute_bounds(self):
+        # Кривая вместе с маркерами контрольных точек (перо ширины 3) и сглаживанием
+        return self.points_bounds(np.vstack([self.xy, self.control_xy]), max(self.stroke_width // 2, 2) + 2)
+
+    def geometry_signature(self, origin):
+        # Точки кривой и контрольные точки (их маркеры тоже рисуются)
+        return (np.vstack([self.xy, self.control_xy]) - origin).tobytes()
+
+    def coverage(self):
+        # Пиксели обводки кривой (ломаной по точкам кривой) той же толщины (для ТМО)
+        return FrameBuffer.stroke_coverage(self.points, self.stroke_width)
+
+    def draw(self, renderer, pixel_buffer=None):
+        if self.stroke_width > 1:
+            # Толстая кривая - обводка ломаной с круглыми стыками и концами
+            renderer.stroke_polyline(self.points, self.color_rgba, self.stroke_width, pixel_buffer=pixel_buffer)
+        else:
+            # Отрисовка кривой как сглаженной ломаной по всем точкам кривой за один проход
+            renderer.wu_polyline(self.points, self.color_rgba, pixel_buffer)
 
-    def apply_transform(self, transform_matrix):
-        # Преобразование применяем к КОНТРОЛЬНЫМ точкам
-        new_control_points_homogeneous = []
-        for p in self.control_points:
-            # Преобразование контрольной точки в однородные: [x, y, 1]
-            hom_coords = p.to_uniform()
-            # Умножение на матрицу: [X', Y', W'] = [x, y, 1] . M
-            transformed_hom_coords = np.dot(hom_coords, transform_matrix)
-            # Обратно в декартовы: Point(X'/W', Y'/W')
-            new_control_points_homogeneous.append(Point.from_uniform(transformed_hom_coords))
-        self.control_points = new_control_points_homogeneous # Обновить контрольные точки
-        self.recalculate_curve_points() # Пересчитать точки кривой после изменения контрольных
-        self.calculate_center() # Пересчитать центр кривой
-
-    def draw(self, editor_instance, pixel_buffer=None):
-        if len(self.points) > 1:
-            # Отрисовка кривой как последовательности отрезков (используя точки кривой)
-            for i in range(len(self.points) - 1):
-                editor_instance.wu_line(self.points[i], self.points[i+1], 
-                                        self.color, pixel_buffer)
-        
         # Отрисовка контрольных точек (визуальная помощь, только на основном холсте)
         if pixel_buffer is None:
-            for cp in self.control_points:
-                editor_instance.put_pixel(cp.x, cp.y, "#0000FF", width=3)
\ No newline at end of file
+            for x, y in self.control_xy.tolist():
+                renderer.put_pixel(x, y, "#0000FF", width=3)
\ No newline at end of file
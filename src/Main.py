@@ -2,11 +2,16 @@ import tkinter as tk
 from tkinter import colorchooser, simpledialog, messagebox
 import numpy as np
 import math
-from PIL import Image, ImageTk
 from Point import Point
-from GraphicObject import GraphicObject,Cross,Flag,Line,BezierCurve
+from GraphicObject import GraphicObject,Cross,Flag,Polygon,CoverageShape,Line,BezierCurve
 from Transformations import Transformations
-from TMO import SetOperations
+from TMO import SetOperations, SetOperationResult
+from Render import FrameBuffer
+from Color import Color
+from Scheduler import FrameScheduler
+from Worker import RenderWorker
+from Viewport import Viewport
+from Spatial import SpatialIndex
 
 
 
@@ -19,6 +24,7 @@ class GraphicEditor:
         self.current_color = "#000000" # Текущий цвет обводки (по умолчанию черный)
         self.current_fill_color = "#0003AEFF" 
         self.objects = [] # Список всех графических объектов на холсте
+        self.spatial_index = SpatialIndex() # Сетка габаритов объектов для выбора кликом
         self.selected_object = None # Выбранный в данный момент объект
         self.drawing_primitive = None # Текущий режим рисования (например, "line", "cross")
         self.temp_points = [] # Временные точки для интерактивного рисования
@@ -28,15 +34,26 @@ class GraphicEditor:
 
         self.canvas_width = 1400 # Ширина холста
         self.canvas_height = 600 # Высота холста
+        self.document_width = 20000 # Ширина документа: холст показывает его часть
+        self.document_height = 20000 # Высота документа
+        # Окно просмотра: какая часть документа и в каком масштабе показана на холсте
+        self.viewport = Viewport(self.canvas_width, self.canvas_height, self.document_width, self.document_height)
+        self.pan_start = None # Начало сдвига вида средней кнопкой: (курсор x, y, угол окна x, y)
         # Создание холста Tkinter для рисования
         self.canvas = tk.Canvas(master, width=self.canvas_width, height=self.canvas_height, bg="white", borderwidth=2, relief="groove")
         self.canvas.pack(side=tk.TOP, fill=tk.BOTH, expand=True)
 
-        # Инициализация массива пикселей для ручной отрисовки (по умолчанию белый фон)
-        self.pixels = np.full((self.canvas_height, self.canvas_width, 3), 255, dtype=np.uint8)
-        # Создание объекта PhotoImage из массива пикселей для отображения на холсте
-        self.photo_image = ImageTk.PhotoImage(Image.fromarray(self.pixels))
+        # Передний кадровый буфер (по умолчанию белый фон): показывается на экране, поверх сцены в нем рисуются
+        # выделения. Сцену растеризует поток отрисовки в своем заднем буфере и присылает готовые области
+        self.framebuffer = FrameBuffer(self.canvas_width, self.canvas_height)
+        # Задний буфер покрывает весь документ тайлами, память выделяется только под занятые области
+        self.render_worker = RenderWorker(self.canvas_width, self.canvas_height, self.document_width, self.document_height)
+        self.render_poll_id = None # id ожидающего приема результатов потока отрисовки (after)
+        self.render_poll_interval = 4 # Интервал опроса потока отрисовки, мс
+        # Одна PhotoImage на все время работы: кадры обновляют в ней только измененные области
+        self.photo_image = tk.PhotoImage(width=self.canvas_width, height=self.canvas_height)
         self.image_item = self.canvas.create_image(0, 0, anchor=tk.NW, image=self.photo_image) # Размещение изображения на холсте
+        self.frame_bytes = 0 # Сколько байт пикселей передано в Tk последним кадром
 
 
         self.create_menu() # Вызов метода для создания меню
@@ -47,9 +64,47 @@ class GraphicEditor:
         self.canvas.bind("<Button-3>", self.on_canvas_right_click) # Правая кнопка мыши
         self.canvas.bind("<B1-Motion>", self.on_canvas_drag)
         self.canvas.bind("<ButtonRelease-1>", self.on_canvas_release)
+        # Сдвиг вида средней кнопкой мыши, масштаб - колесом (X11 присылает колесо как кнопки 4 и 5)
+        self.canvas.bind("<Button-2>", self.on_pan_start)
+        self.canvas.bind("<B2-Motion>", self.on_pan)
+        self.canvas.bind("<MouseWheel>", self.on_mouse_wheel)
+        self.canvas.bind("<Button-4>", self.on_mouse_wheel)
+        self.canvas.bind("<Button-5>", self.on_mouse_wheel)
         self.dragging_object = False # Флаг, указывающий, происходит ли перетаскивание объекта
-
-        self.tmo_selected_objects = [] # Список для хранения двух выбранных объектов для ТМО
+        self.drag_pointer = (0, 0) # Последнее положение курсора при перетаскивании
+        self.bezier_preview = None # Положение курсора - временная контрольная точка при задании кривой Безье
+        # Кадры перетаскивания: события движения сливаются, отрисовка - не чаще одного раза за 16 мс
+        self.frame_scheduler = FrameScheduler(self.canvas, self.draw_drag_frame, frame_budget=16)
+
+        self.tmo_selected_objects = [] # Список выбранных объектов для ТМО (любое количество)
+        self.overlay_rects = [] # Области, где нарисованы выделения и временные фигуры (стираются при следующей перерисовке)
+        self.update_canvas_image() # Первый кадр - весь буфер
+
+    def mark_overlay(self, rect, margin=8):
+        # Запомнить область временной отрисовки поверх объектов (выделение, предпросмотр): габариты
+        # в координатах документа переводятся в координаты холста и расширяются на margin пикселей
+        if rect is not None:
+            x0, y0 = self.viewport.to_screen(rect[0], rect[1])
+            x1, y1 = self.viewport.to_screen(rect[2], rect[3])
+            self.overlay_rects.append((math.floor(x0) - margin, math.floor(y0) - margin,
+                                       math.ceil(x1) + margin, math.ceil(y1) + margin))
+
+    def drag_margin(self):
+        # Запас кадра перетаскивания на выделение: 8 пикселей холста в пикселях документа
+        return int(math.ceil(8 / min(self.viewport.zoom, 1)))
+
+    def document_point(self, event):
+        # Точка документа (целые пиксели) под курсором события мыши
+        x, y = self.viewport.to_document(event.x, event.y)
+        return int(math.floor(x)), int(math.floor(y))
+
+    def screen_points(self, points):
+        # Вершины объекта в координатах холста (для выделений и временных фигур поверх кадра)
+        return self.viewport.screen_points(points)
+
+    def screen_width(self, width):
+        # Толщина пера документа на холсте
+        return max(1, int(round(width * self.viewport.zoom)))
 
     def create_menu(self):
         # Создание главного меню приложения
@@ -79,7 +134,8 @@ class GraphicEditor:
         # Меню "ТМО" (Теоретико-множественные операции)
         tmo_menu = tk.Menu(menubar, tearoff=0)
         menubar.add_cascade(label="ТМО", menu=tmo_menu)
-        tmo_menu.add_command(label="Выбрать объекты для ТМО", command=self.select_tmo_objects_mode) # Выбор двух объектов для ТМО
+        tmo_menu.add_command(label="Выбрать объекты для ТМО", command=self.select_tmo_objects_mode) # Выбор объектов для ТМО
+        tmo_menu.add_command(label="Выбрать все объекты для ТМО", command=self.select_all_tmo_objects) # Все объекты сцены - операнды ТМО
         tmo_menu.add_command(label="Пересечение (A ∩ B)", command=self.perform_intersection) # Выполнить операцию пересечения
         tmo_menu.add_command(label="Разность (A \ B)", command=self.perform_difference) # Выполнить операцию разности
         tmo_menu.add_command(label="Объединение (A ∪ B)", command=self.perform_union) # Выполнить операцию объединения
@@ -98,6 +154,15 @@ class GraphicEditor:
         menubar.add_cascade(label="Цвет", menu=color_menu)
         color_menu.add_command(label="Цвет обводки", command=self.choose_outline_color) # Выбрать цвет обводки
         color_menu.add_command(label="Цвет заливки", command=self.choose_fill_color) # Выбрать цвет заливки
+        color_menu.add_command(label="Непрозрачность заливки", command=self.choose_fill_opacity) # Задать прозрачность заливки
+
+        # Меню "Вид"
+        view_menu = tk.Menu(menubar, tearoff=0)
+        menubar.add_cascade(label="Вид", menu=view_menu)
+        view_menu.add_command(label="Увеличить", command=lambda: self.zoom_view(2)) # Масштаб вдвое крупнее
+        view_menu.add_command(label="Уменьшить", command=lambda: self.zoom_view(0.5)) # Масштаб вдвое мельче
+        view_menu.add_command(label="Масштаб 1:1", command=self.reset_view) # Исходный масштаб
+        view_menu.add_command(label="Весь документ", command=self.fit_view) # Документ целиком в окне
 
         # Меню "Помощь"
         help_menu = tk.Menu(menubar, tearoff=0)
@@ -125,11 +190,6 @@ class GraphicEditor:
         tk.Button(toolbar, text="Цвет заливки", command=self.choose_fill_color).pack(side=tk.LEFT, padx=2, pady=2)
         tk.Button(toolbar, text="ТМО", command=self.select_tmo_objects_mode).pack(side=tk.LEFT, padx=2, pady=2)
 
-    def hex_to_rgb(self, hex_color):
-        # Преобразование шестнадцатеричного строкового представления цвета в кортеж RGB
-        hex_color = hex_color.lstrip('#') # Удаление символа '#'
-        return tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4)) # Разбор строки на компоненты R, G, B и преобразование в целые числа
-
     def choose_outline_color(self):
         # Открытие диалога выбора цвета для обводки
         color_info = colorchooser.askcolor(title="Выбрать цвет обводки")
@@ -143,11 +203,25 @@ class GraphicEditor:
         # Открытие диалога выбора цвета для заливки
         color_info = colorchooser.askcolor(title="Выбрать цвет заливки")
         if color_info[1]: # Если цвет был выбран
-            self.current_fill_color = color_info[1] # Обновление текущего цвета заливки
+            # Обновление текущего цвета заливки (диалог не знает о прозрачности - она сохраняется)
+            alpha = Color.parse(self.current_fill_color).a
+            self.current_fill_color = Color.parse(color_info[1]).with_alpha(alpha).hex
             if self.selected_object and hasattr(self.selected_object, 'fill_color'): # Если есть выбранный объект и он поддерживает заливку
                 self.selected_object.fill_color = self.current_fill_color # Обновление цвета заливки выбранного объекта
                 self.redraw_all_objects() # Перерисовка всех объектов
 
+    def choose_fill_opacity(self):
+        # Запрос непрозрачности заливки в процентах (100 - непрозрачная, 0 - полностью прозрачная)
+        current = round(Color.parse(self.current_fill_color).a * 100 / 255)
+        opacity = simpledialog.askinteger("Непрозрачность заливки", "Введите непрозрачность заливки (0-100 %):",
+                                          initialvalue=current, minvalue=0, maxvalue=100)
+        if opacity is not None:
+            alpha = round(opacity * 255 / 100)
+            self.current_fill_color = Color.parse(self.current_fill_color).with_alpha(alpha).hex
+            if self.selected_object and hasattr(self.selected_object, 'fill_color'):
+                self.selected_object.fill_color = self.current_fill_color
+                self.redraw_all_objects()
+
     def show_about(self):
         # Отображение информационного окна "О программе"
         messagebox.showinfo("О программе", "Графический редактор. Вариант 70.\nРазработано в рамках курсовой работы по дисциплине \"Графические системы компьютеров\".")
@@ -156,6 +230,7 @@ class GraphicEditor:
         # Переключение редактора в режим рисования определенного примитива
         self.drawing_primitive = primitive_type # Установка типа примитива для рисования
         self.temp_points = [] # Сброс временных точек
+        self.bezier_preview = None
         self.selected_object = None # Снятие выделения с текущего объекта
         self.tmo_selected_objects = [] # Сброс выбранных объектов для ТМО
         self.canvas.config(cursor="cross") # Изменение курсора на "крестик"
@@ -180,17 +255,31 @@ class GraphicEditor:
     def clear_all_objects(self):
         # Очистка всех объектов на холсте
         if messagebox.askyesno("Очистить всё", "Вы уверены, что хотите удалить все объекты с холста?"):
+            for obj in self.objects: # Результаты ТМО отписываются от операндов
+                obj.detach()
             self.objects = [] # Очистка списка объектов
+            self.spatial_index.clear()
             self.selected_object = None # Сброс выбранного объекта
             self.tmo_selected_objects = [] # Сброс выбранных объектов для ТМО
             self.clear_transform_marker()
             self.clear_temp_line()
             self.redraw_all_objects() # Перерисовка (очистка)
 
+    def add_object(self, obj):
+        # Добавление объекта поверх сцены (и в индекс выбора)
+        self.objects.append(obj)
+        self.spatial_index.add(obj)
+
+    def remove_object(self, obj):
+        # Удаление объекта со сцены (и из индекса выбора и подписок на операнды)
+        self.objects.remove(obj)
+        self.spatial_index.remove(obj)
+        obj.detach() # Результат ТМО отписывается от операндов
+
     def delete_selected_object(self):
         # Удаление выбранного объекта с холста
         if self.selected_object: # Если есть выбранный объект
-            self.objects.remove(self.selected_object) # Удаление объекта из списка
+            self.remove_object(self.selected_object) # Удаление объекта из списка
             self.selected_object = None # Сброс выбранного объекта
             self.clear_transform_marker() # Удаление маркера трансформации
             self.tmo_selected_objects = [] # Сброс выбранных объектов для ТМО, если они были удалены
@@ -198,26 +287,24 @@ class GraphicEditor:
 
     def on_canvas_click(self, event):
         # Обработчик события клика левой кнопкой мыши по холсту
+        x, y = self.document_point(event) # Объекты задаются в координатах документа
         if self.drawing_primitive: # Если активен режим рисования примитива
             if self.drawing_primitive == "bezier":
                 # Для кривой Безье добавляем контрольные точки
                 if len(self.temp_points) < 20: # Ограничение до 20 точек
-                    self.temp_points.append(Point(event.x, event.y))
-                    self.redraw_all_objects() # Перерисовать для отображения временных маркеров
-                    if len(self.temp_points) >= 2: # Временная кривая при 2+ точках
-                        temp_bezier = BezierCurve(self.temp_points, "#AAAAAA")
-                        temp_bezier.draw(self)
-                        self.update_canvas_image()
+                    self.temp_points.append(Point(x, y))
+                    self.bezier_preview = None
+                    self.redraw_all_objects() # Временная кривая рисуется поверх кадра (draw_overlays)
                 else:
                     messagebox.showwarning("Кривая Безье", "Достигнуто максимальное количество контрольных точек (20).")
                     # Автоматическое завершение, если достигнуто 20 точек
                     self.on_canvas_right_click(event) # Имитируем правый клик для завершения
             else: # Для других примитивов (линия, крест, флаг)
-                self.temp_points.append(Point(event.x, event.y)) # Добавление текущей точки клика во временный список
+                self.temp_points.append(Point(x, y)) # Добавление текущей точки клика во временный список
                 if self.drawing_primitive == "line":
                     if len(self.temp_points) == 2: # Если собрано две точки для линии
                         line = Line(self.temp_points[0], self.temp_points[1], self.current_color) # Создание объекта Line
-                        self.objects.append(line) # Добавление линии в список объектов
+                        self.add_object(line) # Добавление линии в список объектов
                         self.drawing_primitive = None # Сброс режима рисования
                         self.canvas.config(cursor="arrow") # Изменение курсора на "стрелку"
                         self.selected_object = line # Выбор только что созданной линии
@@ -225,9 +312,9 @@ class GraphicEditor:
                 elif self.drawing_primitive == "cross":
                     if len(self.temp_points) == 2: # Если собраны две точки для креста (центр и точка для определения размера)
                         center_x, center_y = self.temp_points[0].x, self.temp_points[0].y # Первая точка - центр
-                        size = math.sqrt((event.x - center_x)**2 + (event.y - center_y)**2) * 2 # Размер определяется расстоянием до второй точки
+                        size = math.sqrt((x - center_x)**2 + (y - center_y)**2) * 2 # Размер определяется расстоянием до второй точки
                         cross = Cross(center_x, center_y, size, self.current_color, self.current_fill_color) # Создание объекта Cross
-                        self.objects.append(cross) # Добавление креста в список объектов
+                        self.add_object(cross) # Добавление креста в список объектов
                         self.drawing_primitive = None # Сброс режима рисования
                         self.canvas.config(cursor="arrow") # Изменение курсора
                         self.selected_object = cross # Выбор только что созданного креста
@@ -239,7 +326,7 @@ class GraphicEditor:
                         width = abs(x2 - x1) # Ширина флага
                         height = abs(y2 - y1) # Высота флага
                         flag = Flag(min(x1, x2), max(y1, y2), width, height, self.current_color, self.current_fill_color) # Создание объекта Flag
-                        self.objects.append(flag) # Добавление флага в список объектов
+                        self.add_object(flag) # Добавление флага в список объектов
                         self.drawing_primitive = None # Сброс режима рисования
                         self.canvas.config(cursor="arrow") # Изменение курсора
                         self.selected_object = flag # Выбор только что созданного флага
@@ -247,7 +334,7 @@ class GraphicEditor:
 
         elif self.current_transformation_mode == "rotation_around_point":
             # Установка центра вращения и запрос угла поворота
-            self.transform_center = Point(event.x, event.y) # Центр поворота - точка клика
+            self.transform_center = Point(x, y) # Центр поворота - точка клика
             self.draw_transform_marker_on_canvas(self.transform_center.x, self.transform_center.y, "#FF0000") # Отрисовка маркера центра
             
             if self.selected_object: # Если объект выбран, запрашиваем угол
@@ -260,7 +347,7 @@ class GraphicEditor:
             self.canvas.config(cursor="arrow") # Изменение курсора
         elif self.current_transformation_mode == "mirror_vertical_line":
             # Установка линии отражения для зеркального отображения по вертикали
-            self.mirror_line_x = event.x # X-координата вертикальной линии
+            self.mirror_line_x = x # X-координата вертикальной линии
             self.draw_temp_vertical_line(self.mirror_line_x) # Отрисовка временной вертикальной линии
 
             if self.selected_object: # Если объект выбран
@@ -271,119 +358,40 @@ class GraphicEditor:
             self.canvas.config(cursor="arrow") # Изменение курсора
         elif self.current_transformation_mode == "translation" and self.selected_object:
             # Начало перетаскивания объекта для перемещения
-            self.start_drag_x = event.x # Запоминание начальной X-координаты
-            self.start_drag_y = event.y # Запоминание начальной Y-координаты
+            self.start_drag_x = x # Запоминание начальной X-координаты
+            self.start_drag_y = y # Запоминание начальной Y-координаты
             self.dragging_object = True # Установка флага перетаскивания
+            self.begin_drag() # Остальные объекты сохраняются в фоновый слой
         elif self.current_transformation_mode == "select_tmo_objects":
             # В режиме выбора объектов для ТМО
-            clicked_obj = self.get_object_at_click(event.x, event.y)
+            clicked_obj = self.get_object_at_click(x, y)
             if clicked_obj:
                 if clicked_obj not in self.tmo_selected_objects:
+                    # Объекты добавляются по одному; операция выполняется над всеми выбранными
                     self.tmo_selected_objects.append(clicked_obj)
                     self.selected_object = clicked_obj # Выделяем последний выбранный для визуализации
                     self.redraw_all_objects()
-                    if len(self.tmo_selected_objects) == 2:
-                        messagebox.showinfo("ТМО", "Два объекта выбраны. Теперь выберите операцию ТМО (Пересечение, Разность, Объединение).")
-                        self.current_transformation_mode = None # Выходим из режима выбора для ТМО
-                        self.canvas.config(cursor="arrow")
-                    else:
-                        messagebox.showinfo("ТМО", "Выберите второй объект для операции ТМО.")
                 else:
                     messagebox.showwarning("ТМО", "Этот объект уже выбран. Выберите другой.")
             else:
                 messagebox.showwarning("ТМО", "Кликните по существующему объекту для выбора.")
         else:
             # Режим выбора объекта: попытка выбрать объект по клику
-            self.select_object_at_click(event.x, event.y)
-
-    def wu_line(self, p0, p1, color, pixel_buffer=None):
-        """Алгоритм Ву для сглаженных линий"""
-        x0, y0 = p0.x, p0.y
-        x1, y1 = p1.x, p1.y
-        
-        def plot(x, y, brightness):
-            """Вспомогательная функция для отрисовки пикселя с прозрачностью"""
-            r, g, b = self.hex_to_rgb(color)
-            if 0 <= y < self.canvas_height and 0 <= x < self.canvas_width:
-                if pixel_buffer is not None:
-                    buffer = pixel_buffer
-                else:
-                    buffer = self.pixels
-                
-                # Смешивание цветов с учетом прозрачности
-                new_r = int(buffer[y, x][0] * (1 - brightness) + r * brightness)
-                new_g = int(buffer[y, x][1] * (1 - brightness) + g * brightness)
-                new_b = int(buffer[y, x][2] * (1 - brightness) + b * brightness)
-                
-                buffer[y, x] = [new_r, new_g, new_b]
-
-        # Определяем, является ли линия более вертикальной или горизонтальной
-        steep = abs(y1 - y0) > abs(x1 - x0)
-        
-        if steep:
-            x0, y0 = y0, x0
-            x1, y1 = y1, x1
-        
-        if x0 > x1:
-            x0, x1 = x1, x0
-            y0, y1 = y1, y0
-        
-        dx = x1 - x0
-        dy = y1 - y0
-        gradient = dy / dx if dx != 0 else 1
-        
-        # Первая конечная точка
-        xend = round(x0)
-        yend = y0 + gradient * (xend - x0)
-        xgap = 1 - (x0 + 0.5) % 1
-        xpxl1 = xend
-        ypxl1 = int(yend)
-        
-        if steep:
-            plot(ypxl1, xpxl1, (1 - (yend % 1)) * xgap)
-            plot(ypxl1 + 1, xpxl1, (yend % 1) * xgap)
-        else:
-            plot(xpxl1, ypxl1, (1 - (yend % 1)) * xgap)
-            plot(xpxl1, ypxl1 + 1, (yend % 1) * xgap)
-        
-        intery = yend + gradient
-        
-        # Вторая конечная точка
-        xend = round(x1)
-        yend = y1 + gradient * (xend - x1)
-        xgap = (x1 + 0.5) % 1
-        xpxl2 = xend
-        ypxl2 = int(yend)
-        
-        if steep:
-            plot(ypxl2, xpxl2, (1 - (yend % 1)) * xgap)
-            plot(ypxl2 + 1, xpxl2, (yend % 1) * xgap)
-        else:
-            plot(xpxl2, ypxl2, (1 - (yend % 1)) * xgap)
-            plot(xpxl2, ypxl2 + 1, (yend % 1) * xgap)
-        
-        # Основной цикл
-        for x in range(xpxl1 + 1, xpxl2):
-            if steep:
-                plot(int(intery), x, 1 - (intery % 1))
-                plot(int(intery) + 1, x, intery % 1)
-            else:
-                plot(x, int(intery), 1 - (intery % 1))
-                plot(x, int(intery) + 1, intery % 1)
-            intery += gradient
+            self.select_object_at_click(x, y)
 
     def on_canvas_right_click(self, event):
         # Обработчик события клика правой кнопкой мыши
         if self.drawing_primitive == "bezier":
             if len(self.temp_points) >= 2: # Необходимо минимум 2 контрольные точки для кривой
                 bezier_curve = BezierCurve(self.temp_points, self.current_color)
-                self.objects.append(bezier_curve)
+                self.add_object(bezier_curve)
                 self.selected_object = bezier_curve
             else:
                 messagebox.showwarning("Кривая Безье", "Недостаточно контрольных точек для построения кривой Безье (минимум 2).")
             
             self.drawing_primitive = None # Сброс режима рисования
             self.temp_points = [] # Очистка временных точек
+            self.bezier_preview = None
             self.canvas.config(cursor="arrow") # Изменение курсора
             self.redraw_all_objects() # Перерисовка
         else:
@@ -400,59 +408,134 @@ class GraphicEditor:
 
 
     def on_canvas_drag(self, event):
-        # Обработчик события перетаскивания мыши
+        # Обработчик события перетаскивания мыши: запоминается только последнее положение курсора,
+        # а отрисовка выполняется планировщиком не чаще одного раза за кадр (draw_drag_frame)
+        self.drag_pointer = self.document_point(event)
+        self.frame_scheduler.request()
+
+    def draw_drag_frame(self):
+        # Кадр перетаскивания по последнему положению курсора (события между кадрами слиты в одно)
+        x, y = self.drag_pointer
         if self.dragging_object and self.selected_object and self.current_transformation_mode == "translation":
             # Если объект перетаскивается в режиме перемещения
-            dx = event.x - self.start_drag_x # Вычисление смещения по X
-            dy = event.y - self.start_drag_y # Вычисление смещения по Y
+            dx = x - self.start_drag_x # Смещение от положения, примененного в прошлом кадре
+            dy = y - self.start_drag_y
             Transformations.translate(self.selected_object, dx, dy) # Применение перемещения к выбранному объекту
-            self.start_drag_x = event.x # Обновление начальной X-координаты
-            self.start_drag_y = event.y # Обновление начальной Y-координаты
-            self.redraw_all_objects() # Перерисовка всех объектов
+            self.start_drag_x = x # Обновление начальной X-координаты
+            self.start_drag_y = y # Обновление начальной Y-координаты
+            # Вместо полной перерисовки - только перемещаемые объекты поверх фонового слоя
+            self.render_worker.submit("drag_frame", self.drag_margin())
+            self.schedule_render_poll()
         elif self.drawing_primitive == "bezier" and len(self.temp_points) > 0:
-            # Временная отрисовка линии при добавлении контрольных точек Безье
-            self.redraw_all_objects() # Очистка и перерисовка для обновления
-            temp_bezier_points = list(self.temp_points) + [Point(event.x, event.y)] # Добавление текущего положения курсора как временной контрольной точки
-            
-            if len(temp_bezier_points) >= 2: # Только если есть хотя бы 2 точки (первая и текущее положение)
-                temp_bezier = BezierCurve(temp_bezier_points, "#AAAAAA") # Создание временной кривой Безье
-                temp_bezier.draw(self) # Отрисовка временной кривой
-            
-            # Также рисуем временную линию от последней контрольной точки до курсора
-            if len(self.temp_points) > 0:
-                self.bresenham_line(self.temp_points[-1], Point(event.x, event.y), "#FFA500", width=1) # Оранжевая линия
-            
-            self.update_canvas_image() # Обновление изображения на холсте
+            # Временная кривая Безье с текущим положением курсора как последней контрольной точкой
+            self.bezier_preview = Point(x, y)
+            self.redraw_all_objects()
 
 
     def on_canvas_release(self, event):
         # Обработчик события отпускания кнопки мыши
-        self.dragging_object = False # Сброс флага перетаскивания
+        self.frame_scheduler.flush() # Последнее положение курсора применяется до завершения перетаскивания
+        if self.dragging_object: # Перемещенные объекты возвращаются в сцену
+            self.dragging_object = False # Сброс флага перетаскивания
+            self.render_worker.submit("end_drag", list(self.objects))
+            self.redraw_all_objects()
         if self.current_transformation_mode == "translation":
             self.canvas.config(cursor="arrow") # Изменение курсора обратно на "стрелку"
             self.current_transformation_mode = None # Сброс режима трансформации
 
+    def on_pan_start(self, event):
+        # Начало сдвига вида средней кнопкой мыши
+        self.pan_start = (event.x, event.y, self.viewport.x, self.viewport.y)
+
+    def on_pan(self, event):
+        # Сдвиг вида вслед за курсором: смещение считается от начала сдвига, поэтому не накапливает округление
+        if self.pan_start is None:
+            return
+        start_x, start_y, self.viewport.x, self.viewport.y = self.pan_start
+        self.viewport.pan(event.x - start_x, event.y - start_y)
+        self.set_view()
+
+    def on_mouse_wheel(self, event):
+        # Масштаб колесом мыши относительно точки под курсором
+        zoom_in = event.num == 4 or getattr(event, "delta", 0) > 0
+        self.zoom_view(1.25 if zoom_in else 0.8, event.x, event.y)
+
+    def zoom_view(self, factor, x=None, y=None):
+        # Изменение масштаба вида; без координат - относительно центра холста
+        if x is None:
+            x, y = self.canvas_width / 2, self.canvas_height / 2
+        self.viewport.zoom_at(factor, x, y)
+        self.set_view()
+
+    def reset_view(self):
+        # Масштаб 1:1 относительно центра холста
+        self.zoom_view(1 / self.viewport.zoom)
+
+    def fit_view(self):
+        # Весь документ в окне
+        self.viewport.zoom = self.viewport.min_zoom
+        self.viewport.x = self.viewport.y = 0.0
+        self.set_view()
+
+    def set_view(self):
+        # Новое положение или масштаб вида: поток отрисовки растеризует ставшие видимыми области (объекты
+        # вне вида не растеризуются) и собирает холст заново, выделения рисуются поверх нового кадра
+        self.overlay_rects = []
+        self.render_worker.submit("view", self.viewport.copy(), list(self.objects))
+        self.schedule_render_poll()
+
+    def begin_drag(self):
+        # Начало перетаскивания выбранного объекта. Вместе с ним перемещаются результаты ТМО,
+        # зависящие от него (они пересчитываются при изменении операндов)
+        moving = [self.selected_object]
+        for obj in self.objects:
+            if obj not in moving and any(operand in moving for operand in getattr(obj, "operands", ())):
+                moving.append(obj)
+        self.invalidate_overlays()
+        self.render_worker.submit("begin_drag", list(self.objects), moving, self.drag_margin())
+        self.schedule_render_poll()
+
     def get_object_at_click(self, x, y):
-        # Метод для получения объекта по координатам клика, возвращает первый найденный объект
-        for obj in reversed(self.objects): # Итерация в обратном порядке (сверху вниз)
-            if isinstance(obj, (Cross, Flag)):
-                if self.is_point_in_polygon(Point(x, y), obj.points):
+        # Метод для получения объекта по координатам клика, возвращает первый найденный объект.
+        # Сначала - буфер номеров потока отрисовки: выбирается объект, пиксель которого виден под курсором.
+        # Если под курсором фон (рядом может быть тонкая кривая или контрольная точка) или буфер еще
+        # не отрисовал сцену, объекты проверяются геометрически: только объекты из ячейки индекса
+        # под курсором (сверху вниз), у кривых Безье - только отрезки рядом с курсором.
+        # Объект, в габариты которого (с допуском попадания) точка не входит, точно не проверяется
+        picked = self.render_worker.pick(self.objects, x, y)
+        if picked:
+            return picked
+        for obj, segments in self.spatial_index.candidates(self.objects, x, y):
+            target = obj.current() if isinstance(obj, SetOperationResult) else obj # Результат ТМО - по его фигуре
+            if target is None or not target.hit_box(x, y, 10 if isinstance(target, (BezierCurve, Line)) else 0):
+                continue
+            if isinstance(target, (Cross, Flag)):
+                if self.is_point_in_polygon(Point(x, y), target.points):
+                    return obj
+            elif isinstance(target, CoverageShape):
+                if target.contains(x, y):
                     return obj
-            elif isinstance(obj, BezierCurve):
+            elif isinstance(target, Polygon):
+                # Правило четности: точка внутри, если она лежит внутри нечетного числа контуров
+                inside = sum(self.is_point_in_polygon(Point(x, y), contour) for contour in target.outline_contours())
+                if inside % 2 == 1:
+                    return obj
+            elif isinstance(target, BezierCurve):
                 # Проверка контрольных точек
-                for cp in obj.control_points:
+                for cp in target.control_points:
                     if math.sqrt((x - cp.x)**2 + (y - cp.y)**2) < 10: # Область вокруг контрольной точки
                         return obj
                 # Проверка самой кривой
-                for i in range(len(obj.points) - 1):
-                    p1 = obj.points[i]
-                    p2 = obj.points[i+1]
+                points = target.points
+                for i in segments:
+                    p1 = points[i]
+                    p2 = points[i+1]
                     dist = self.point_line_distance(Point(x, y), p1, p2)
                     if dist < 5: # Если точка близко к сегменту кривой
                         return obj
-            elif isinstance(obj, Line):
-                p1 = obj.points[0]
-                p2 = obj.points[1]
+            elif isinstance(target, Line):
+                p1 = target.points[0]
+                p2 = target.points[1]
                 dist = self.point_line_distance(Point(x, y), p1, p2)
                 if dist < 5:
                     return obj
@@ -499,15 +582,16 @@ class GraphicEditor:
     def is_point_in_polygon(self, pt, poly_points):
         # Проверка, находится ли точка внутри многоугольника (алгоритм "луч")
         x, y = pt.x, pt.y
+        poly_points = FrameBuffer.as_xy(poly_points).tolist() # Координаты вершин одним списком (без Point на вершину)
         n = len(poly_points) # Количество вершин многоугольника
         inside = False # Флаг, указывающий, находится ли точка внутри
 
         if n < 3: # Если менее 3 точек, это не многоугольник
             return False
 
-        p1x, p1y = poly_points[0].x, poly_points[0].y # Первая вершина многоугольника
+        p1x, p1y = poly_points[0] # Первая вершина многоугольника
         for i in range(n + 1): # Итерация по всем ребрам, включая замыкающее
-            p2x, p2y = poly_points[i % n].x, poly_points[i % n].y # Текущая вторая вершина ребра
+            p2x, p2y = poly_points[i % n] # Текущая вторая вершина ребра
             # Проверка, находится ли луч справа от точки и пересекает ли ребро
             if y > min(p1y, p2y) and y <= max(p1y, p2y) and x <= max(p1x, p2x):
                 if p1y != p2y:
@@ -519,60 +603,86 @@ class GraphicEditor:
 
 
     def redraw_all_objects(self):
-        # Полная перерисовка всего холста
-        self.pixels.fill(255) # Очистка буфера пикселей (заполнение белым цветом)
-
-        # Отрисовка всех объектов из списка
-        for obj in self.objects:
-            obj.draw(self)
+        # Перерисовка холста по поврежденным областям: поток отрисовки очищает и перерисовывает только
+        # габариты изменившихся, добавленных и удаленных объектов, а также области прошлых выделений.
+        # Окно не ждет растеризации: выделения рисуются, когда придет кадр последней версии сцены
+        self.invalidate_overlays()
+        self.render_worker.submit("update", list(self.objects))
+        self.schedule_render_poll()
+
+    def schedule_render_poll(self):
+        # Прием результатов потока отрисовки в главном потоке через after
+        if self.render_poll_id is None:
+            self.render_poll_id = self.master.after(self.render_poll_interval, self.poll_render)
+
+    def poll_render(self):
+        # Перенос готовых областей заднего буфера в передний. Выделения рисуются поверх, только когда
+        # кадр соответствует последней версии сцены (иначе они бы отстали от объектов)
+        self.render_poll_id = None
+        results = self.render_worker.take_results()
+        for version, tiles in results:
+            for rect, pixels in tiles:
+                x0, y0, x1, y1 = rect
+                self.framebuffer.pixels[y0:y1, x0:x1] = pixels
+                self.framebuffer.exposed.append(rect)
+        if results and results[-1][0] == self.render_worker.version:
+            self.draw_overlays()
+        elif results:
+            self.update_canvas_image()
+        if self.render_worker.busy():
+            self.schedule_render_poll()
+
+    def draw_overlays(self):
+        # Выделения, временные фигуры и маркеры поверх кадра сцены
+        if self.dragging_object: # Кадр перетаскивания сам восстанавливает области с запасом на выделение
+            self.overlay_rects = []
 
         # Дополнительная отрисовка выделения для выбранного объекта
         if self.selected_object:
-            if isinstance(self.selected_object, Line):
-                self.bresenham_line(self.selected_object.points[0], self.selected_object.points[1], "#FF0000", width=3) # Выделение линии красным цветом и толщиной
-            elif isinstance(self.selected_object, (Cross, Flag)):
-                points = self.selected_object.points
-                n = len(points)
-                for i in range(n):
-                    p1 = points[i] # Первая точка ребра
-                    p2 = points[(i + 1) % n] # Вторая точка ребра (замыкание)
-                    self.bresenham_line(p1, p2, "#FF0000", width=3) # Выделение контура многоугольника красным
-            elif isinstance(self.selected_object, BezierCurve):
-                # Выделение для кривой Безье: отрисовка контрольных точек и соединяющих их линий
-                for cp in self.selected_object.control_points:
-                    self.put_pixel(cp.x, cp.y, "#FF0000", width=5) # Отрисовка контрольных точек красным цветом
-
-                # Отрисовка "многоугольника" из контрольных точек (визуализация управляющего полигона)
-                for i in range(len(self.selected_object.control_points) - 1):
-                    p1 = self.selected_object.control_points[i] # Первая контрольная точка
-                    p2 = self.selected_object.control_points[i+1] # Следующая контрольная точка
-                    self.bresenham_line(p1, p2, "#FF8C00", width=1) # Отрисовка оранжевых линий
+            self.mark_overlay(self.selected_object.bounds())
+            self.draw_selection()
             # Отрисовка временных контрольных точек для Безье, если режим активен
             if self.drawing_primitive == "bezier":
-                for cp in self.temp_points:
-                    self.put_pixel(cp.x, cp.y, "#00FF00", width=5) # Временные контрольные точки зеленым
+                for cx, cy in self.screen_points(self.temp_points):
+                    self.framebuffer.put_pixel(cx, cy, "#00FF00", width=5) # Временные контрольные точки зеленым
+                self.mark_overlay(GraphicObject.points_bounds(self.temp_points, 3))
 
         # Выделение объектов для ТМО
         if len(self.tmo_selected_objects) > 0:
             for i, obj in enumerate(self.tmo_selected_objects):
-                highlight_color = "#0000FF" if i == 0 else "#00FFFF" # Синий для первого, голубой для второго
+                highlight_color = "#0000FF" if i == 0 else "#00FFFF" # Синий для первого, голубой для остальных
+                self.mark_overlay(obj.bounds())
+                if isinstance(obj, SetOperationResult):
+                    obj = obj.current()
                 if isinstance(obj, Line):
-                    self.bresenham_line(obj.points[0], obj.points[1], highlight_color, width=3)
+                    self.framebuffer.stroke_polyline(self.screen_points(obj.points), highlight_color, self.screen_width(obj.stroke_width) + 2, cap="square")
                 elif isinstance(obj, (Cross, Flag)):
-                    points = obj.points
-                    n = len(points)
-                    for j in range(n):
-                        p1 = points[j]
-                        p2 = points[(j + 1) % n]
-                        self.bresenham_line(p1, p2, highlight_color, width=3)
+                    self.framebuffer.stroke_polyline(self.screen_points(obj.points), highlight_color, 3, closed=True, join="miter")
+                elif isinstance(obj, Polygon):
+                    for contour in obj.outline_contours():
+                        self.framebuffer.stroke_polyline(self.screen_points(contour), highlight_color, 3, closed=True, join="miter")
+                elif isinstance(obj, CoverageShape):
+                    self.framebuffer.stroke_polyline(self.screen_points(obj.points), highlight_color, 1, closed=True)
                 elif isinstance(obj, BezierCurve):
-                    for cp in obj.control_points:
-                        self.put_pixel(cp.x, cp.y, highlight_color, width=5)
-                    for j in range(len(obj.control_points) - 1):
-                        p1 = obj.control_points[j]
-                        p2 = obj.control_points[j+1]
-                        self.bresenham_line(p1, p2, highlight_color, width=1)
-
+                    control_points = self.screen_points(obj.control_points)
+                    for cx, cy in control_points:
+                        self.framebuffer.put_pixel(cx, cy, highlight_color, width=5)
+                    self.framebuffer.draw_lines(FrameBuffer.polyline_segments(control_points), highlight_color, width=1)
+
+        # Временная кривая Безье при задании контрольных точек
+        if self.drawing_primitive == "bezier" and self.temp_points:
+            temp_bezier_points = list(self.temp_points) + ([self.bezier_preview] if self.bezier_preview else []) # Положение курсора - временная контрольная точка
+            if len(temp_bezier_points) >= 2: # Только если есть хотя бы 2 точки
+                # Временная кривая Безье строится сразу в координатах холста
+                temp_bezier = BezierCurve(self.screen_points(temp_bezier_points), "#AAAAAA")
+                temp_bezier.draw(self.framebuffer) # Отрисовка временной кривой
+                # Стереть при следующей перерисовке: кривая лежит внутри габаритов своих контрольных точек
+                self.mark_overlay(GraphicObject.points_bounds(temp_bezier_points, 2))
+            # Также рисуем временную линию от последней контрольной точки до курсора
+            if self.bezier_preview:
+                start, end = self.screen_points([self.temp_points[-1], self.bezier_preview])
+                self.framebuffer.draw_lines([[*start, *end]], "#FFA500", width=1) # Оранжевая линия
+                self.mark_overlay(GraphicObject.points_bounds([self.temp_points[-1], self.bezier_preview], 2))
 
         self.update_canvas_image() # Обновление изображения на Canvas из пиксельного буфера
 
@@ -591,182 +701,49 @@ class GraphicEditor:
             if not (isinstance(self.selected_object, BezierCurve) and self.drawing_primitive == "bezier"):
                 self.draw_transform_marker_on_canvas(self.selected_object.center.x, self.selected_object.center.y, "#00FF00") # Отрисовка центра выбранного объекта зеленым
 
-    def put_pixel(self, x, y, color_hex, width=1, pixel_buffer=None):
-        # Установка пикселя в буфер с заданным цветом и учетом толщины
-        r, g, b = self.hex_to_rgb(color_hex) # Преобразование HEX цвета в RGB
-        x = int(round(x)) # Округление X-координаты до целого
-        y = int(round(y)) # Округление Y-координаты до целого
-
-        target_buffer = pixel_buffer if pixel_buffer is not None else self.pixels # Выбор буфера
-
-        # Отрисовка квадрата пикселей для имитации толщины
-        for dy_offset in range(-width // 2, width - width // 2):
-            for dx_offset in range(-width // 2, width - width // 2):
-                px, py = x + dx_offset, y + dy_offset # Смещенные координаты пикселя
-                if 0 <= py < self.canvas_height and 0 <= px < self.canvas_width: # Проверка, что пиксель находится в пределах холста
-                    target_buffer[py, px] = [r, g, b] # Установка цвета пикселя в буфер
-
+    def invalidate_overlays(self):
+        # Области прошлых выделений и временных фигур стираются при следующей перерисовке
+        self.render_worker.damage([self.viewport.document_rect(rect) for rect in self.overlay_rects])
+        self.overlay_rects = []
+
+    def draw_selection(self):
+        # Выделение выбранного объекта поверх пикселей сцены
+        selected = self.selected_object
+        if isinstance(selected, SetOperationResult): # Результат ТМО выделяется по его текущей фигуре
+            selected = selected.current()
+        if isinstance(selected, Line):
+            # Выделение линии красным цветом и толщиной (обводка поверх линии)
+            self.framebuffer.stroke_polyline(self.screen_points(selected.points), "#FF0000", self.screen_width(selected.stroke_width) + 2, cap="square")
+        elif isinstance(selected, (Cross, Flag)):
+            # Выделение контура многоугольника красным: замкнутая обводка толщиной 3
+            self.framebuffer.stroke_polyline(self.screen_points(selected.points), "#FF0000", 3, closed=True, join="miter")
+        elif isinstance(selected, Polygon):
+            # Выделение всех контуров результата ТМО
+            for contour in selected.outline_contours():
+                self.framebuffer.stroke_polyline(self.screen_points(contour), "#FF0000", 3, closed=True, join="miter")
+        elif isinstance(selected, CoverageShape):
+            # Выделение растрового результата ТМО - рамка его габаритов
+            self.framebuffer.draw_lines(FrameBuffer.polyline_segments(self.screen_points(selected.points), closed=True), "#FF0000", width=1)
+        elif isinstance(selected, BezierCurve):
+            # Выделение для кривой Безье: отрисовка контрольных точек и соединяющих их линий
+            control_points = self.screen_points(selected.control_points)
+            for cx, cy in control_points:
+                self.framebuffer.put_pixel(cx, cy, "#FF0000", width=5) # Отрисовка контрольных точек красным цветом
+
+            # Отрисовка "многоугольника" из контрольных точек (визуализация управляющего полигона) оранжевым
+            control_polygon = FrameBuffer.polyline_segments(control_points)
+            self.framebuffer.draw_lines(control_polygon, "#FF8C00", width=1)
 
     def update_canvas_image(self):
-        # Обновление изображения на холсте Tkinter из пиксельного буфера
-        self.photo_image = ImageTk.PhotoImage(image=Image.fromarray(self.pixels)) # Создание PhotoImage из текущего массива пикселей
-        self.canvas.itemconfig(self.image_item, image=self.photo_image) # Обновление изображения на холсте
-
-
-    # Алгоритм Брезенхэма для отрисовки линии
-    def bresenham_line(self, p1, p2, color, width=1, pixel_buffer=None):
-        # Алгоритм Брезенхэма для отрисовки линии.
-        # Зачем: Это эффективный алгоритм для отрисовки прямых линий на растровых дисплеях,
-        # использующий только целочисленные операции, что ускоряет процесс
-        # и избегает ошибок округления, присущих операциям с плавающей запятой.
-
-        # Инициализация буфера пикселей, если не передан
-        if pixel_buffer is None:
-            pixel_buffer = self.pixels
-
-        # Получаем целочисленные координаты начальной (p1) и конечной (p2) точек.
-        x1, y1 = int(p1.x), int(p1.y)
-        x2, y2 = int(p2.x), int(p2.y)
-
-        # Вычисляем абсолютные изменения координат по X и Y.
-        # Математически: |x2 - x1| и |y2 - y1|.
-        # Зачем: Нужны для определения основного направления линии и расчета ошибки.
-        dx = abs(x2 - x1)
-        dy = abs(y2 - y1)
-
-        # Определяем направление шага по X и Y (1 или -1).
-        # Зачем: Указывает, нужно ли двигаться вправо/влево или вверх/вниз.
-        sx = 1 if x1 < x2 else -1
-        sy = 1 if y1 < y2 else -1
-
-        # Инициализируем начальное значение ошибки (err).
-        # Математически: err = dx - dy.
-        # Зачем: Эта переменная помогает решить, какой пиксель выбрать на следующем шаге:
-        # сместиться ли по X, по Y, или по обоим, чтобы оставаться максимально близко к идеальной линии.
-        # Если dy больше dx, то линия ближе к вертикали, и наоборот.
-        err = dx - dy
-
-        # Главный цикл отрисовки линии. Продолжается до тех пор, пока не достигнет конечной точки.
-        while True:
-            # Установка текущего пикселя (x1, y1) заданным цветом.
-            # Если width > 1, рисуется квадрат пикселей.
-            self.put_pixel(x1, y1, color, width, pixel_buffer)
-
-            # Проверка условия выхода из цикла: если текущий пиксель совпадает с конечной точкой.
-            if x1 == x2 and y1 == y2:
-                break
-
-            # Удвоенное значение ошибки.
-            # Математически: 2 * err.
-            # Зачем: Используется для принятия решения о следующем шаге без дробных чисел.
-            e2 = 2 * err
-
-            # Если ошибка `e2` больше `-dy`, это означает, что линия "ушла" слишком далеко от идеальной по оси Y.
-            # Корректируем ошибку, уменьшая `err` на `dy`, и делаем шаг по X.
-            # Математически: err = err - dy, x1 = x1 + sx.
-            # Зачем: Приближает линию к идеальной, двигаясь по горизонтали.
-            if e2 > -dy:
-                err -= dy
-                x1 += sx
-
-            # Если ошибка `e2` меньше `dx`, это означает, что линия "ушла" слишком далеко от идеальной по оси X.
-            # Корректируем ошибку, увеличивая `err` на `dx`, и делаем шаг по Y.
-            # Математически: err = err + dx, y1 = y1 + sy.
-            # Зачем: Приближает линию к идеальной, двигаясь по вертикали.
-            if e2 < dx:
-                err += dx
-                y1 += sy
-
-    # Алгоритм Scanline для закрашивания полигона (ЗАКРАШИВАНИЕ) (PAINT)
-    def scanline_fill(self, points, outline_color, fill_color, pixel_buffer=None):
-        # Проверка на пустой список точек.
-        # Если точек нет, полигон не существует, поэтому ничего не рисуем и выходим.
-        if not points:
-            return
-
-        # Находим минимальную и максимальную Y-координаты среди всех вершин полигона.
-        # Это определяет диапазон строк (сканлайнов), которые нужно обработать.
-        # Зачем: Оптимизация, чтобы итерировать только по тем строкам, которые фактически пересекают полигон.
-        min_y = min(p.y for p in points)
-        max_y = max(p.y for p in points)
-
-        edges = [] # Список для хранения информации о ребрах полигона.
-        n = len(points) # Общее количество вершин полигона.
-        
-        # Обход всех ребер полигона
-        for i in range(n):
-            p1 = points[i]
-            p2 = points[(i + 1) % n] # Следующая точка (замыкание полигона: последняя точка с первой).
-
-            # Пропускаем горизонтальные ребра.
-            # Зачем: Горизонтальные ребра не пересекают сканлайны (горизонтальные линии) в отдельных точках,
-            # и их обработка требует особого подхода или может быть проигнорирована, если они не влияют на заливку.
-            if p1.y == p2.y:
-                continue
-
-            # Упорядочиваем точки ребра так, чтобы p1 была ниже (имела меньшую Y-координату), чем p2.
-            # Зачем: Это упрощает вычисления и обеспечивает, что ребро всегда "идет вверх" при сканировании.
-            if p1.y > p2.y:
-                p1, p2 = p2, p1
-
-            # Добавляем ребро в список `edges`.
-            # Формат: [ymin, ymax, x_на_ymin, 1/m (dx/dy)]
-            # ymin: Y-координата нижней точки ребра.
-            # ymax: Y-координата верхней точки ребра.
-            # x_на_ymin: X-координата точки, соответствующей ymin.
-            # inv_slope (1/m или dx/dy): Обратный наклон ребра.
-            # Зачем: Позволяет эффективно вычислять X-координату пересечения сканлайна с ребром:
-            # x_текущее = x_на_ymin + inv_slope * (y_текущее - ymin).
-            edges.append([p1.y, p2.y, p1.x, (p2.x - p1.x) / (p2.y - p1.y)])
-
-        # Итерация по каждой строке развертки (сканлайну) от минимальной до максимальной Y-координаты полигона.
-        # Зачем: Каждая Y-координата представляет собой горизонтальную линию, которую мы "сканируем" для заливки.
-        for y in range(min_y, max_y + 1):
-            intersections = [] # Список для хранения X-координат пересечений текущего сканлайна с ребрами.
-            
-            # Для каждого ребра в списке `edges`.
-            for edge in edges:
-                ymin, ymax, x_curr, inv_slope = edge
-                # Проверяем, пересекает ли текущий сканлайн (`y`) данное ребро.
-                # `ymin <= y < ymax` гарантирует, что сканлайн находится между нижней и верхней точкой ребра
-                # (исключая верхнюю точку, чтобы избежать двойного учета на стыках ребер).
-                if ymin <= y < ymax:
-                    # Вычисляем X-координату пересечения текущего сканлайна с ребром.
-                    # Это уравнение прямой: x = x_0 + (dx/dy) * (y - y_0).
-                    current_x = x_curr + inv_slope * (y - ymin)
-                    intersections.append(current_x) # Добавляем X-координату пересечения.
-
-            # Сортируем найденные X-координаты пересечений по возрастанию.
-            # Зачем: Это необходимо для правильной попарной заливки.
-            # Например, если пересечения [10, 50, 70, 90], мы заливаем между 10-50 и 70-90.
-            intersections.sort()
-
-            # Заливаем пиксели попарно между точками пересечения.
-            # Шаг `2` означает, что мы берем пары (intersections[i], intersections[i+1]).
-            # Зачем: Внутри полигона сканлайн пересекает его контур четное количество раз.
-            # Между каждой такой парой находится внутренняя часть полигона.
-            for i in range(0, len(intersections), 2):
-                # Убеждаемся, что есть вторая точка для пары.
-                if i + 1 < len(intersections):
-                    # Округляем X-координаты до целых чисел для пикселей.
-                    x_start = int(round(intersections[i])) # Начальная X-координата для заливки.
-                    x_end = int(round(intersections[i+1])) # Конечная X-координата для заливки.
-                    
-                    # Итерируем по пикселям от x_start до x_end (включительно) на текущем сканлайне `y`.
-                    # Зачем: Закрашиваем все пиксели, находящиеся внутри полигона на данной строке.
-                    for x in range(x_start, x_end + 1):
-                        # Устанавливаем пиксель в буфере `pixel_buffer` заданным цветом заливки.
-                        self.put_pixel(x, y, fill_color, pixel_buffer=pixel_buffer)
-
-        # Рисуем контур (обводку) полигона поверх заливки.
-        # Зачем: Обеспечивает четкие границы полигона, которые могут быть "размыты" или неточны
-        # из-за дискретизации при заливке, а также позволяет иметь контур другого цвета.
-        for i in range(n):
-            p1 = points[i]
-            p2 = points[(i + 1) % n]
-            # Используем алгоритм Брезенхэма для точной отрисовки линий контура.
-            self.bresenham_line(p1, p2, outline_color, pixel_buffer=pixel_buffer)
-
+        # Обновление изображения на холсте Tkinter из пиксельного буфера: в существующую PhotoImage
+        # записываются только области, измененные после прошлого кадра, и области временных фигур.
+        # Возвращает число переданных байт (оно же сохраняется в frame_bytes)
+        self.frame_bytes = 0
+        for rect in self.framebuffer.take_exposed(self.overlay_rects):
+            data = self.framebuffer.region_ppm(rect)
+            self.photo_image.tk.call(self.photo_image.name, "put", data, "-format", "ppm", "-to", rect[0], rect[1])
+            self.frame_bytes += len(data)
+        return self.frame_bytes
 
     def clear_transform_marker(self):
         # Удаление маркера центра трансформации с холста Tkinter
@@ -782,6 +759,7 @@ class GraphicEditor:
     def draw_transform_marker_on_canvas(self, x, y, color_hex):
         # Рисование маркера центра трансформации (сочетание крестика и круга) на Tkinter Canvas
         self.clear_transform_marker() # Очищаем предыдущий маркер
+        x, y = self.viewport.to_screen(x, y) # Центр задан в координатах документа
         marker_size = 5 # Размер маркера
         
         # Рисуем круг
@@ -798,60 +776,55 @@ class GraphicEditor:
 
     # Методы для ТМО
     def select_tmo_objects_mode(self):
-        # Переключение в режим выбора двух объектов для ТМО
+        # Переключение в режим выбора объектов для ТМО (кликами, по одному)
         self.current_transformation_mode = "select_tmo_objects"
         self.tmo_selected_objects = [] # Очищаем список выбранных для ТМО
         self.selected_object = None # Снимаем обычное выделение
         self.canvas.config(cursor="hand2")
-        messagebox.showinfo("Выбор объектов для ТМО", "Кликните на два объекта (Крест или Флаг) для выполнения ТМО.")
+        messagebox.showinfo("Выбор объектов для ТМО", "Кликните на два или более объекта, затем выберите операцию ТМО.")
         self.redraw_all_objects()
 
+    def select_all_tmo_objects(self):
+        # Все объекты сцены становятся операндами ТМО (в порядке добавления)
+        self.tmo_selected_objects = list(self.objects)
+        self.selected_object = None
+        self.redraw_all_objects()
 
     def check_tmo_selection(self):
-        # Проверяет, выбраны ли два объекта для ТМО и являются ли они поддерживаемыми типами
-        if len(self.tmo_selected_objects) != 2:
-            messagebox.showwarning("Ошибка ТМО", "Для выполнения операции ТМО необходимо выбрать ровно два объекта.")
+        # Проверяет, выбрано ли хотя бы два объекта для ТМО
+        if len(self.tmo_selected_objects) < 2:
+            messagebox.showwarning("Ошибка ТМО", "Для выполнения операции ТМО необходимо выбрать хотя бы два объекта.")
             return False
-        # Проверка типов объектов
-        for obj in self.tmo_selected_objects:
-            if not isinstance(obj, (Cross, Flag)):
-                messagebox.showwarning("Ошибка ТМО", "Пиксельные ТМО поддерживаются только для примитивов 'Крест' и 'Флаг'.")
-                self.tmo_selected_objects = [] # Сбрасываем выбор
-                self.redraw_all_objects()
-                return False
         return True
 
+    def finish_tmo(self):
+        # Сброс выбора и режима после операции и возврат к основному виду
+        self.tmo_selected_objects = []
+        self.selected_object = None
+        self.current_transformation_mode = None
+        self.canvas.config(cursor="arrow")
+        self.redraw_all_objects()
+
     def perform_intersection(self):
-        # Выполнить операцию пересечения
+        # Выполнить операцию пересечения всех выбранных объектов
         if self.check_tmo_selection():
-            obj1, obj2 = self.tmo_selected_objects[0], self.tmo_selected_objects[1]
-            SetOperations.intersection(self, obj1, obj2)
-            self.tmo_selected_objects = [] # Сбрасываем выбор после операции
-            self.selected_object = None
-            self.redraw_all_objects() # Возвращаем основной вид
+            SetOperations.intersection(self, self.tmo_selected_objects)
+            self.finish_tmo()
 
     def perform_difference(self):
-        # Выполнить операцию разности (A \ B)
+        # Выполнить операцию разности: из первого (или последнего) выбранного вычитаются остальные
         if self.check_tmo_selection():
-            obj1, obj2 = self.tmo_selected_objects[0], self.tmo_selected_objects[1]
             # Предлагаем пользователю выбрать порядок
-            choice = messagebox.askyesno("Разность", "Выполнить A - B? (Нет для B - A)")
-            if choice: # A - B
-                SetOperations.difference(self, obj1, obj2)
-            else: # B - A
-                SetOperations.difference(self, obj2, obj1)
-            self.tmo_selected_objects = []
-            self.selected_object = None
-            self.redraw_all_objects()
+            choice = messagebox.askyesno("Разность", "Вычесть остальные объекты из первого выбранного? (Нет - из последнего)")
+            objects = self.tmo_selected_objects if choice else self.tmo_selected_objects[::-1]
+            SetOperations.difference(self, objects)
+            self.finish_tmo()
 
     def perform_union(self):
-        # Выполнить операцию объединения
+        # Выполнить операцию объединения всех выбранных объектов
         if self.check_tmo_selection():
-            obj1, obj2 = self.tmo_selected_objects[0], self.tmo_selected_objects[1]
-            SetOperations.union(self, obj1, obj2)
-            self.tmo_selected_objects = []
-            self.selected_object = None
-            self.redraw_all_objects()
+            SetOperations.union(self, self.tmo_selected_objects)
+            self.finish_tmo()
 
     # Геометрические преобразования
     def start_translation(self):
@@ -894,8 +867,9 @@ class GraphicEditor:
         self.tmo_selected_objects = [] # Сброс ТМО-выбора
 
     def draw_temp_vertical_line(self, x):
-        # Рисование временной вертикальной линии на холсте Tkinter
+        # Рисование временной вертикальной линии на холсте Tkinter (x - координата документа)
         self.clear_temp_line() # Очистка предыдущей временной линии
+        x = self.viewport.to_screen(x, 0)[0]
         # Создание линии на Canvas, запоминание ее ID
         self.temp_line_id = self.canvas.create_line(x, 0, x, self.canvas_height, fill="red", dash=(4, 4), width=2)
 
@@ -27,3 +27,41 @@ class Point:
         else:
             raise ValueError("Неожиданная форма матрицы для преобразования") # Выброс исключения при неожиданной форме матрицы
 
+
+
+# Вершины фигуры, хранящиеся одним непрерывным массивом координат (N, 2).
+# Для совместимости ведет себя как список Point: индекс и перебор возвращают точки, собранные
+# из строк массива, срез - такой же вид на часть массива. Растеризаторы и преобразования берут
+# сам массив (xy), поэтому на каждую вершину не создается ни Point, ни массив NumPy
+class PointArray:
+    def __init__(self, xy):
+        self.xy = xy # Координаты (N, 2), только для чтения
+
+    @staticmethod
+    def coordinates(points):
+        # Массив координат (N, 2) для хранения в фигуре: из PointArray (без копирования), массива или
+        # списка Point. Координаты округляются до целых, как в Point, и массив закрывается для записи
+        if isinstance(points, PointArray):
+            return points.xy
+        if isinstance(points, np.ndarray):
+            xy = np.rint(points.astype(float, copy=True).reshape(-1, 2))
+        else:
+            xy = np.array([(p.x, p.y) for p in points], dtype=float).reshape(-1, 2)
+        xy.setflags(write=False)
+        return xy
+
+    def __len__(self):
+        return len(self.xy)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return PointArray(self.xy[index])
+        x, y = self.xy[index].tolist()
+        return Point(x, y)
+
+    def __iter__(self):
+        for x, y in self.xy.tolist():
+            yield Point(x, y)
+
+    def __array__(self, dtype=None, copy=None):
+        return self.xy if dtype is None else self.xy.astype(dtype)
@@ -0,0 +1,1087 @@
+import numpy as np
+from Color import Color
+from Stroke import Stroke
+from Spans import SpanShape
+from Sprites import Sprite, SpriteCache
+from Point import PointArray
+
+
+# Ядро отрисовки без зависимости от tkinter.
+# Кадровый буфер хранит пиксели холста в массиве NumPy и содержит все растеризаторы,
+# поэтому сцену можно отрисовать в пакетном режиме, в рабочих потоках и тестах без создания окна.
+class FrameBuffer:
+    def __init__(self, width, height, origin=(0, 0), channels=3, ids=False):
+        self.width = width # Ширина буфера в пикселях
+        self.height = height # Высота буфера в пикселях
+        # Массив пикселей (строка, столбец, RGB), по умолчанию белый фон.
+        # Буфер с 4 каналами (RGBA) - тайл кэша растров: изначально прозрачный
+        self.pixels = self.allocate(channels)
+        # Буфер номеров (строка, столбец): номер объекта, чей пиксель виден в этой точке (строка boxes + 1),
+        # 0 - фон. Растеризаторы пишут его вместе с пикселями, поэтому он обновляется теми же поврежденными
+        # областями, что и изображение, а выбор объекта кликом - одно чтение массива (pick).
+        # ids=False - номера не хранятся
+        self.ids_enabled = ids
+        self.ids = self.allocate_ids() if ids else None
+        self.current_id = 0 # Номер объекта, который сейчас рисуется
+        self.origin = origin # Координаты холста левого верхнего пикселя буфера (у тайлов - угол габаритов объекта)
+        self.sprites = SpriteCache() # Растры объектов для повторного вывода без растеризации
+        self.clip_rect = None # Прямоугольник отсечения (x0, y0, x1, y1): запись пикселей только внутри него
+        # Видимая область (x0, y0, x1, y1): повреждения вне нее не перерисовываются, пока она их не покроет.
+        # None - весь буфер
+        self.visible = None
+        self.deferred = [] # Отложенные повреждения вне видимой области
+        self.deferred_limit = 1024 # При таком числе отложенных областей они объединяются
+        self.damaged = [] # Поврежденные прямоугольники, ожидающие перерисовки
+        self.exposed = [(0, 0, width, height)] # Области, измененные после последнего вывода на экран
+        self.background = None # Фоновый слой перетаскивания: сцена без перемещаемых объектов
+        self.drag_objects = [] # Перемещаемые объекты (выводятся поверх фона в каждом кадре)
+        self.drag_ids = set() # Их id: при перерисовке поврежденных областей они пропускаются
+        self.drag_rects = [] # Области, занятые перемещаемыми объектами в последнем кадре
+        self.drawn = {}
+        self.forget_objects()
+
+    def allocate(self, channels):
+        # Массив пикселей буфера (TiledFrameBuffer вместо него выделяет тайлы по мере отрисовки)
+        return np.full((self.height, self.width, channels), 255 if channels == 3 else 0, dtype=np.uint8)
+
+    def allocate_ids(self):
+        # Массив буфера номеров (у TiledFrameBuffer номера хранят тайлы)
+        return np.zeros((self.height, self.width), dtype=np.int32)
+
+    def forget_objects(self):
+        # Сброс сведений об отрисованных объектах
+        for obj, _, _, _ in self.drawn.values():
+            if self in obj.observers:
+                obj.observers.remove(self)
+        self.drawn = {} # id(объекта) -> [объект, ключ отрисовки, габариты, строка в boxes] на момент последней отрисовки
+        self.changed = set() # id объектов, сообщивших об изменении после последней отрисовки
+        self.boxes = np.zeros((64, 4), dtype=np.int64) # Габариты отрисованных объектов (пустые строки - нули)
+        self.row_objects = [None] * 64 # Объект каждой строки boxes
+        self.sequence = np.zeros(64, dtype=np.int64) # Порядковый номер объекта строки (порядок наложения)
+        self.next_sequence = 0
+        self.free_rows = list(range(63, -1, -1)) # Свободные строки boxes
+
+    def clear(self):
+        # Очистка буфера (заполнение белым цветом)
+        self.pixels.fill(255)
+        if self.ids is not None:
+            self.ids.fill(0)
+
+    def render(self, objects, clear=True):
+        # Отрисовка списка объектов (Line, Cross, Flag, BezierCurve) в буфер.
+        # Объекты запоминаются до отрисовки: их номера в буфере номеров - строки таблицы габаритов
+        if clear:
+            self.clear()
+        self.forget_objects()
+        for obj in objects:
+            self.track(obj)
+        for obj in objects:
+            self.draw_object(obj)
+        self.damaged = []
+        self.deferred = []
+        self.exposed = [(0, 0, self.width, self.height)]
+        return self.pixels
+
+    def invalidate(self, rect=None):
+        # Пометка прямоугольника (x0, y0, x1, y1) для перерисовки; без аргумента - весь буфер
+        if rect is None:
+            rect = (0, 0, self.width, self.height)
+        self.damaged.append(rect)
+
+    def object_changed(self, obj):
+        # Уведомление от объекта (GraphicObject.notify): его пиксели нужно обновить при следующем update
+        self.changed.add(id(obj))
+
+    def track(self, obj):
+        # Запоминание отрисованного объекта: ключ, габариты и подписка на его изменения
+        if not self.free_rows: # Увеличение таблицы габаритов вдвое
+            size = len(self.boxes)
+            self.boxes = np.vstack([self.boxes, np.zeros((size, 4), dtype=np.int64)])
+            self.row_objects.extend([None] * size)
+            self.sequence = np.concatenate([self.sequence, np.zeros(size, dtype=np.int64)])
+            self.free_rows = list(range(2 * size - 1, size - 1, -1))
+        row = self.free_rows.pop()
+        self.row_objects[row] = obj
+        self.sequence[row] = self.next_sequence
+        self.next_sequence += 1
+        bounds = obj.bounds()
+        self.boxes[row] = bounds if bounds is not None else (0, 0, 0, 0)
+        self.drawn[id(obj)] = [obj, obj.render_key(), bounds, row]
+        if self not in obj.observers:
+            obj.observers.append(self)
+        return bounds
+
+    def untrack(self, object_id):
+        # Забыть удаленный объект; возвращает его последние габариты
+        obj, _, bounds, row = self.drawn.pop(object_id)
+        self.boxes[row] = 0
+        self.row_objects[row] = None
+        self.free_rows.append(row)
+        if self in obj.observers:
+            obj.observers.remove(self)
+        return bounds
+
+    def update(self, objects, cancelled=None):
+        # Инкрементальная перерисовка: поврежденными считаются прошлые и новые габариты изменившихся,
+        # добавленных и удаленных объектов (плюс явно помеченные области). Об изменениях объекты сообщают
+        # сами (object_changed), поэтому неизменные объекты не перебираются. Очищаются и перерисовываются
+        # только поврежденные прямоугольники и только объектами, которые с ними пересекаются.
+        # cancelled - функция без аргументов: если она вернула True, отрисовка прерывается, а недорисованные
+        # области остаются поврежденными до следующего update (так поток отрисовки бросает устаревший кадр).
+        # Возвращает список перерисованных прямоугольников
+        present = set(map(id, objects))
+        for object_id in self.drawn.keys() - present: # Удаленные объекты
+            self.damaged.append(self.untrack(object_id))
+        added = present - self.drawn.keys()
+        if added: # Новые объекты
+            for obj in objects:
+                if id(obj) in added:
+                    self.damaged.append(self.track(obj))
+        # Уведомления могут приходить из другого потока: набор разбирается по одному элементу (pop атомарен),
+        # поэтому уведомление, пришедшее во время update, остается в наборе до следующего вызова
+        changed = set()
+        while self.changed:
+            changed.add(self.changed.pop())
+        for object_id in (changed & self.drawn.keys()) - added: # Изменившиеся объекты
+            record = self.drawn[object_id]
+            key = record[0].render_key()
+            if key != record[1]:
+                bounds = record[0].bounds()
+                self.damaged.append(record[2]) # Старое положение
+                self.damaged.append(bounds) # Новое положение
+                record[1], record[2] = key, bounds
+                self.boxes[record[3]] = bounds if bounds is not None else (0, 0, 0, 0)
+
+        rects = self.merge_rects(self.damaged)
+        self.damaged = []
+        if self.visible is not None: # Объекты вне видимой области не растеризуются - их области ждут
+            rects, hidden = self.split_rects(rects, self.visible)
+            self.deferred.extend(hidden)
+            if len(self.deferred) > self.deferred_limit:
+                self.deferred = self.merge_rects(self.deferred)
+                self.deferred_limit = max(1024, 2 * len(self.deferred))
+        for index, rect in enumerate(rects):
+            x0, y0, x1, y1 = rect
+            self.clear_rect(rect)
+            boxes = self.boxes
+            rows = np.flatnonzero((boxes[:, 0] < x1) & (boxes[:, 2] > x0) & (boxes[:, 1] < y1) & (boxes[:, 3] > y0))
+            # Порядок наложения - порядок появления объектов в списке (новые объекты добавляются в конец)
+            overlapping = [self.row_objects[row] for row in rows[np.argsort(self.sequence[rows], kind="stable")].tolist()]
+            if self.drag_ids: # Перемещаемые объекты не входят в фоновый слой
+                overlapping = [obj for obj in overlapping if id(obj) not in self.drag_ids]
+            interrupted = False
+            self.clip_rect = rect
+            try:
+                for obj in overlapping:
+                    if cancelled is not None and cancelled():
+                        interrupted = True
+                        break
+                    self.draw_object(obj)
+            finally:
+                self.clip_rect = None
+            if interrupted: # Область и оставшиеся за ней перерисуются при следующем update
+                self.damaged.extend(rects[index:])
+                rects = rects[:index]
+                break
+        self.exposed.extend(rects)
+        return rects
+
+    def begin_drag(self, objects, moving, margin=0):
+        # Начало перетаскивания: сцена без перемещаемых объектов один раз сохраняется в фоновый слой.
+        # Кадр перетаскивания (drag_frame) восстанавливает из фона прошлое положение перемещаемых объектов
+        # и выводит поверх только их, поэтому его стоимость не зависит от числа остальных объектов
+        self.update(objects)
+        self.drag_objects = list(moving)
+        self.drag_ids = set(map(id, self.drag_objects))
+        for obj in self.drag_objects: # Области перемещаемых объектов перерисовываются без них
+            self.invalidate(obj.bounds())
+        self.update(objects)
+        self.save_background()
+        self.drag_rects = []
+        return self.drag_frame(margin)
+
+    def drag_frame(self, margin=0):
+        # Кадр перетаскивания: прошлые и новые области перемещаемых объектов (с запасом margin, например
+        # на выделение) берутся из фонового слоя, затем перемещаемые объекты выводятся поверх.
+        # Сдвиг на целое число пикселей не меняет ключ растра, поэтому объекты выводятся из кэша спрайтов.
+        # Возвращает список обновленных прямоугольников
+        rects = []
+        for obj in self.drag_objects:
+            bounds = obj.bounds()
+            if bounds is not None:
+                x0, y0, x1, y1 = bounds
+                rects.append((x0 - margin, y0 - margin, x1 + margin, y1 + margin))
+        updated = self.merge_rects(self.drag_rects + rects)
+        for rect in updated:
+            self.restore_background(rect)
+        for obj in self.drag_objects:
+            self.draw_object(obj)
+        self.drag_rects = rects
+        self.exposed.extend(updated)
+        return updated
+
+    def end_drag(self, objects):
+        # Конец перетаскивания: фоновый слой больше не нужен, перемещенные объекты возвращаются в сцену -
+        # области последнего кадра перерисовываются обычным инкрементальным путем с верным порядком наложения
+        for rect in self.drag_rects:
+            self.invalidate(rect)
+        self.background = None
+        self.drag_objects = []
+        self.drag_ids = set()
+        self.drag_rects = []
+        return self.update(objects)
+
+    def clear_rect(self, rect):
+        # Заливка прямоугольника (x0, y0, x1, y1) белым фоном
+        x0, y0, x1, y1 = rect
+        self.pixels[y0:y1, x0:x1] = 255
+        if self.ids is not None:
+            self.ids[y0:y1, x0:x1] = 0
+
+    def snapshot(self):
+        # Копия пикселей и буфера номеров (None, если номера не хранятся)
+        return self.pixels.copy(), self.ids.copy() if self.ids is not None else None
+
+    def save_background(self):
+        # Сохранение текущего содержимого как фонового слоя перетаскивания
+        self.background = self.snapshot()
+
+    def restore_background(self, rect):
+        # Возврат прямоугольника к содержимому фонового слоя
+        x0, y0, x1, y1 = rect
+        pixels, ids = self.background
+        self.pixels[y0:y1, x0:x1] = pixels[y0:y1, x0:x1]
+        if ids is not None:
+            self.ids[y0:y1, x0:x1] = ids[y0:y1, x0:x1]
+
+    def read(self, rect):
+        # Пиксели RGB прямоугольника (x0, y0, x1, y1). Может вернуть представление массива буфера:
+        # если буфер продолжит меняться, результат нужно скопировать
+        x0, y0, x1, y1 = rect
+        return self.pixels[y0:y1, x0:x1, :3]
+
+    def pick(self, objects, x, y):
+        # Объект сцены objects, пиксель которого виден в точке (x, y), по буферу номеров; None - фон.
+        # False - буфер не может ответить: номера не хранятся, точка вне буфера или видимой области либо
+        # буфер отстал от сцены (есть неперерисованные повреждения или список объектов другой длины)
+        x, y = int(x), int(y)
+        if not self.ids_enabled or not (0 <= x < self.width and 0 <= y < self.height):
+            return False
+        if self.damaged or self.changed or len(objects) != len(self.drawn):
+            return False
+        if self.visible is not None and self.overlap(self.visible, (x, y, x + 1, y + 1)) is None:
+            return False
+        number = self.id_at(x, y)
+        return self.row_objects[number - 1] if number else None
+
+    def id_at(self, x, y):
+        # Номер объекта в пикселе (x, y) буфера
+        ox, oy = self.origin
+        return int(self.ids[y - oy, x - ox])
+
+    def mark(self, target_buffer, rows, cols):
+        # Запись номера рисуемого объекта в пиксели (в координатах буфера), которые растеризатор записал
+        # в массив буфера (растеризация в сторонний массив pixel_buffer номеров не меняет)
+        if self.ids is not None and target_buffer is self.pixels:
+            self.ids[rows, cols] = self.current_id
+
+    def take_exposed(self, extra=()):
+        # Области для вывода на экран: измененные после прошлого вывода плюс extra (например, временные
+        # фигуры, нарисованные поверх сцены). Список сбрасывается
+        rects = self.merge_rects(self.exposed + list(extra))
+        self.exposed = []
+        return rects
+
+    def region_ppm(self, rect):
+        # Прямоугольник буфера (x0, y0, x1, y1) в виде двоичного PPM (P6) для вывода в Tk PhotoImage.
+        # Заголовок и пиксели собираются в bytes одним копированием; строки целиком по ширине буфера
+        # непрерывны в памяти и не копируются дополнительно
+        x0, y0, x1, y1 = rect
+        region = np.ascontiguousarray(self.read(rect))
+        return b"".join([b"P6\n%d %d\n255\n" % (x1 - x0, y1 - y0), region])
+
+    def set_visible(self, rect):
+        # Новая видимая область (None - весь буфер): отложенные повреждения внутри нее перерисуются
+        # при следующем update
+        self.visible = rect
+        if rect is None:
+            shown, self.deferred = self.deferred, []
+        else:
+            shown, self.deferred = self.split_rects(self.deferred, rect)
+        self.damaged.extend(shown)
+
+    def split_rects(self, rects, area):
+        # Разделение прямоугольников на части внутри area и вне ее (вторые - не более 4 на прямоугольник)
+        inside, outside = [], []
+        for rect in rects:
+            common = self.overlap(rect, area)
+            if common is None:
+                outside.append(rect)
+                continue
+            inside.append(common)
+            x0, y0, x1, y1 = rect
+            cx0, cy0, cx1, cy1 = common
+            pieces = ((x0, y0, x1, cy0), (x0, cy1, x1, y1), (x0, cy0, cx0, cy1), (cx1, cy0, x1, cy1))
+            outside.extend(piece for piece in pieces if piece[0] < piece[2] and piece[1] < piece[3])
+        return inside, outside
+
+    @staticmethod
+    def overlap(area, rect):
+        # Пересечение прямоугольников; None, если оно пусто
+        x0, y0 = max(area[0], rect[0]), max(area[1], rect[1])
+        x1, y1 = min(area[2], rect[2]), min(area[3], rect[3])
+        return (x0, y0, x1, y1) if x0 < x1 and y0 < y1 else None
+
+    def merge_rects(self, rects):
+        # Объединение пересекающихся (и касающихся) прямоугольников и отсечение по границам буфера.
+        # Каждый следующий прямоугольник поглощает все уже объединенные, которые он задевает, пока такие
+        # есть; пересечения с ними проверяются одной операцией NumPy
+        merged = np.empty((len(rects), 4), dtype=np.int64)
+        count = 0
+        for rect in rects:
+            if rect is None:
+                continue
+            x0, y0, x1, y1 = max(rect[0], 0), max(rect[1], 0), min(rect[2], self.width), min(rect[3], self.height)
+            if x0 >= x1 or y0 >= y1:
+                continue
+            while count:
+                boxes = merged[:count]
+                hits = (boxes[:, 0] <= x1) & (boxes[:, 2] >= x0) & (boxes[:, 1] <= y1) & (boxes[:, 3] >= y0)
+                if not hits.any():
+                    break
+                absorbed = boxes[hits]
+                x0, y0 = min(x0, int(absorbed[:, 0].min())), min(y0, int(absorbed[:, 1].min()))
+                x1, y1 = max(x1, int(absorbed[:, 2].max())), max(y1, int(absorbed[:, 3].max()))
+                kept = boxes[~hits]
+                count = len(kept)
+                merged[:count] = kept
+            merged[count] = (x0, y0, x1, y1)
+            count += 1
+        return [tuple(rect) for rect in merged[:count].tolist()]
+
+    def writable_area(self, target_buffer):
+        # Область, в которую разрешена запись (x0, y0, x1, y1) в координатах холста:
+        # буфер (со сдвигом origin), ограниченный прямоугольником отсечения
+        height, width = target_buffer.shape[:2]
+        ox, oy = self.origin
+        if self.clip_rect is None:
+            return ox, oy, ox + width, oy + height
+        x0, y0, x1, y1 = self.clip_rect
+        return max(x0, ox), max(y0, oy), min(x1, ox + width), min(y1, oy + height)
+
+    @staticmethod
+    def painted(destination, rgb, alpha):
+        # Результат наложения цвета rgb с непрозрачностью alpha (0..255, число или массив по пикселям)
+        # на пиксели destination (..., 3) или (..., 4); возвращает новый массив.
+        # RGB: out = (rgb * a + dst * (255 - a) + 127) // 255 - та же формула, что у Color.blend_table.
+        # RGBA (тайл): наложение "поверх" с накоплением прозрачности. Пустой пиксель тайла получает цвет
+        # и прозрачность как есть, непрозрачный смешивается по формуле RGB, поэтому вывод тайла на холст
+        # дает те же значения, что и прямая отрисовка объекта
+        a = np.asarray(alpha, dtype=np.int64)[..., None]
+        rgb = np.asarray(rgb, dtype=np.int64)
+        if destination.shape[-1] == 3:
+            return ((rgb * a + destination.astype(np.int64) * (255 - a) + 127) // 255).astype(np.uint8)
+        below = destination[..., 3:].astype(np.int64) * (255 - a) # Вклад нижнего слоя (непрозрачность * 255)
+        weight = a * 255 + below # Итоговая непрозрачность * 255
+        safe = np.maximum(weight, 1)
+        color = (2 * (rgb * a * 255 + destination[..., :3].astype(np.int64) * below) + safe) // (2 * safe)
+        result = np.concatenate([color, (weight + 127) // 255], axis=-1)
+        return np.where(weight > 0, result, destination).astype(np.uint8)
+
+    def paint(self, target_buffer, rows, cols, color):
+        # Запись цвета Color в область буфера (срезы или массивы индексов в координатах буфера)
+        if color.a: # Полностью прозрачный цвет пикселей не меняет и объект в них не виден
+            self.mark(target_buffer, rows, cols)
+        if target_buffer.shape[-1] == 3:
+            if color.is_opaque:
+                target_buffer[rows, cols] = color.rgb
+            else: # Смешивание через таблицу предумноженного цвета
+                target_buffer[rows, cols] = color.composite(target_buffer[rows, cols])
+        elif color.is_opaque:
+            target_buffer[rows, cols, :3] = color.rgb
+            target_buffer[rows, cols, 3] = 255
+        elif not target_buffer[rows, cols, 3].any(): # Пустая область тайла: цвет и прозрачность как есть
+            target_buffer[rows, cols, :3] = color.rgb
+            target_buffer[rows, cols, 3] = color.a
+        else:
+            target_buffer[rows, cols] = self.painted(target_buffer[rows, cols], color.rgb, color.a)
+
+    def draw_object(self, obj):
+        # Отрисовка объекта через кэш растров: при попадании - вывод готового тайла в габариты объекта.
+        # Ключ не зависит от целочисленного сдвига, поэтому перемещенный объект не растеризуется заново.
+        # Объект, габариты которого не задевают область записи, не растеризуется
+        bounds = obj.bounds()
+        if bounds is None or self.overlap(self.writable_area(self.pixels), bounds) is None:
+            return
+        self.current_id = self.object_number(obj)
+        sprite, bounds = self.object_sprite(obj)
+        if sprite is None:
+            obj.draw(self)
+        else:
+            self.draw_sprite(sprite, bounds[0], bounds[1])
+
+    def object_number(self, obj):
+        # Номер объекта для буфера номеров: строка таблицы габаритов + 1 (0 - объект не отслеживается)
+        record = self.drawn.get(id(obj))
+        return record[3] + 1 if record is not None else 0
+
+    def object_sprite(self, obj):
+        # Растр объекта из кэша (при промахе допущенный в кэш ключ растеризуется в новый тайл) и габариты,
+        # в которые он выводится. (None, габариты) - объект нужно рисовать напрямую
+        version = obj.geometry_version()
+        key = obj.sprite_key()
+        if key is None:
+            return None, None
+        bounds, signature = key
+        sprite = self.sprites.get(signature)
+        if sprite is None:
+            x0, y0, x1, y1 = bounds
+            # Впервые встреченный ключ и слишком большой тайл - прямая отрисовка
+            if not self.sprites.admit(signature) or not self.sprites.fits((x1 - x0) * (y1 - y0) * 4):
+                return None, bounds
+            canvas = FrameBuffer(x1 - x0, y1 - y0, origin=(x0, y0), channels=4)
+            obj.draw(canvas)
+            sprite = Sprite(canvas.pixels)
+            # Объект мог измениться во время растеризации (в потоке отрисовки): такой растр не соответствует
+            # ключу и в кэш не попадает
+            if obj.geometry_version() == version and obj.sprite_key() == key:
+                self.sprites.put(signature, sprite)
+        return sprite, bounds
+
+    def draw_sprite(self, sprite, x, y, pixel_buffer=None):
+        # Вывод спрайта с левым верхним углом в точке (x, y): непрозрачные пиксели копируются,
+        # полупрозрачные смешиваются, прозрачные пропускаются
+        target_buffer = pixel_buffer if pixel_buffer is not None else self.pixels
+        left, top, right, bottom = self.writable_area(target_buffer)
+        x0, y0 = max(x, left), max(y, top)
+        x1, y1 = min(x + sprite.width, right), min(y + sprite.height, bottom)
+        if x0 >= x1 or y0 >= y1:
+            return
+        ox, oy = self.origin
+        if sprite.dense:
+            source = sprite.tile[y0 - y:y1 - y, x0 - x:x1 - x]
+            destination = target_buffer[y0 - oy:y1 - oy, x0 - ox:x1 - ox]
+            alpha = source[..., 3]
+            if self.ids is not None and target_buffer is self.pixels:
+                np.copyto(self.ids[y0 - oy:y1 - oy, x0 - ox:x1 - ox], self.current_id, where=alpha > 0)
+            np.copyto(destination, source[..., :3], where=(alpha == 255)[..., None])
+            if not sprite.opaque:
+                partial = (alpha > 0) & (alpha < 255)
+                destination[partial] = self.painted(destination[partial], source[..., :3][partial], alpha[partial])
+            return
+        rows, cols, colors = sprite.rows, sprite.cols, sprite.colors
+        if (x0, y0, x1, y1) != (x, y, x + sprite.width, y + sprite.height): # Спрайт обрезан - отбор пикселей
+            inside = (cols >= x0 - x) & (cols < x1 - x) & (rows >= y0 - y) & (rows < y1 - y)
+            rows, cols, colors = rows[inside], cols[inside], colors[inside]
+        rows, cols = rows + (y - oy), cols + (x - ox)
+        self.mark(target_buffer, rows, cols) # В разреженном спрайте только закрашенные пиксели
+        if sprite.opaque:
+            target_buffer[rows, cols] = colors[:, :3]
+            return
+        opaque = colors[:, 3] == 255
+        target_buffer[rows[opaque], cols[opaque]] = colors[opaque, :3]
+        partial = ~opaque
+        target_buffer[rows[partial], cols[partial]] = self.painted(
+            target_buffer[rows[partial], cols[partial]], colors[partial, :3], colors[partial, 3])
+
+    @staticmethod
+    def hex_to_rgb(hex_color):
+        # Преобразование цвета (строка "#RRGGBB[AA]" или Color) в кортеж RGB
+        color = Color.parse(hex_color)
+        return color.r, color.g, color.b
+
+    def put_pixel(self, x, y, color_hex, width=1, pixel_buffer=None):
+        # Установка пикселя в буфер с заданным цветом и учетом толщины
+        x = int(round(x)) # Округление X-координаты до целого
+        y = int(round(y)) # Округление Y-координаты до целого
+        # Квадрат пикселей для имитации толщины - это отрезок заливки из одной точки
+        self.fill_spans(((y, x, x),), color_hex, pixel_buffer, width=width)
+
+    # Алгоритм Брезенхэма для отрисовки линии
+    def bresenham_line(self, p1, p2, color, width=1, pixel_buffer=None):
+        # Один отрезок - частный случай пакетной отрисовки
+        self.draw_lines([[p1.x, p1.y, p2.x, p2.y]], color, width, pixel_buffer)
+
+    @staticmethod
+    def polyline_segments(points, closed=False):
+        # Отрезки ломаной в виде массива (N, 4): [x1, y1, x2, y2] для каждой пары соседних вершин
+        xy = FrameBuffer.as_xy(points)
+        if closed: # Замыкание: последняя вершина соединяется с первой
+            return np.hstack([xy, np.roll(xy, -1, axis=0)])
+        return np.hstack([xy[:-1], xy[1:]])
+
+    @staticmethod
+    def line_pixels(segments):
+        # Пиксели всех отрезков по алгоритму Брезенхэма, вычисленные одновременно средствами NumPy.
+        # Вариант с err = dx - dy на каждом шаге сдвигается по главной оси, а по второстепенной
+        # смещение на i-м шаге равно (2 * i * minor + major - 1) // (2 * major) -
+        # это в точности те же пиксели, что дает пошаговый цикл.
+        seg = np.asarray(segments, dtype=float).reshape(-1, 4)
+        seg = np.trunc(seg).astype(np.int64) # Целочисленные координаты концов, как int(p.x)
+        x1, y1, x2, y2 = seg.T
+        dx, dy = np.abs(x2 - x1), np.abs(y2 - y1)
+        sx = np.where(x1 < x2, 1, -1) # Направление шага по X
+        sy = np.where(y1 < y2, 1, -1) # Направление шага по Y
+        major = np.maximum(dx, dy) # Число шагов по главной оси
+        minor = np.minimum(dx, dy)
+        x_major = dx >= dy
+
+        # Номер шага i внутри каждого отрезка (отрезок из major шагов дает major + 1 пиксель)
+        counts = major + 1
+        seg_index = np.repeat(np.arange(len(seg)), counts)
+        starts = np.cumsum(counts) - counts
+        step = np.arange(counts.sum()) - np.repeat(starts, counts)
+
+        major_k = major[seg_index]
+        minor_step = (2 * step * minor[seg_index] + major_k - 1) // np.maximum(2 * major_k, 1)
+        along_x = x_major[seg_index]
+        xs = x1[seg_index] + sx[seg_index] * np.where(along_x, step, minor_step)
+        ys = y1[seg_index] + sy[seg_index] * np.where(along_x, minor_step, step)
+        return xs, ys
+
+    def plot_pixels(self, xs, ys, color, width=1, pixel_buffer=None):
+        # Запись набора пикселей пером put_pixel одним присваиванием по индексам.
+        # Полупрозрачный цвет смешивается с прочитанными значениями, поэтому повторяющийся
+        # индекс получает одно и то же значение и не смешивается дважды
+        color = Color.parse(color)
+        target_buffer = pixel_buffer if pixel_buffer is not None else self.pixels
+        left, top, right, bottom = self.writable_area(target_buffer)
+        lo, hi = self.pen_offsets(width)
+        # Квадрат пера: сдвиги пера добавляются к каждому пикселю
+        offsets = np.arange(lo, hi)
+        xs, ys = np.broadcast_arrays(np.asarray(xs)[:, None, None] + offsets[None, None, :],
+                                     np.asarray(ys)[:, None, None] + offsets[None, :, None])
+        xs, ys = xs.ravel(), ys.ravel()
+        inside = (xs >= left) & (xs < right) & (ys >= top) & (ys < bottom) # Отсечение по границам буфера
+        ox, oy = self.origin
+        self.paint(target_buffer, ys[inside] - oy, xs[inside] - ox, color)
+
+    def draw_lines(self, segments, color, width=1, pixel_buffer=None):
+        # Пакетная отрисовка отрезков (N, 4) алгоритмом Брезенхэма: все пиксели пишутся за одно присваивание
+        if width > 1: # Толстые отрезки - настоящая обводка вместо штамповки квадратов
+            self.fill_polygons(Stroke.segment_polygons(segments, width), color, pixel_buffer)
+            return
+        xs, ys = self.line_pixels(segments)
+        self.plot_pixels(xs, ys, color, width, pixel_buffer)
+
+    @staticmethod
+    def convex_spans(polygons):
+        # Отрезки заливки сразу для множества выпуклых многоугольников (кусков обводки) средствами NumPy.
+        # Выпуклый многоугольник пересекает сканлайн по одному отрезку, поэтому достаточно
+        # найти минимум и максимум пересечений ребер для каждой пары (многоугольник, y)
+        polygons = [np.asarray(polygon, dtype=float).reshape(-1, 2) for polygon in polygons]
+        polygons = [polygon for polygon in polygons if len(polygon) >= 3]
+        if not polygons:
+            return []
+        sizes = np.array([len(polygon) for polygon in polygons])
+        p1 = np.concatenate(polygons)
+        poly_id = np.repeat(np.arange(len(polygons)), sizes)
+        first = np.repeat(np.cumsum(sizes) - sizes, sizes)
+        local = np.arange(len(p1)) - first
+        p2 = p1[first + (local + 1) % sizes[poly_id]] # Следующая вершина с замыканием
+
+        # Ребро пересекает сканлайны y, для которых ymin <= y < ymax
+        lo = np.where((p1[:, 1] <= p2[:, 1])[:, None], p1, p2)
+        hi = np.where((p1[:, 1] <= p2[:, 1])[:, None], p2, p1)
+        y_first = np.ceil(lo[:, 1]).astype(np.int64)
+        counts = np.maximum(np.ceil(hi[:, 1]).astype(np.int64) - y_first, 0)
+        if counts.sum() == 0:
+            return []
+        edge = np.repeat(np.arange(len(p1)), counts)
+        step = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        ys = y_first[edge] + step
+        inv_slope = (hi[edge, 0] - lo[edge, 0]) / (hi[edge, 1] - lo[edge, 1])
+        xs = lo[edge, 0] + inv_slope * (ys - lo[edge, 1])
+
+        # Группировка пересечений по (многоугольник, y): минимум - левая, максимум - правая граница
+        order = np.lexsort((ys, poly_id[edge]))
+        ys, xs, owner = ys[order], xs[order], poly_id[edge][order]
+        group_start = np.flatnonzero(np.concatenate([[True], (ys[1:] != ys[:-1]) | (owner[1:] != owner[:-1])]))
+        x_left = np.minimum.reduceat(xs, group_start)
+        x_right = np.maximum.reduceat(xs, group_start)
+        # Пиксель x внутри, если x_левое <= x < x_правое
+        x_start = np.ceil(x_left - 1e-9).astype(np.int64)
+        x_end = np.ceil(x_right - 1e-9).astype(np.int64) - 1
+        valid = x_start <= x_end
+        return list(zip(ys[group_start][valid].tolist(), x_start[valid].tolist(), x_end[valid].tolist()))
+
+    def fill_polygons(self, polygons, color, pixel_buffer=None):
+        # Заливка набора выпуклых (возможно перекрывающихся) многоугольников за один проход:
+        # отрезки всех многоугольников объединяются, и каждый пиксель пишется один раз
+        self.fill_spans(self.merge_spans(self.convex_spans(polygons)), color, pixel_buffer)
+
+    def stroke_polyline(self, points, color, width, closed=False, join="round", cap="round", pixel_buffer=None):
+        # Обводка ломаной толщиной width: контур строится в Stroke, затем заливается построчно
+        polygons = Stroke.polygons(self.as_xy(points), width, closed=closed, join=join, cap=cap)
+        self.fill_polygons(polygons, color, pixel_buffer)
+
+    def wu_line(self, p0, p1, color, pixel_buffer=None):
+        """Алгоритм Ву для сглаженных линий"""
+        # Один отрезок - ломаная из двух точек
+        self.wu_polyline([p0, p1], color, pixel_buffer)
+
+    @staticmethod
+    def wu_samples(segments):
+        """Покрытия пикселей по алгоритму Ву для всех отрезков (N, 4) сразу"""
+        seg = np.asarray(segments, dtype=float).reshape(-1, 4)
+        x0, y0, x1, y1 = seg.T
+
+        # Для "крутых" отрезков оси меняются местами, чтобы шагать по главной оси
+        steep = np.abs(y1 - y0) > np.abs(x1 - x0)
+        x0, y0 = np.where(steep, y0, x0), np.where(steep, x0, y0)
+        x1, y1 = np.where(steep, y1, x1), np.where(steep, x1, y1)
+        # Отрезок всегда идет слева направо по главной оси
+        back = x0 > x1
+        x0, x1 = np.where(back, x1, x0), np.where(back, x0, x1)
+        y0, y1 = np.where(back, y1, y0), np.where(back, y0, y1)
+
+        dx = x1 - x0
+        dy = y1 - y0
+        gradient = np.where(dx != 0, dy / np.where(dx != 0, dx, 1), 1.0)
+
+        # Первая и вторая конечные точки: по два пикселя с весом, ослабленным на xgap
+        xend1 = np.rint(x0)
+        yend1 = y0 + gradient * (xend1 - x0)
+        xgap1 = 1 - np.mod(x0 + 0.5, 1)
+        xend2 = np.rint(x1)
+        yend2 = y1 + gradient * (xend2 - x1)
+        xgap2 = np.mod(x1 + 0.5, 1)
+        end_x = np.concatenate([xend1, xend1, xend2, xend2])
+        end_y = np.concatenate([np.floor(yend1), np.floor(yend1) + 1, np.floor(yend2), np.floor(yend2) + 1])
+        end_a = np.concatenate([(1 - np.mod(yend1, 1)) * xgap1, np.mod(yend1, 1) * xgap1,
+                                (1 - np.mod(yend2, 1)) * xgap2, np.mod(yend2, 1) * xgap2])
+        end_steep = np.tile(steep, 4)
+
+        # Основной цикл: x от xend1 + 1 до xend2 - 1, по два пикселя на столбец
+        counts = np.maximum(xend2 - xend1 - 1, 0).astype(np.int64)
+        seg_index = np.repeat(np.arange(len(seg)), counts)
+        starts = np.cumsum(counts) - counts
+        step = np.arange(counts.sum()) - np.repeat(starts, counts)
+        g = gradient[seg_index]
+        intery = yend1[seg_index] + g + g * step # Точка пересечения с идеальной линией
+        main_x = xend1[seg_index] + 1 + step
+        main_y = np.floor(intery) # Целая часть вниз (как и np.mod) - верно и для отрицательных координат
+        frac = np.mod(intery, 1)
+        main_steep = steep[seg_index]
+
+        xs = np.concatenate([end_x, main_x, main_x])
+        ys = np.concatenate([end_y, main_y, main_y + 1])
+        alpha = np.concatenate([end_a, 1 - frac, frac])
+        steep_all = np.concatenate([end_steep, main_steep, main_steep])
+        # Возврат к исходным осям для "крутых" отрезков
+        xs, ys = np.where(steep_all, ys, xs), np.where(steep_all, xs, ys)
+        return xs.astype(np.int64), ys.astype(np.int64), alpha
+
+    def blend_pixels(self, xs, ys, alpha, color, pixel_buffer=None):
+        # Смешивание цвета с буфером по весам покрытия за один проход.
+        # Веса одного и того же пикселя сначала суммируются (с ограничением 1), поэтому
+        # общие вершины соседних отрезков не смешиваются дважды
+        target_buffer = pixel_buffer if pixel_buffer is not None else self.pixels
+        width = target_buffer.shape[1]
+        left, top, right, bottom = self.writable_area(target_buffer)
+        inside = (xs >= left) & (xs < right) & (ys >= top) & (ys < bottom) & (alpha > 0)
+        if not inside.any():
+            return
+        ox, oy = self.origin
+        flat = (ys[inside] - oy) * width + (xs[inside] - ox)
+        cells, inverse = np.unique(flat, return_inverse=True)
+        coverage = np.minimum(np.bincount(inverse, weights=alpha[inside]), 1.0)
+        cy, cx = np.divmod(cells, width)
+        color = Color.parse(color)
+        # Прозрачность цвета ослабляет покрытие; непрозрачность квантуется до байта, как в тайлах RGBA
+        opacity = np.rint(coverage * color.a).astype(np.int64)
+        keep = opacity > 0
+        cy, cx = cy[keep], cx[keep]
+        self.mark(target_buffer, cy, cx)
+        target_buffer[cy, cx] = self.painted(target_buffer[cy, cx], color.rgb, opacity[keep])
+
+    def wu_polyline(self, points, color, pixel_buffer=None):
+        # Сглаженная ломаная (алгоритм Ву) по всем точкам сразу: веса считаются в NumPy,
+        # а смешивание с буфером выполняется одним накопительным проходом
+        if len(points) < 2:
+            return
+        xs, ys, alpha = self.wu_samples(self.polyline_segments(points))
+        self.blend_pixels(xs, ys, alpha, color, pixel_buffer)
+
+    @staticmethod
+    def as_xy(points):
+        # Координаты вершин в виде массива (N, 2): принимает список Point, PointArray или готовый массив
+        if isinstance(points, PointArray):
+            return points.xy
+        if isinstance(points, np.ndarray):
+            return points.reshape(-1, 2)
+        return np.array([(p.x, p.y) for p in points], dtype=float).reshape(-1, 2)
+
+    @staticmethod
+    def pen_offsets(width):
+        # Смещения квадрата пера put_pixel: range(-width // 2, width - width // 2)
+        # (-width // 2 округляется вниз, поэтому перо ширины 1 занимает квадрат 2x2 влево-вверх)
+        return -width // 2, width - width // 2
+
+    def fill_spans(self, spans, color, pixel_buffer=None, width=None):
+        # Запись горизонтальных отрезков (y, x_start, x_end) с включительными границами.
+        # width=None - ровно пиксели отрезка; число - пером put_pixel этой ширины.
+        # Каждый отрезок записывается одним присваиванием двумерного среза вместо попиксельных вызовов
+        target_buffer = pixel_buffer if pixel_buffer is not None else self.pixels
+        left, top, right, bottom = self.writable_area(target_buffer)
+        color = Color.parse(color) # Строка разбирается один раз на весь вызов
+        lo, hi = self.pen_offsets(width) if width is not None else (0, 1)
+        ox, oy = self.origin
+        if not color.is_opaque and hi - lo > 1:
+            # Прямоугольники пера соседних отрезков перекрываются - для полупрозрачного цвета
+            # они раскладываются на строки и объединяются, чтобы каждый пиксель смешивался один раз
+            spans = self.merge_spans((y + dy, x_start + lo, x_end + hi - 1)
+                                     for y, x_start, x_end in spans for dy in range(lo, hi))
+            lo, hi = 0, 1
+        for y, x_start, x_end in spans:
+            # Отсечение прямоугольника пера по границам буфера
+            y0, y1 = max(y + lo, top), min(y + hi, bottom)
+            x0, x1 = max(x_start + lo, left), min(x_end + hi, right)
+            if y0 < y1 and x0 < x1:
+                self.paint(target_buffer, slice(y0 - oy, y1 - oy), slice(x0 - ox, x1 - ox), color)
+
+    @staticmethod
+    def merge_spans(spans):
+        # Объединение перекрывающихся и смежных отрезков одной строки (каждый пиксель - ровно один раз)
+        merged = []
+        for y, x_start, x_end in sorted(spans):
+            if merged and merged[-1][0] == y and x_start <= merged[-1][2] + 1:
+                if x_end > merged[-1][2]:
+                    merged[-1][2] = x_end
+            else:
+                merged.append([y, x_start, x_end])
+        return [tuple(span) for span in merged]
+
+    @staticmethod
+    def polygon_spans(points, centers=False):
+        # Отрезки заливки одного многоугольника
+        return FrameBuffer.contour_spans([points], centers)
+
+    @staticmethod
+    def contour_spans(contours, centers=False, rows=None):
+        # Построение отрезков заливки многоконтурного многоугольника (правило четности,
+        # поэтому внутренние контуры - это дыры) с помощью таблицы активных ребер (AET).
+        # Возвращает список (y, x_start, x_end) с включительными границами.
+        # centers=False - границы округляются, как в исходном scanline_fill;
+        # centers=True - берутся только пиксели, центр которых лежит внутри (для многоугольников с дробными вершинами).
+        # rows=(y_first, y_last) - строятся только сканлайны этого диапазона (видимая часть фигуры)
+        contours = [FrameBuffer.as_xy(contour) for contour in contours]
+        contours = [contour for contour in contours if len(contour)]
+        if not contours:
+            return []
+        xy = np.concatenate(contours)
+
+        # Ребра: (p_i, p_{i+1}) с замыканием каждого контура
+        p1 = xy
+        p2 = np.concatenate([np.roll(contour, -1, axis=0) for contour in contours])
+        keep = p1[:, 1] != p2[:, 1] # Горизонтальные ребра не пересекают сканлайны
+        p1, p2 = p1[keep], p2[keep]
+        swap = p1[:, 1] > p2[:, 1] # Нижняя точка ребра - первая
+        lo = np.where(swap[:, None], p2, p1)
+        hi = np.where(swap[:, None], p1, p2)
+        inv_slope = (hi[:, 0] - lo[:, 0]) / (hi[:, 1] - lo[:, 1]) # 1/m = dx/dy
+
+        # Глобальная таблица ребер, упорядоченная по ymin
+        order = np.argsort(lo[:, 1], kind="stable")
+        edge_ymin = lo[order, 1].tolist()
+        edge_ymax = hi[order, 1].tolist()
+        edge_x = lo[order, 0].tolist()
+        edge_inv = inv_slope[order].tolist()
+        edge_count = len(edge_ymin)
+
+        spans = []
+        active = [] # Таблица активных ребер: индексы ребер, пересекающих текущий сканлайн
+        next_edge = 0
+        y_start = int(np.ceil(xy[:, 1].min()))
+        y_end = int(np.floor(xy[:, 1].max()))
+        if rows is not None:
+            y_start, y_end = max(y_start, rows[0]), min(y_end, rows[1])
+        for y in range(y_start, y_end + 1):
+            # Добавляем ребра, начинающиеся на этом сканлайне или ниже
+            while next_edge < edge_count and edge_ymin[next_edge] <= y:
+                active.append(next_edge)
+                next_edge += 1
+            # Удаляем ребра, верхняя точка которых уже пройдена (ymin <= y < ymax)
+            active = [k for k in active if edge_ymax[k] > y]
+            if len(active) < 2:
+                continue
+
+            # Пересечения сканлайна с активными ребрами: x = x_0 + (dx/dy) * (y - y_0)
+            intersections = sorted(edge_x[k] + edge_inv[k] * (y - edge_ymin[k]) for k in active)
+            for i in range(0, len(intersections) - 1, 2): # Попарная заливка
+                if centers: # Пиксель x внутри, если x_левое <= x < x_правое
+                    x_start = int(np.ceil(intersections[i] - 1e-9))
+                    x_end = int(np.ceil(intersections[i + 1] - 1e-9)) - 1
+                    if x_start <= x_end:
+                        spans.append((y, x_start, x_end))
+                else:
+                    spans.append((y, int(round(intersections[i])), int(round(intersections[i + 1]))))
+        return spans
+
+    @staticmethod
+    def polygon_coverage(points):
+        # Покрытие одного многоугольника
+        return FrameBuffer.contours_coverage([points])
+
+    @staticmethod
+    def contours_coverage(contours):
+        # Покрытие многоугольника в виде серий пикселей (SpanShape).
+        # Покрыты те же пиксели, что закрашивает scanline_fill: заливка и контур пером ширины 1
+        return FrameBuffer.fill_shape(contours).union(FrameBuffer.outline_shape(contours))
+
+    @staticmethod
+    def fill_shape(contours, rows=None):
+        # Пиксели заливки многоугольника: отрезки сканлайнов, расширенные пером put_pixel ширины 1.
+        # rows=(y0, y1) - нужны только строки y0 <= y < y1: строятся лишь сканлайны, которые перо до них расширяет
+        lo, hi = FrameBuffer.pen_offsets(1)
+        if rows is not None:
+            rows = rows[0] - hi + 1, rows[1] - lo - 1
+        return SpanShape.from_spans(FrameBuffer.contour_spans(contours, rows=rows)).dilate(lo, hi)
+
+    @staticmethod
+    def outline_shape(contours):
+        # Пиксели контура многоугольника: Брезенхэм по всем ребрам пером ширины 1
+        xs, ys = FrameBuffer.line_pixels(FrameBuffer.contour_segments(contours))
+        return SpanShape.from_pixels(xs, ys).dilate(*FrameBuffer.pen_offsets(1))
+
+    @staticmethod
+    def stroke_coverage(points, width, closed=False, join="round", cap="round"):
+        # Покрытие обводки ломаной: те же пиксели, что рисуют stroke_polyline (толстая линия)
+        # или Брезенхэм пером ширины 1 (тонкая линия)
+        xy = FrameBuffer.as_xy(points)
+        if width > 1:
+            return SpanShape.from_spans(FrameBuffer.convex_spans(Stroke.polygons(xy, width, closed=closed, join=join, cap=cap)))
+        xs, ys = FrameBuffer.line_pixels(FrameBuffer.polyline_segments(xy, closed=closed))
+        return SpanShape.from_pixels(xs, ys).dilate(*FrameBuffer.pen_offsets(1))
+
+    def blit(self, shape, color, pixel_buffer=None):
+        # Вывод формы из серий: каждая серия - одно присваивание среза строки
+        spans = zip(shape.ys.tolist(), shape.x0s.tolist(), (shape.x1s - 1).tolist())
+        self.fill_spans(spans, color, pixel_buffer)
+
+    @staticmethod
+    def contour_segments(contours):
+        # Ребра всех замкнутых контуров одним массивом (N, 4)
+        segments = [FrameBuffer.polyline_segments(contour, closed=True) for contour in contours if len(contour)]
+        return np.concatenate(segments) if segments else np.zeros((0, 4))
+
+    # Алгоритм Scanline для закрашивания полигона
+    def scanline_fill(self, points, outline_color, fill_color, pixel_buffer=None):
+        return self.scanline_fill_contours([points], outline_color, fill_color, pixel_buffer)
+
+    def scanline_fill_contours(self, contours, outline_color, fill_color, pixel_buffer=None):
+        # Заливка многоконтурного многоугольника (с дырами) и обводка всех его контуров
+        if not any(len(contour) for contour in contours): # Нет точек - нет полигона
+            return SpanShape()
+
+        # Заливка строится как форма из серий (отрезки, расширенные пером put_pixel ширины 1)
+        # и выводится целыми срезами массива, а не попиксельно. Сканлайны строятся только для строк
+        # области записи: у фигуры, обрезанной тайлом или поврежденной областью, остальные не нужны
+        target_buffer = pixel_buffer if pixel_buffer is not None else self.pixels
+        _, top, _, bottom = self.writable_area(target_buffer)
+        shape = self.fill_shape(contours, rows=(top, bottom))
+        self.blit(shape, fill_color, pixel_buffer)
+
+        # Контур полигона поверх заливки - все ребра одним пакетом
+        self.draw_lines(self.contour_segments(contours), outline_color, pixel_buffer=pixel_buffer)
+        return shape # Форма заливки в пределах строк области записи
+
+
+# Кадровый буфер документа большого размера из тайлов фиксированного размера (по умолчанию 256x256).
+# Тайл - обычный FrameBuffer со сдвигом origin; он выделяется, только когда в него что-то рисуется,
+# а отсутствующий тайл означает белый фон. Память пропорциональна занятой части документа, поэтому
+# документ 20000x20000 (1.2 ГБ в плотном виде) помещается в память. Отслеживание объектов, повреждения
+# и перетаскивание унаследованы от FrameBuffer - заменены только операции с пикселями: объект выводится
+# лишь в тайлы, пересекающие его габариты, и запись каждого растеризатора отсекается по тайлу.
+# Плотного массива pixels нет: области читаются через read.
+# Для просмотра в уменьшенном масштабе буфер хранит пирамиду уменьшенных копий: тайл уровня level
+# (1 пиксель на 2**level x 2**level пикселей документа) строится усреднением четырех тайлов предыдущего
+# уровня при первом чтении и кэшируется до записи в любой из тайлов документа под ним
+class TiledFrameBuffer(FrameBuffer):
+    def __init__(self, width, height, tile_size=256, ids=False):
+        self.tile_size = tile_size # Сторона тайла в пикселях
+        self.tiles = {} # (столбец, строка) -> FrameBuffer тайла; только выделенные тайлы
+        self.mipmaps = {} # (уровень, столбец, строка) -> пиксели тайла уровня (None - тайл белый)
+        super().__init__(width, height, ids=ids)
+
+    def allocate(self, channels):
+        return None
+
+    def allocate_ids(self):
+        return None # Номера хранят тайлы
+
+    def level_size(self, level):
+        # Размер уровня пирамиды в пикселях (уровень 0 - документ)
+        step = 1 << level
+        return (self.width + step - 1) // step, (self.height + step - 1) // step
+
+    def tile_range(self, rect, level=0):
+        # Индексы (столбец, строка) тайлов, пересекающих прямоугольник в пределах документа (уровня)
+        width, height = self.level_size(level)
+        x0, y0, x1, y1 = rect
+        x0, y0, x1, y1 = max(x0, 0), max(y0, 0), min(x1, width), min(y1, height)
+        if x0 >= x1 or y0 >= y1:
+            return []
+        size = self.tile_size
+        return [(tx, ty) for ty in range(y0 // size, (y1 - 1) // size + 1)
+                for tx in range(x0 // size, (x1 - 1) // size + 1)]
+
+    def tile_area(self, key, level=0):
+        # Область тайла (x0, y0, x1, y1) в координатах документа или уровня (крайние тайлы могут быть меньше)
+        width, height = self.level_size(level)
+        tx, ty = key
+        x0, y0 = tx * self.tile_size, ty * self.tile_size
+        return x0, y0, min(x0 + self.tile_size, width), min(y0 + self.tile_size, height)
+
+    def before_write(self, key):
+        # Перед записью в тайл. Во время перетаскивания фоновый слой хранит копии тайлов, сделанные перед
+        # первой записью в них после begin_drag (None - тайл был пустым): нетронутые тайлы не копируются.
+        # Уменьшенные копии над тайлом устаревают. Уровень кэшируется только вместе со всеми уровнями
+        # ниже него, поэтому подъем останавливается на первом отсутствующем уровне
+        if self.background is not None and key not in self.background:
+            tile = self.tiles.get(key)
+            self.background[key] = tile.snapshot() if tile is not None else None
+        tx, ty = key
+        level = 1
+        while self.mipmaps.pop((level, tx >> level, ty >> level), False) is not False:
+            level += 1
+
+    def tile(self, key):
+        # Тайл для записи; выделяется при первом обращении
+        self.before_write(key)
+        tile = self.tiles.get(key)
+        if tile is None:
+            x0, y0, x1, y1 = self.tile_area(key)
+            tile = FrameBuffer(x1 - x0, y1 - y0, origin=(x0, y0), ids=self.ids_enabled)
+            tile.sprites = self.sprites # Кэш растров общий для всех тайлов
+            self.tiles[key] = tile
+        return tile
+
+    def allocated_bytes(self):
+        # Память, занятая пикселями (и номерами) выделенных тайлов
+        return sum(tile.pixels.nbytes + (tile.ids.nbytes if tile.ids is not None else 0) for tile in self.tiles.values())
+
+    def clear(self):
+        # Все тайлы освобождаются: документ снова белый
+        self.tiles = {}
+        self.mipmaps = {}
+
+    def clear_rect(self, rect):
+        for key in self.tile_range(rect):
+            if key not in self.tiles: # Пустой тайл уже белый
+                continue
+            area = self.tile_area(key)
+            x0, y0, x1, y1 = self.overlap(area, rect)
+            self.before_write(key)
+            if (x0, y0, x1, y1) == area: # Тайл очищен целиком - он освобождается
+                del self.tiles[key]
+            else:
+                self.tiles[key].clear_rect((x0 - area[0], y0 - area[1], x1 - area[0], y1 - area[1]))
+
+    def save_background(self):
+        self.background = {} # Копии тайлов снимаются лениво (before_write)
+
+    def restore_background(self, rect):
+        for key in self.tile_range(rect):
+            if key not in self.background: # Тайл не менялся с начала перетаскивания
+                continue
+            self.before_write(key)
+            area = self.tile_area(key)
+            x0, y0, x1, y1 = self.overlap(area, rect)
+            local = (x0 - area[0], y0 - area[1], x1 - area[0], y1 - area[1])
+            saved = self.background[key]
+            if saved is not None:
+                pixels, ids = saved
+                tile = self.tile(key)
+                rows, cols = slice(local[1], local[3]), slice(local[0], local[2])
+                tile.pixels[rows, cols] = pixels[rows, cols]
+                if ids is not None:
+                    tile.ids[rows, cols] = ids[rows, cols]
+            elif key in self.tiles:
+                self.tiles[key].clear_rect(local)
+
+    def level_tile(self, level, key):
+        # Пиксели тайла уровня пирамиды (None - белый). Уровень 0 - тайлы документа, уровень n - среднее
+        # по квадратам 2x2 пикселей четырех тайлов уровня n - 1 (за краем документа - белый фон)
+        if level == 0:
+            tile = self.tiles.get(key)
+            return tile.pixels if tile is not None else None
+        cached = self.mipmaps.get((level, *key), False)
+        if cached is not False:
+            return cached
+        tx, ty = key
+        half = self.tile_size // 2
+        block = None
+        for dy in (0, 1):
+            for dx in (0, 1):
+                child = self.level_tile(level - 1, (2 * tx + dx, 2 * ty + dy))
+                if child is None:
+                    continue
+                if block is None:
+                    x0, y0, x1, y1 = self.tile_area(key, level)
+                    block = np.full((y1 - y0, x1 - x0, 3), 255, dtype=np.uint8)
+                height, width = child.shape[0], child.shape[1]
+                if height % 2 or width % 2: # Край документа нечетного размера дополняется белым
+                    padded = np.full((height + height % 2, width + width % 2, 3), 255, dtype=np.uint8)
+                    padded[:height, :width] = child
+                    child = padded
+                # Среднее по квадратам 2x2 с округлением: четыре прореженных среза складываются в uint16
+                total = child[0::2, 0::2].astype(np.uint16)
+                total += child[1::2, 0::2]
+                total += child[0::2, 1::2]
+                total += child[1::2, 1::2]
+                total += 2
+                total >>= 2
+                block[dy * half:dy * half + total.shape[0], dx * half:dx * half + total.shape[1]] = total
+        self.mipmaps[(level, tx, ty)] = block
+        return block
+
+    def id_at(self, x, y):
+        tile = self.tiles.get((x // self.tile_size, y // self.tile_size))
+        return tile.id_at(x, y) if tile is not None else 0
+
+    def read(self, rect, level=0):
+        # Новый массив RGB прямоугольника документа (или уровня пирамиды level): пиксели выделенных тайлов
+        # на белом фоне
+        x0, y0, x1, y1 = rect
+        region = np.full((y1 - y0, x1 - x0, 3), 255, dtype=np.uint8)
+        for key in self.tile_range(rect, level):
+            pixels = self.level_tile(level, key)
+            if pixels is None:
+                continue
+            area = self.tile_area(key, level)
+            tx, ty = area[0], area[1]
+            ax0, ay0, ax1, ay1 = self.overlap(area, rect)
+            region[ay0 - y0:ay1 - y0, ax0 - x0:ax1 - x0] = pixels[ay0 - ty:ay1 - ty, ax0 - tx:ax1 - tx]
+        return region
+
+    def draw_object(self, obj):
+        # Вывод объекта в тайлы, пересекающие его габариты (в пределах отсечения)
+        sprite, bounds = self.object_sprite(obj)
+        if bounds is None: # Пустой объект - рисовать нечего
+            return
+        area = (0, 0, self.width, self.height) if self.clip_rect is None else self.clip_rect
+        area = self.overlap(area, (0, 0, self.width, self.height))
+        area = self.overlap(area, bounds) if area is not None else None
+        if area is None:
+            return
+        keys = self.tile_range(area)
+        x, y = bounds[0], bounds[1]
+        number = self.object_number(obj)
+        if sprite is None and len(keys) > 1:
+            # Объект на нескольких тайлах растеризуется один раз - в растр видимой части габаритов
+            x0, y0, x1, y1 = area
+            canvas = FrameBuffer(x1 - x0, y1 - y0, origin=(x0, y0), channels=4)
+            obj.draw(canvas)
+            sprite, x, y = Sprite(canvas.pixels), x0, y0
+        for key in keys:
+            tile = self.tile(key)
+            tile.clip_rect = area
+            tile.current_id = number
+            try:
+                if sprite is None:
+                    obj.draw(tile)
+                else:
+                    tile.draw_sprite(sprite, x, y)
+            finally:
+                tile.clip_rect = None
@@ -0,0 +1,57 @@
+import math
+import time
+
+
+# Планировщик кадров для обработчиков событий Tk.
+# Обработчик события только запоминает новое состояние (например, положение курсора) и запрашивает кадр;
+# сколько бы событий ни пришло до кадра, отрисовка выполняется один раз - по последнему состоянию.
+# Кадр запускается через after_idle, то есть после обработки уже пришедших событий, и не чаще одного раза
+# за frame_budget миллисекунд (для этого используется after с задержкой)
+class FrameScheduler:
+    def __init__(self, widget, render, frame_budget=16):
+        self.widget = widget # Виджет Tk, через который ставятся отложенные вызовы (after, after_idle)
+        self.render = render # Функция отрисовки кадра (без аргументов)
+        self.frame_budget = frame_budget # Время кадра в мс: кадры выводятся не чаще одного раза за этот интервал
+        self.pending = None # id отложенного вызова ожидающего кадра (None - кадр не запрошен)
+        self.last_frame = None # Время начала последнего кадра (perf_counter)
+        self.last_duration = 0.0 # Длительность отрисовки последнего кадра, мс
+        self.requests = 0 # Число запросов кадра (обычно - число событий)
+        self.frames = 0 # Число отрисованных кадров
+
+    def request(self):
+        # Запрос кадра. Если кадр уже ожидает вывода, запрос сливается с ним
+        self.requests += 1
+        if self.pending is not None:
+            return
+        wait = 0
+        if self.last_frame is not None:
+            wait = self.frame_budget - (time.perf_counter() - self.last_frame) * 1000
+        if wait > 0: # Прошлый кадр был недавно - ждем конца интервала
+            self.pending = self.widget.after(int(math.ceil(wait)), self.run)
+        else: # Кадр выводится, как только очередь событий опустеет
+            self.pending = self.widget.after_idle(self.run)
+
+    def run(self):
+        # Отрисовка кадра по последнему запомненному состоянию
+        self.pending = None
+        self.last_frame = time.perf_counter()
+        self.render()
+        self.last_duration = (time.perf_counter() - self.last_frame) * 1000
+        self.frames += 1
+
+    def flush(self):
+        # Немедленный вывод ожидающего кадра (например, при отпускании кнопки мыши)
+        if self.pending is not None:
+            self.widget.after_cancel(self.pending)
+            self.run()
+
+    def cancel(self):
+        # Отмена ожидающего кадра без отрисовки
+        if self.pending is not None:
+            self.widget.after_cancel(self.pending)
+            self.pending = None
+
+    def stats(self):
+        # Сводка для отладки и подбора frame_budget
+        return {"requests": self.requests, "frames": self.frames, "coalesced": self.requests - self.frames,
+                "last_frame_ms": self.last_duration, "frame_budget_ms": self.frame_budget}
@@ -0,0 +1,144 @@
+import numpy as np
+
+
+# Закрашенная форма в виде серий пикселей (run-length): для каждой строки y - отсортированные
+# непересекающиеся полуинтервалы [x0, x1). Хранится тремя массивами int32, поэтому форма 1000x1000
+# занимает килобайты (по 12 байт на серию), а не мегабайты, как маска или пиксельный буфер.
+# ТМО выполняются над сериями, а не над пикселями: их стоимость зависит от числа серий.
+class SpanShape:
+    def __init__(self, ys=(), x0s=(), x1s=()):
+        # Массивы должны быть нормализованы: упорядочены по (y, x0), без перекрытий и стыков внутри строки
+        self.ys = np.asarray(ys, dtype=np.int32) # Номера строк
+        self.x0s = np.asarray(x0s, dtype=np.int32) # Начала серий (включительно)
+        self.x1s = np.asarray(x1s, dtype=np.int32) # Концы серий (не включительно)
+
+    @staticmethod
+    def normalized(ys, x0s, x1s):
+        # Форма из произвольного набора серий: сортировка и слияние перекрывающихся и смежных серий строки
+        ys, x0s, x1s = (np.asarray(a, dtype=np.int64).ravel() for a in (ys, x0s, x1s))
+        keep = x0s < x1s
+        ys, x0s, x1s = ys[keep], x0s[keep], x1s[keep]
+        if len(ys) == 0:
+            return SpanShape()
+        order = np.lexsort((x0s, ys))
+        ys, x0s, x1s = ys[order], x0s[order], x1s[order]
+        # Сквозной ключ (строка, x) позволяет найти накопленный максимум концов без цикла по строкам
+        row_key = (ys - ys[0]) << 32
+        reach = np.maximum.accumulate(row_key + x1s + 2**31)
+        start = np.concatenate([[True], row_key[1:] + x0s[1:] + 2**31 > reach[:-1]]) # Серия не касается предыдущих
+        first = np.flatnonzero(start)
+        return SpanShape(ys[first], x0s[first], np.maximum.reduceat(x1s, first))
+
+    @staticmethod
+    def from_spans(spans):
+        # Форма из отрезков (y, x_start, x_end) с включительными границами (формат polygon_spans)
+        spans = np.asarray(list(spans), dtype=np.int64).reshape(-1, 3)
+        return SpanShape.normalized(spans[:, 0], spans[:, 1], spans[:, 2] + 1)
+
+    @staticmethod
+    def from_pixels(xs, ys):
+        # Форма из набора отдельных пикселей (соседние пиксели строки сливаются в серии)
+        xs = np.asarray(xs, dtype=np.int64)
+        return SpanShape.normalized(ys, xs, xs + 1)
+
+    @staticmethod
+    def from_mask(mask, origin=(0, 0)):
+        # Форма из 1-битной маски, левый верхний угол которой лежит в точке origin холста
+        x0, y0 = origin
+        if mask.size == 0:
+            return SpanShape()
+        padded = np.zeros((mask.shape[0], mask.shape[1] + 2), dtype=np.int8)
+        padded[:, 1:-1] = mask
+        step = np.diff(padded, axis=1)
+        rows, starts = np.nonzero(step == 1) # Начала серий (порядок - по строкам, затем по x)
+        _, ends = np.nonzero(step == -1) # Концы серий в том же порядке
+        return SpanShape(rows + y0, starts + x0, ends + x0)
+
+    def to_mask(self):
+        # Маска в габаритах формы: (mask, (x0, y0))
+        box = self.bbox()
+        if box is None:
+            return np.zeros((0, 0), dtype=bool), (0, 0)
+        x0, y0, x1, y1 = box
+        mask = np.zeros((y1 - y0, x1 - x0), dtype=bool)
+        for y, start, end in zip(self.ys.tolist(), self.x0s.tolist(), self.x1s.tolist()):
+            mask[y - y0, start - x0:end - x0] = True
+        return mask, (x0, y0)
+
+    def spans(self):
+        # Отрезки (y, x_start, x_end) с включительными границами (для FrameBuffer.fill_spans)
+        return list(zip(self.ys.tolist(), self.x0s.tolist(), (self.x1s - 1).tolist()))
+
+    def bbox(self):
+        # Габариты (x0, y0, x1, y1), правая и нижняя границы не включаются; None для пустой формы
+        if self.is_empty():
+            return None
+        return int(self.x0s.min()), int(self.ys[0]), int(self.x1s.max()), int(self.ys[-1]) + 1
+
+    def is_empty(self):
+        return len(self.ys) == 0
+
+    def area(self):
+        # Число закрашенных пикселей
+        return int(np.sum(self.x1s.astype(np.int64) - self.x0s))
+
+    @property
+    def nbytes(self):
+        # Объем памяти, занимаемый сериями
+        return self.ys.nbytes + self.x0s.nbytes + self.x1s.nbytes
+
+    def translate(self, dx, dy):
+        # Сдвинутая копия формы (порядок серий не меняется)
+        return SpanShape(self.ys + dy, self.x0s + dx, self.x1s + dx)
+
+    def dilate(self, lo, hi):
+        # Расширение квадратом пера со смещениями range(lo, hi) (как у put_pixel)
+        offsets = np.arange(lo, hi)
+        ys = (self.ys[:, None].astype(np.int64) + offsets[None, :]).ravel()
+        x0s = np.repeat(self.x0s.astype(np.int64) + lo, len(offsets))
+        x1s = np.repeat(self.x1s.astype(np.int64) + hi - 1, len(offsets))
+        return SpanShape.normalized(ys, x0s, x1s)
+
+    def contains(self, x, y):
+        # Попадание пикселя в форму: бинарный поиск серии по ключу (y, x)
+        keys = self.ys.astype(np.int64) << 32 | (self.x0s.astype(np.int64) + 2**31)
+        index = np.searchsorted(keys, (int(y) << 32) | (int(x) + 2**31), side="right") - 1
+        return index >= 0 and self.ys[index] == y and self.x0s[index] <= x < self.x1s[index]
+
+    def combine(self, other, predicate):
+        # ТМО по сериям: границы серий обеих форм - события на строке. После сортировки событий
+        # накопленные счетчики дают принадлежность A и B на каждом промежутке между соседними событиями,
+        # а промежуток попадает в результат, если для него выполняется predicate(in_a, in_b)
+        ys = np.concatenate([self.ys, self.ys, other.ys, other.ys]).astype(np.int64)
+        xs = np.concatenate([self.x0s, self.x1s, other.x0s, other.x1s]).astype(np.int64)
+        n, m = len(self.ys), len(other.ys)
+        delta_a = np.concatenate([np.ones(n), -np.ones(n), np.zeros(2 * m)]).astype(np.int64)
+        delta_b = np.concatenate([np.zeros(2 * n), np.ones(m), -np.ones(m)]).astype(np.int64)
+        if len(ys) == 0:
+            return SpanShape()
+        order = np.lexsort((xs, ys))
+        ys, xs = ys[order], xs[order]
+        # На конце строки счетчики возвращаются к нулю, поэтому общая накопленная сумма корректна
+        in_a = np.cumsum(delta_a[order]) > 0
+        in_b = np.cumsum(delta_b[order]) > 0
+        selected = predicate(in_a[:-1], in_b[:-1]) & (ys[1:] == ys[:-1]) & (xs[1:] > xs[:-1])
+        return SpanShape.normalized(ys[:-1][selected], xs[:-1][selected], xs[1:][selected])
+
+    def union(self, other):
+        return self.combine(other, lambda in_a, in_b: in_a | in_b)
+
+    def intersection(self, other):
+        return self.combine(other, lambda in_a, in_b: in_a & in_b)
+
+    def difference(self, other):
+        return self.combine(other, lambda in_a, in_b: in_a & ~in_b)
+
+    def __len__(self):
+        return len(self.ys) # Число серий
+
+    def __eq__(self, other):
+        return (isinstance(other, SpanShape) and np.array_equal(self.ys, other.ys)
+                and np.array_equal(self.x0s, other.x0s) and np.array_equal(self.x1s, other.x1s))
+
+    def __repr__(self):
+        return f"SpanShape(spans={len(self)}, area={self.area()}, bbox={self.bbox()})"
@@ -0,0 +1,151 @@
+import math
+import numpy as np
+from Render import FrameBuffer
+
+
+# Пространственный индекс объектов сцены для выбора кликом - равномерная сетка.
+# Объект записывается в ячейки, которые задевают его габариты, расширенные на допуск попадания; кривая Безье -
+# в ячейки габаритов каждого отрезка ломаной и каждой контрольной точки, с номерами отрезков по ячейкам.
+# Поэтому клик проверяет точно только объекты (и отрезки кривых) из одной ячейки - той, где лежит курсор.
+# Индекс подписан на изменения объектов (object_changed): преобразованный объект перезаписывается
+# при следующем запросе, добавление и удаление обновляют только ячейки этого объекта
+class SpatialIndex:
+    def __init__(self, cell_size=128, tolerance=10):
+        self.cell_size = cell_size # Сторона ячейки в пикселях
+        self.tolerance = tolerance # Допуск попадания (наибольший радиус проверки у объектов редактора)
+        self.records = {}
+        self.clear()
+
+    def clear(self):
+        # Пустой индекс
+        for record in self.records.values():
+            if self in record[0].observers:
+                record[0].observers.remove(self)
+        self.cells = {} # (столбец, строка) -> {id объекта: (строка boxes, номера отрезков кривой или None)}
+        self.records = {} # id объекта -> [объект, строка boxes, ячейки]
+        self.changed = set() # id объектов, изменившихся после записи в индекс
+        # Габариты с допуском и порядок наложения по строкам - как таблица габаритов FrameBuffer
+        self.boxes = np.zeros((64, 4), dtype=np.float64)
+        self.sequence = np.zeros(64, dtype=np.int64)
+        self.row_objects = [None] * 64
+        self.free_rows = list(range(63, -1, -1))
+        self.next_sequence = 0
+
+    def object_changed(self, obj):
+        # Уведомление от объекта (GraphicObject.notify): его ячейки пересчитываются при следующем запросе
+        self.changed.add(id(obj))
+
+    def add(self, obj):
+        # Новый объект поверх всех записанных
+        if not self.free_rows: # Увеличение таблицы вдвое
+            size = len(self.boxes)
+            self.boxes = np.vstack([self.boxes, np.zeros((size, 4))])
+            self.sequence = np.concatenate([self.sequence, np.zeros(size, dtype=np.int64)])
+            self.row_objects.extend([None] * size)
+            self.free_rows = list(range(2 * size - 1, size - 1, -1))
+        row = self.free_rows.pop()
+        self.row_objects[row] = obj
+        self.sequence[row] = self.next_sequence
+        self.next_sequence += 1
+        self.records[id(obj)] = [obj, row, []]
+        if self not in obj.observers:
+            obj.observers.append(self)
+        self.insert(obj)
+
+    def remove(self, obj):
+        # Удаление объекта из индекса
+        record = self.records.pop(id(obj), None)
+        if record is None:
+            return
+        self.erase(record)
+        self.row_objects[record[1]] = None
+        self.free_rows.append(record[1])
+        self.changed.discard(id(obj))
+        if self in obj.observers:
+            obj.observers.remove(self)
+
+    def rebuild(self, objects):
+        # Индекс заново по списку сцены (порядок списка - порядок наложения)
+        self.clear()
+        for obj in objects:
+            self.add(obj)
+
+    def sync(self, objects):
+        # Проверка соответствия списку сцены: список, измененный в обход add/remove (другой длины),
+        # индексируется заново. Изменившиеся объекты перезаписываются в ячейки
+        if len(objects) != len(self.records):
+            self.rebuild(objects)
+        while self.changed:
+            record = self.records.get(self.changed.pop())
+            if record is not None:
+                self.erase(record)
+                self.insert(record[0])
+
+    def cell_range(self, x0, y0, x1, y1):
+        # Ячейки, которые задевает прямоугольник (включительные границы)
+        size = self.cell_size
+        return [(cx, cy) for cy in range(math.floor(y0 / size), math.floor(y1 / size) + 1)
+                for cx in range(math.floor(x0 / size), math.floor(x1 / size) + 1)]
+
+    def insert(self, obj):
+        # Запись объекта в ячейки его габаритов (у кривых Безье - габаритов отрезков и контрольных точек)
+        record = self.records[id(obj)]
+        bounds = obj.bounds()
+        if bounds is None: # Пустой объект (например, пустой результат ТМО) не выбирается
+            return
+        margin = self.tolerance
+        x0, y0, x1, y1 = bounds # У кривой Безье габариты включают и контрольные точки
+        self.boxes[record[1]] = (x0 - margin, y0 - margin, x1 + margin, y1 + margin)
+        if hasattr(obj, "control_points"):
+            cells = self.segment_cells(obj)
+        else:
+            cells = dict.fromkeys(self.cell_range(*self.boxes[record[1]].tolist()))
+        for cell, segments in cells.items():
+            self.cells.setdefault(cell, {})[id(obj)] = (record[1], segments)
+        record[2] = list(cells)
+
+    def segment_cells(self, curve):
+        # Ячейки кривой Безье -> номера отрезков ломаной, габариты которых (с допуском) задевают ячейку.
+        # Ячейки контрольных точек входят с пустым набором отрезков: в них проверяются только точки
+        size, margin = self.cell_size, self.tolerance
+        xy = FrameBuffer.as_xy(curve.points)
+        cells = {}
+        if len(xy) >= 2:
+            low = np.floor((np.minimum(xy[:-1], xy[1:]) - margin) / size).astype(np.int64)
+            high = np.floor((np.maximum(xy[:-1], xy[1:]) + margin) / size).astype(np.int64)
+            for index, (cx0, cy0), (cx1, cy1) in zip(range(len(low)), low.tolist(), high.tolist()):
+                for cy in range(cy0, cy1 + 1):
+                    for cx in range(cx0, cx1 + 1):
+                        cells.setdefault((cx, cy), []).append(index)
+        for x, y in FrameBuffer.as_xy(curve.control_points).tolist():
+            for cell in self.cell_range(x - margin, y - margin, x + margin, y + margin):
+                cells.setdefault(cell, [])
+        return cells
+
+    def erase(self, record):
+        # Удаление объекта из его ячеек
+        object_id = id(record[0])
+        for cell in record[2]:
+            entries = self.cells.get(cell)
+            if entries is not None:
+                entries.pop(object_id, None)
+                if not entries:
+                    del self.cells[cell]
+        record[2] = []
+
+    def candidates(self, objects, x, y):
+        # Объекты, которые могут содержать точку (x, y), сверху вниз: (объект, номера отрезков или None).
+        # Для кривых Безье - только отрезки вблизи точки. Габариты всех объектов ячейки проверяются
+        # одной операцией NumPy, а кандидаты выдаются по одному: проверка останавливается на первом попадании
+        self.sync(objects)
+        size = self.cell_size
+        entries = self.cells.get((math.floor(x / size), math.floor(y / size)))
+        if not entries:
+            return
+        entries = list(entries.values())
+        rows = np.fromiter((row for row, _ in entries), dtype=np.int64, count=len(entries))
+        boxes = self.boxes[rows]
+        hits = np.flatnonzero((boxes[:, 0] <= x) & (x < boxes[:, 2]) & (boxes[:, 1] <= y) & (y < boxes[:, 3]))
+        for index in hits[np.argsort(-self.sequence[rows[hits]], kind="stable")].tolist():
+            row, segments = entries[index]
+            yield self.row_objects[row], segments
@@ -0,0 +1,102 @@
+import numpy as np
+from collections import OrderedDict
+
+
+# Растр одного объекта (спрайт), полученный из тайла RGBA (h, w, 4) с прозрачным фоном.
+# Плотный тайл (заливки) хранится целиком и выводится срезами; в разреженном (тонкие линии и кривые
+# с большими габаритами) хранятся только закрашенные пиксели, чтобы вывод и память не зависели от площади габаритов
+class Sprite:
+    def __init__(self, tile):
+        self.height, self.width = tile.shape[:2]
+        alpha = tile[..., 3]
+        painted = np.count_nonzero(alpha)
+        self.opaque = painted == np.count_nonzero(alpha == 255) # Нет полупрозрачных пикселей
+        self.dense = painted * 3 >= alpha.size # Индексы заняли бы больше памяти, чем сам тайл
+        if self.dense:
+            self.tile = tile
+            self.nbytes = tile.nbytes
+        else:
+            self.tile = None
+            rows, cols = np.divmod(np.flatnonzero(alpha), self.width)
+            self.rows, self.cols = rows.astype(np.int32), cols.astype(np.int32) # Закрашенные пиксели
+            self.colors = tile[rows, cols] # Их цвета RGBA
+            self.nbytes = self.rows.nbytes + self.cols.nbytes + self.colors.nbytes
+
+
+# Кэш растров объектов (спрайтов) с вытеснением давно неиспользуемых (LRU).
+# Ключ описывает геометрию относительно левого верхнего угла тайла, цвета и толщину, поэтому объект,
+# сдвинутый на целое число пикселей, выводится прежним спрайтом в новом месте.
+# Общий объем спрайтов ограничен бюджетом памяти
+class SpriteCache:
+    def __init__(self, budget=64 * 2**20, seen_limit=8192):
+        self.budget = budget # Предел памяти тайлов в байтах
+        self.tiles = OrderedDict() # Ключ -> Sprite; порядок - от давно использованных к недавним
+        self.seen = OrderedDict() # Хэши ключей, по которым был один промах (кандидаты в кэш)
+        self.seen_limit = seen_limit
+        self.used = 0 # Память, занятая спрайтами
+        self.hits = 0 # Счетчик попаданий
+        self.misses = 0 # Счетчик промахов
+        self.evictions = 0 # Счетчик вытесненных спрайтов
+
+    def get(self, key):
+        # Спрайт по ключу (или None); найденный спрайт становится самым недавно использованным
+        sprite = self.tiles.get(key)
+        if sprite is None:
+            self.misses += 1
+            return None
+        self.tiles.move_to_end(key)
+        self.hits += 1
+        return sprite
+
+    def admit(self, key):
+        # После промаха: стоит ли растеризовать объект в спрайт. Спрайт создается при повторном промахе
+        # по тому же ключу (объект перерисовывается без изменений или перемещен), а однократно нарисованный
+        # объект рисуется напрямую - его первая отрисовка не дороже, чем без кэша
+        marker = hash(key)
+        if marker in self.seen:
+            del self.seen[marker]
+            return True
+        self.seen[marker] = None
+        if len(self.seen) > self.seen_limit:
+            self.seen.popitem(last=False)
+        return False
+
+    def fits(self, nbytes):
+        # Спрайт такого размера можно хранить (не больше четверти бюджета, чтобы не вытеснять все остальные)
+        return nbytes * 4 <= self.budget
+
+    def put(self, key, sprite):
+        # Сохранение спрайта с вытеснением давно неиспользуемых до попадания в бюджет
+        if not self.fits(sprite.nbytes):
+            return False
+        old = self.tiles.pop(key, None)
+        if old is not None:
+            self.used -= old.nbytes
+        self.tiles[key] = sprite
+        self.used += sprite.nbytes
+        self.evict()
+        return True
+
+    def evict(self):
+        while self.used > self.budget and self.tiles:
+            _, sprite = self.tiles.popitem(last=False)
+            self.used -= sprite.nbytes
+            self.evictions += 1
+
+    def set_budget(self, budget):
+        # Новый предел памяти (лишние спрайты вытесняются сразу)
+        self.budget = budget
+        self.evict()
+
+    def clear(self):
+        self.tiles.clear()
+        self.seen.clear()
+        self.used = 0
+
+    def stats(self):
+        # Сводка для отладки и подбора бюджета
+        return {"sprites": len(self.tiles), "bytes": self.used, "budget": self.budget,
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+    def __len__(self):
+        return len(self.tiles)
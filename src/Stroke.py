@@ -0,0 +1,85 @@
+import numpy as np
+import math
+
+
+# Построение контура толстой линии (обводки) в виде набора многоугольников.
+# Каждый отрезок превращается в четырехугольник, а стыки и концы достраиваются
+# соединениями (join) и окончаниями (cap). Многоугольники затем заливаются
+# построчными отрезками, поэтому стоимость обводки растет с ее площадью, а не с width².
+class Stroke:
+    MITER_LIMIT = 4.0 # Максимальное отношение длины острого угла к половине толщины
+
+    @staticmethod
+    def circle(cx, cy, radius):
+        # Правильный многоугольник, приближающий круг (для круглых стыков и концов)
+        count = max(8, int(math.ceil(2 * math.pi * radius / 2))) # Шаг по окружности ~2 пикселя
+        angles = np.linspace(0, 2 * math.pi, count, endpoint=False)
+        return np.column_stack([cx + radius * np.cos(angles), cy + radius * np.sin(angles)])
+
+    @staticmethod
+    def polygons(xy, width, closed=False, join="round", cap="butt"):
+        # Многоугольники обводки ломаной xy (массив (N, 2)) толщиной width.
+        # join: "round" | "miter" | "bevel" - вид стыка; cap: "butt" | "square" | "round" - вид концов
+        xy = np.asarray(xy, dtype=float).reshape(-1, 2)
+        half = width / 2
+        if len(xy) > 1: # Совпадающие соседние точки не дают направления - убираем их
+            keep = np.concatenate([[True], np.any(np.diff(xy, axis=0) != 0, axis=1)])
+            xy = xy[keep]
+        if closed and len(xy) > 2 and np.array_equal(xy[0], xy[-1]):
+            xy = xy[:-1]
+        if len(xy) == 0:
+            return []
+        if len(xy) == 1: # Вырожденная ломаная - точка
+            x, y = xy[0]
+            if cap == "round":
+                return [Stroke.circle(x, y, half)]
+            return [np.array([[x - half, y - half], [x + half, y - half], [x + half, y + half], [x - half, y + half]])]
+
+        start = xy if closed else xy[:-1]
+        end = np.roll(xy, -1, axis=0) if closed else xy[1:]
+        direction = end - start
+        unit = direction / np.hypot(direction[:, 0], direction[:, 1])[:, None] # Единичные направления отрезков
+        normal = np.column_stack([-unit[:, 1], unit[:, 0]]) * half # Нормали длиной half
+
+        if cap == "square" and not closed: # Квадратные концы: продление крайних отрезков на half
+            start = start.copy()
+            end = end.copy()
+            start[0] -= unit[0] * half
+            end[-1] += unit[-1] * half
+
+        # Четырехугольник каждого отрезка: (p0 + n, p1 + n, p1 - n, p0 - n)
+        quads = np.stack([start + normal, end + normal, end - normal, start - normal], axis=1)
+        polygons = list(quads)
+
+        # Стыки во внутренних вершинах (у замкнутой ломаной - во всех)
+        count = len(direction)
+        joints = range(count) if closed else range(1, count)
+        for j in joints:
+            vertex = xy[j]
+            n_prev, n_next = normal[j - 1], normal[j % count]
+            if join == "round":
+                polygons.append(Stroke.circle(vertex[0], vertex[1], half))
+                continue
+            # Острие угла лежит на биссектрисе нормалей на расстоянии half / cos(угол / 2)
+            bisector = n_prev + n_next
+            cos_half = np.dot(bisector, n_prev) / (np.linalg.norm(bisector) * half) if bisector.any() else 0.0
+            if join == "miter" and cos_half > 1 / Stroke.MITER_LIMIT:
+                miter = bisector / np.linalg.norm(bisector) * (half / cos_half)
+                for side in (1, -1):
+                    polygons.append(np.array([vertex, vertex + side * n_prev, vertex + side * miter, vertex + side * n_next]))
+            else: # Скос (bevel), а также запасной вариант для слишком острых углов
+                for side in (1, -1):
+                    polygons.append(np.array([vertex, vertex + side * n_prev, vertex + side * n_next]))
+
+        if cap == "round" and not closed: # Круглые концы
+            polygons.append(Stroke.circle(xy[0, 0], xy[0, 1], half))
+            polygons.append(Stroke.circle(xy[-1, 0], xy[-1, 1], half))
+        return polygons
+
+    @staticmethod
+    def segment_polygons(segments, width, cap="square"):
+        # Обводка набора независимых отрезков (N, 4): по одному многоугольнику (и окончаниям) на отрезок
+        polygons = []
+        for x1, y1, x2, y2 in np.asarray(segments, dtype=float).reshape(-1, 4):
+            polygons.extend(Stroke.polygons([[x1, y1], [x2, y2]], width, cap=cap))
+        return polygons
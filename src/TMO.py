@@ -1,161 +1,475 @@
 from tkinter import messagebox
+import threading
 import numpy as np
-from GraphicObject import Cross,Flag
+from GraphicObject import GraphicObject,Cross,Flag,Polygon,CoverageShape
+from Spans import SpanShape
+
+
+# Точные векторные ТМО над многоугольниками (в том числе многоконтурными, с дырами).
+# Ребра обоих операндов разбиваются в точках взаимного пересечения, после чего каждое
+# получившееся ребро классифицируется: область результата слева и справа от него вычисляется
+# по принадлежности точек A и B (правило четности). Ребро остается на границе результата,
+# только если слева и справа результат разный; оставшиеся ребра сшиваются в замкнутые контуры.
+# Кандидаты на пересечение отбираются сортировкой ребер по X, поэтому полный перебор пар не нужен.
+class PolygonClipper:
+    EPSILON = 1e-9 # Допуск для параметров пересечения и параллельности
+    SNAP = 1e-7 # Шаг сетки, к которой приводятся вершины (совпадающие вершины A и B сливаются)
+    PROBE = 1e-5 # Отступ от середины ребра для проверки сторон
+
+    @staticmethod
+    def edges(contours):
+        # Ребра всех контуров одним массивом (N, 4): x1, y1, x2, y2 (вырожденные ребра отбрасываются)
+        segments = []
+        for contour in contours:
+            xy = np.asarray(contour, dtype=float).reshape(-1, 2)
+            if len(xy) < 3:
+                continue
+            segments.append(np.hstack([xy, np.roll(xy, -1, axis=0)]))
+        if not segments:
+            return np.zeros((0, 4))
+        segments = np.concatenate(segments)
+        return segments[np.any(segments[:, :2] != segments[:, 2:], axis=1)]
+
+    @staticmethod
+    def candidate_pairs(edges1, edges2):
+        # Пары ребер (i, j), у которых пересекаются проекции на оси X и Y.
+        # Проекции на X пересекаются, если начало одной лежит внутри другой - это ищется
+        # бинарным поиском по отсортированным началам, а не перебором всех пар
+        lo1, hi1 = np.minimum(edges1[:, 0], edges1[:, 2]), np.maximum(edges1[:, 0], edges1[:, 2])
+        lo2, hi2 = np.minimum(edges2[:, 0], edges2[:, 2]), np.maximum(edges2[:, 0], edges2[:, 2])
+        order1, order2 = np.argsort(lo1, kind="stable"), np.argsort(lo2, kind="stable")
+        sorted1, sorted2 = lo1[order1], lo2[order2]
+
+        # Начало ребра B в [lo1, hi1] ребра A
+        first = np.searchsorted(sorted2, lo1, side="left")
+        i_a, position = PolygonClipper.expand(first, np.searchsorted(sorted2, hi1, side="right") - first)
+        j_a = order2[position]
+
+        # Начало ребра A строго внутри (lo2, hi2] ребра B (равные начала учтены выше)
+        first = np.searchsorted(sorted1, lo2, side="right")
+        j_b, position = PolygonClipper.expand(first, np.searchsorted(sorted1, hi2, side="right") - first)
+        i_b = order1[position]
+
+        i, j = np.concatenate([i_a, i_b]), np.concatenate([j_a, j_b])
+        # Отсев по Y
+        ylo1, yhi1 = np.minimum(edges1[i, 1], edges1[i, 3]), np.maximum(edges1[i, 1], edges1[i, 3])
+        ylo2, yhi2 = np.minimum(edges2[j, 1], edges2[j, 3]), np.maximum(edges2[j, 1], edges2[j, 3])
+        keep = (ylo1 <= yhi2) & (ylo2 <= yhi1)
+        return i[keep], j[keep]
+
+    @staticmethod
+    def split_points(edges1, edges2):
+        # Точки разбиения ребер: для каждого ребра список (t, x, y), t - параметр вдоль ребра.
+        # Одна и та же точка записывается в оба ребра, поэтому после разбиения вершины A и B совпадают
+        eps = PolygonClipper.EPSILON
+        splits1 = [[] for _ in range(len(edges1))]
+        splits2 = [[] for _ in range(len(edges2))]
+        if len(edges1) == 0 or len(edges2) == 0:
+            return splits1, splits2
+
+        i, j = PolygonClipper.candidate_pairs(edges1, edges2)
+        p, r = edges1[i, :2], edges1[i, 2:] - edges1[i, :2]
+        q, s = edges2[j, :2], edges2[j, 2:] - edges2[j, :2]
+        qp = q - p
+        denom = r[:, 0] * s[:, 1] - r[:, 1] * s[:, 0]
+        scale = np.hypot(r[:, 0], r[:, 1]) * np.hypot(s[:, 0], s[:, 1])
+        parallel = np.abs(denom) <= eps * scale
+
+        # Пересечение непараллельных ребер: p + t*r = q + u*s
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t = (qp[:, 0] * s[:, 1] - qp[:, 1] * s[:, 0]) / denom
+            u = (qp[:, 0] * r[:, 1] - qp[:, 1] * r[:, 0]) / denom
+        hit = ~parallel & (t >= -eps) & (t <= 1 + eps) & (u >= -eps) & (u <= 1 + eps)
+        for k in np.nonzero(hit)[0]:
+            a, b, tk, uk = i[k], j[k], t[k], u[k]
+            # Точка у конца ребра берется равной самой вершине (Т-образные касания и общие вершины)
+            if tk <= eps:
+                point, tk = edges1[a, :2], 0.0
+            elif tk >= 1 - eps:
+                point, tk = edges1[a, 2:], 1.0
+            elif uk <= eps:
+                point = edges2[b, :2]
+            elif uk >= 1 - eps:
+                point = edges2[b, 2:]
+            else:
+                point = p[k] + tk * r[k]
+            uk = min(max(uk, 0.0), 1.0)
+            splits1[a].append((tk, point[0], point[1]))
+            splits2[b].append((uk, point[0], point[1]))
+
+        # Коллинеарные перекрывающиеся ребра: каждое разбивается концами другого
+        collinear = parallel & (np.abs(qp[:, 0] * r[:, 1] - qp[:, 1] * r[:, 0]) <= eps * np.hypot(r[:, 0], r[:, 1]) * np.maximum(1.0, np.hypot(qp[:, 0], qp[:, 1])))
+        for k in np.nonzero(collinear)[0]:
+            a, b = i[k], j[k]
+            rr, ss = r[k] @ r[k], s[k] @ s[k]
+            for end in (edges2[b, :2], edges2[b, 2:]):
+                tk = (end - p[k]) @ r[k] / rr
+                if eps < tk < 1 - eps:
+                    splits1[a].append((tk, end[0], end[1]))
+            for end in (edges1[a, :2], edges1[a, 2:]):
+                uk = (end - q[k]) @ s[k] / ss
+                if eps < uk < 1 - eps:
+                    splits2[b].append((uk, end[0], end[1]))
+        return splits1, splits2
+
+    @staticmethod
+    def subdivide(edges, splits):
+        # Разбиение ребер в найденных точках; вершины приводятся к сетке SNAP
+        pieces = []
+        for edge, points in zip(edges, splits):
+            chain = [(0.0, edge[0], edge[1])] + sorted(points) + [(1.0, edge[2], edge[3])]
+            for (_, x1, y1), (_, x2, y2) in zip(chain, chain[1:]):
+                pieces.append((x1, y1, x2, y2))
+        if not pieces:
+            return np.zeros((0, 4))
+        pieces = np.round(np.array(pieces) / PolygonClipper.SNAP) * PolygonClipper.SNAP
+        return pieces[np.any(pieces[:, :2] != pieces[:, 2:], axis=1)]
+
+    @staticmethod
+    def inside(points, edges):
+        # Принадлежность точек (M, 2) области, заданной ребрами (правило четности).
+        # Точки сортируются по Y, и каждое ребро проверяется только с точками своего диапазона Y
+        # (бинарным поиском), поэтому объем работы - число пар "ребро - точка на его высоте", а не M * N
+        if len(edges) == 0 or len(points) == 0:
+            return np.zeros(len(points), dtype=bool)
+        order = np.argsort(points[:, 1], kind="stable")
+        sorted_y = points[order, 1]
+        x1, y1, x2, y2 = edges[:, 0], edges[:, 1], edges[:, 2], edges[:, 3]
+        # Ребро пересекает горизонталь через точку, если min(y1, y2) <= y < max(y1, y2)
+        first = np.searchsorted(sorted_y, np.minimum(y1, y2), side="left")
+        last = np.searchsorted(sorted_y, np.maximum(y1, y2), side="left")
+        edge, position = PolygonClipper.expand(first, last - first)
+        point = order[position]
+        px, py = points[point, 0], points[point, 1]
+        x_cross = x1[edge] + (py - y1[edge]) * (x2[edge] - x1[edge]) / (y2[edge] - y1[edge])
+        crossings = np.bincount(point[px < x_cross], minlength=len(points)) # Луч вправо от точки
+        return crossings % 2 == 1
+
+    @staticmethod
+    def expand(first, count):
+        # Развертка диапазонов [first, first + count) в пары (номер диапазона, позиция)
+        count = np.maximum(count, 0)
+        owner = np.repeat(np.arange(len(count)), count)
+        position = np.repeat(first, count) + np.arange(count.sum()) - np.repeat(np.cumsum(count) - count, count)
+        return owner, position
+
+    @staticmethod
+    def boundary(contours1, contours2, operation):
+        # Ориентированные ребра границы результата (область результата слева от ребра)
+        edges1 = PolygonClipper.edges(contours1)
+        edges2 = PolygonClipper.edges(contours2)
+        splits1, splits2 = PolygonClipper.split_points(edges1, edges2)
+        pieces = np.concatenate([PolygonClipper.subdivide(edges1, splits1), PolygonClipper.subdivide(edges2, splits2)])
+        if len(pieces) == 0:
+            return pieces
+
+        # Общие участки границ A и B встречаются дважды - оставляем по одному
+        undirected = np.hstack([np.minimum(pieces[:, :2], pieces[:, 2:]), np.maximum(pieces[:, :2], pieces[:, 2:])])
+        swap = np.any(pieces[:, :2] != undirected[:, :2], axis=1)
+        undirected[swap] = np.hstack([pieces[swap, 2:], pieces[swap, :2]])
+        _, unique = np.unique(undirected, axis=0, return_index=True)
+        pieces = pieces[np.sort(unique)]
+
+        # Точки чуть слева и чуть справа от середины каждого ребра
+        start, end = pieces[:, :2], pieces[:, 2:]
+        direction = end - start
+        normal = np.column_stack([-direction[:, 1], direction[:, 0]]) / np.hypot(direction[:, 0], direction[:, 1])[:, None]
+        middle = (start + end) / 2
+        left, right = middle + normal * PolygonClipper.PROBE, middle - normal * PolygonClipper.PROBE
+
+        probes = np.concatenate([left, right])
+        inside = SetOperations.OPERATIONS[operation](PolygonClipper.inside(probes, edges1), PolygonClipper.inside(probes, edges2))
+        result_left, result_right = inside[:len(pieces)], inside[len(pieces):]
+
+        # Граница результата - там, где по разные стороны ребра результат разный
+        keep = result_left != result_right
+        flip = keep & result_right # Разворот, чтобы область результата была слева
+        pieces[flip] = np.hstack([pieces[flip, 2:], pieces[flip, :2]])
+        return pieces[keep]
+
+    @staticmethod
+    def link(pieces):
+        # Сшивание ориентированных ребер в замкнутые контуры (списки вершин (k, 2))
+        outgoing = {}
+        for index, (x1, y1, x2, y2) in enumerate(pieces):
+            outgoing.setdefault((x1, y1), []).append(index)
+        used = np.zeros(len(pieces), dtype=bool)
+        contours = []
+        for first in range(len(pieces)):
+            if used[first]:
+                continue
+            chain = []
+            index = first
+            while index is not None and not used[index]:
+                used[index] = True
+                x1, y1, x2, y2 = pieces[index]
+                chain.append((x1, y1))
+                candidates = [k for k in outgoing.get((x2, y2), []) if not used[k]]
+                index = candidates[0] if candidates else None
+            closed = (pieces[first, 0], pieces[first, 1]) == (x2, y2)
+            if closed and len(chain) >= 3:
+                contours.append(PolygonClipper.simplify(np.array(chain)))
+        return [contour for contour in contours if len(contour) >= 3]
+
+    @staticmethod
+    def simplify(contour):
+        # Удаление промежуточных вершин, лежащих на прямой между соседями (остаются после разбиения ребер)
+        while len(contour) >= 3:
+            prev, next_ = np.roll(contour, 1, axis=0), np.roll(contour, -1, axis=0)
+            cross = (contour[:, 0] - prev[:, 0]) * (next_[:, 1] - prev[:, 1]) - (contour[:, 1] - prev[:, 1]) * (next_[:, 0] - prev[:, 0])
+            collinear = np.abs(cross) <= PolygonClipper.EPSILON * np.maximum(1.0, np.abs(next_ - prev).sum(axis=1))
+            if not collinear.any():
+                break
+            contour = contour[~collinear] if not collinear.all() else contour[:0]
+        return contour
+
+    @staticmethod
+    def clip(contours1, contours2, operation):
+        # ТМО над двумя многоконтурными многоугольниками: "intersection" | "difference" | "union".
+        # Возвращает список контуров результата (внешние контуры и дыры, правило четности).
+        # Многоугольники с непересекающимися габаритами не пересекаются: результат известен без разбиения ребер
+        box1, box2 = PolygonClipper.extent(contours1), PolygonClipper.extent(contours2)
+        if box1 is None or box2 is None or not PolygonClipper.boxes_overlap(box1, box2):
+            if operation == "intersection":
+                return []
+            if operation == "difference":
+                return list(contours1)
+            return list(contours1) + list(contours2)
+        return PolygonClipper.link(PolygonClipper.boundary(contours1, contours2, operation))
+
+    @staticmethod
+    def extent(contours):
+        # Габариты вершин контуров (x0, y0, x1, y1); None - вершин нет
+        contours = [np.asarray(contour, dtype=float).reshape(-1, 2) for contour in contours]
+        contours = [contour for contour in contours if len(contour)]
+        if not contours:
+            return None
+        xy = np.concatenate(contours)
+        return (*xy.min(axis=0).tolist(), *xy.max(axis=0).tolist())
+
+    @staticmethod
+    def boxes_overlap(box1, box2):
+        # Пересечение прямоугольников (x0, y0, x1, y1) с границами включительно
+        return box1[0] <= box2[2] and box2[0] <= box1[2] and box1[1] <= box2[3] and box2[1] <= box1[3]
 
 
 
 class SetOperations:
+    # Логика ТМО над масками принадлежности: A ∩ B, A \ B, A ∪ B
+    OPERATIONS = {
+        "intersection": lambda mask1, mask2: mask1 & mask2,
+        "difference": lambda mask1, mask2: mask1 & ~mask2,
+        "union": lambda mask1, mask2: mask1 | mask2,
+    }
+
+    @staticmethod
+    def combine_shapes(shape1, shape2, operation):
+        # ТМО над формами из серий пикселей (линейно по числу серий)
+        return getattr(shape1, operation)(shape2)
+
+    @staticmethod
+    def is_empty(shape):
+        # Пустой результат: нет контуров (векторная ТМО) или нет закрашенных пикселей (серии)
+        if isinstance(shape, SpanShape):
+            return shape.is_empty()
+        return len(shape) == 0
+
+    @staticmethod
+    def reduce(shapes, operation, combine):
+        # Свертка сбалансированным деревом: на каждом уровне соседние операнды объединяются попарно,
+        # поэтому размер промежуточных результатов растет равномерно, а глубина - log2(N).
+        # Пустое пересечение на любом шаге означает пустой итог - остальные операнды не обрабатываются
+        shapes = list(shapes)
+        while len(shapes) > 1:
+            level = []
+            for k in range(0, len(shapes) - 1, 2):
+                shape = combine(shapes[k], shapes[k + 1], operation)
+                if operation == "intersection" and SetOperations.is_empty(shape):
+                    return shape
+                level.append(shape)
+            if len(shapes) % 2: # Нечетный операнд переходит на следующий уровень без изменений
+                level.append(shapes[-1])
+            shapes = level
+        return shapes[0]
+
+    @staticmethod
+    def is_polygonal(obj):
+        # Объект задан контурами (участвует в точной векторной ТМО)
+        if isinstance(obj, SetOperationResult):
+            return isinstance(obj.current(), Polygon)
+        return isinstance(obj, (Cross, Flag, Polygon))
+
     @staticmethod
-    def get_pixel_buffer(width, height):
-        # Возвращает пустой пиксельный буфер (белый фон)
-        return np.full((height, width, 3), 255, dtype=np.uint8) # 1400x600, каждый 3х3
-
-    @staticmethod
-    def hex_to_rgb(hex_color):
-        hex_color = hex_color.lstrip('#')
-        return np.array([int(hex_color[i:i+2], 16) for i in (0, 2, 4)], dtype=np.uint8)
-
-    @staticmethod
-    def rgb_to_hex(rgb_color):
-        #  Использует форматирование строк %02x для преобразования каждого десятичного значения компонента цвета в 
-        # двухсимвольное шестнадцатеричное представление.
-        return '#%02x%02x%02x' % tuple(rgb_color)
-
-    @staticmethod
-    def intersection(editor_instance, obj1, obj2):
-        # Выполнение операции пересечения на пиксельном уровне
-        if not (isinstance(obj1, (Cross, Flag)) and isinstance(obj2, (Cross, Flag))):
-            messagebox.showwarning("ТМО: Пересечение", "Пиксельное пересечение поддерживается только для Креста и Флага. Выберите два таких объекта.")
-            return
-
-        # Создаем два временных буфера
-        buffer1 = SetOperations.get_pixel_buffer(editor_instance.canvas_width, editor_instance.canvas_height)
-        buffer2 = SetOperations.get_pixel_buffer(editor_instance.canvas_width, editor_instance.canvas_height)
-
-        # Рисуем первый объект в первый буфер
-        # Используем непрозрачный цвет заливки для ТМО
-        original_fill_color1 = obj1.fill_color
-        obj1.fill_color = "#FF0000" # Красный для obj1
-        obj1.draw(editor_instance, pixel_buffer=buffer1)
-        obj1.fill_color = original_fill_color1 # Восстанавливаем оригинальный цвет
-
-        # Рисуем второй объект во второй буфер
-        original_fill_color2 = obj2.fill_color
-        obj2.fill_color = "#0000FF" # Синий для obj2
-        obj2.draw(editor_instance, pixel_buffer=buffer2)
-        obj2.fill_color = original_fill_color2 # Восстанавливаем оригинальный цвет
-
-        # Создаем буфер для результата
-        result_buffer = SetOperations.get_pixel_buffer(editor_instance.canvas_width, editor_instance.canvas_height)
-        intersection_color = SetOperations.hex_to_rgb("#00FF00") # Зеленый для пересечения
-
-        # Проходим по всем пикселям и применяем логику пересечения
-        # Если пиксель окрашен в обоих буферах (не белый), то это пересечение
-        white = np.array([255, 255, 255], dtype=np.uint8)
-        for y in range(editor_instance.canvas_height):
-            for x in range(editor_instance.canvas_width):
-                pixel1_is_colored = not np.array_equal(buffer1[y, x], white)
-                pixel2_is_colored = not np.array_equal(buffer2[y, x], white)
-
-                if pixel1_is_colored and pixel2_is_colored:
-                    result_buffer[y, x] = intersection_color
-                else:
-                    result_buffer[y, x] = white # Остальное белое
-
-        # Отображаем результат на Canvas
-        editor_instance.pixels = result_buffer
-        editor_instance.update_canvas_image()
-        messagebox.showinfo("ТМО: Пересечение", "Результат пересечения отображен на холсте.")
-
-    @staticmethod
-    def difference(editor_instance, obj1, obj2):
-        # Выполнение операции разности (obj1 - obj2) на пиксельном уровне
-        if not (isinstance(obj1, (Cross, Flag)) and isinstance(obj2, (Cross, Flag))):
-            messagebox.showwarning("ТМО: Разность", "Пиксельная разность поддерживается только для Креста и Флага. Выберите два таких объекта.")
-            return
-
-        # Создаем два временных буфера
-        buffer1 = SetOperations.get_pixel_buffer(editor_instance.canvas_width, editor_instance.canvas_height)
-        buffer2 = SetOperations.get_pixel_buffer(editor_instance.canvas_width, editor_instance.canvas_height)
-
-        # Рисуем первый объект в первый буфер
-        original_fill_color1 = obj1.fill_color
-        obj1.fill_color = "#FF0000" # Красный для obj1
-        obj1.draw(editor_instance, pixel_buffer=buffer1)
-        obj1.fill_color = original_fill_color1
-
-        # Рисуем второй объект во второй буфер
-        original_fill_color2 = obj2.fill_color
-        obj2.fill_color = "#0000FF" # Синий для obj2
-        obj2.draw(editor_instance, pixel_buffer=buffer2)
-        obj2.fill_color = original_fill_color2
-
-        # Создаем буфер для результата
-        result_buffer = SetOperations.get_pixel_buffer(editor_instance.canvas_width, editor_instance.canvas_height)
-        difference_color = SetOperations.hex_to_rgb("#FFA500") # Оранжевый для разности
-
-        # Проходим по всем пикселям и применяем логику разности (A - B)
-        # Если пиксель окрашен в буфере 1, но не окрашен в буфере 2
-        white = np.array([255, 255, 255], dtype=np.uint8)
-        # Циклы for y in range(...) и for x in range(...) перебирают каждый пиксель на холсте.
-        for y in range(editor_instance.canvas_height): 
-            for x in range(editor_instance.canvas_width):
-                # Проверяет, отличается ли цвет пикселя (x, y) в buffer1 от белого (т.е., принадлежит ли он obj1)
-                # np.array_equal используется для сравнения массивов RGB-значений.
-                pixel1_is_colored = not np.array_equal(buffer1[y, x], white)
-                pixel2_is_colored = not np.array_equal(buffer2[y, x], white)
-
-                if pixel1_is_colored and not pixel2_is_colored: # Логика пересечения
-                    result_buffer[y, x] = difference_color
-                else:
-                    result_buffer[y, x] = white
-
-        # Отображаем результат на Canvas
-        editor_instance.pixels = result_buffer
-        editor_instance.update_canvas_image()
-        messagebox.showinfo("ТМО: Разность", "Результат разности (A - B) отображен на холсте.")
-
-    @staticmethod
-    def union(editor_instance, obj1, obj2):
-        # Выполнение операции объединения на пиксельном уровне
-        if not (isinstance(obj1, (Cross, Flag)) and isinstance(obj2, (Cross, Flag))):
-            messagebox.showwarning("ТМО: Объединение", "Пиксельное объединение поддерживается только для Креста и Флага. Выберите два таких объекта.")
-            return
-
-        # Создаем два временных буфера
-        buffer1 = SetOperations.get_pixel_buffer(editor_instance.canvas_width, editor_instance.canvas_height)
-        buffer2 = SetOperations.get_pixel_buffer(editor_instance.canvas_width, editor_instance.canvas_height)
-
-        # Рисуем первый объект в первый буфер
-        original_fill_color1 = obj1.fill_color
-        obj1.fill_color = "#FF0000" # Красный для obj1
-        obj1.draw(editor_instance, pixel_buffer=buffer1)
-        obj1.fill_color = original_fill_color1
-
-        # Рисуем второй объект во второй буфер
-        original_fill_color2 = obj2.fill_color
-        obj2.fill_color = "#0000FF" # Синий для obj2
-        obj2.draw(editor_instance, pixel_buffer=buffer2)
-        obj2.fill_color = original_fill_color2
-
-        # Создаем буфер для результата
-        result_buffer = SetOperations.get_pixel_buffer(editor_instance.canvas_width, editor_instance.canvas_height)
-        union_color = SetOperations.hex_to_rgb("#800080") # Пурпурный для объединения
-
-        # Проходим по всем пикселям и применяем логику объединения
-        # Если пиксель окрашен хотя бы в одном из буферов
-        white = np.array([255, 255, 255], dtype=np.uint8)
-        for y in range(editor_instance.canvas_height):
-            for x in range(editor_instance.canvas_width):
-                pixel1_is_colored = not np.array_equal(buffer1[y, x], white)
-                pixel2_is_colored = not np.array_equal(buffer2[y, x], white)
-
-                if pixel1_is_colored or pixel2_is_colored:
-                    result_buffer[y, x] = union_color
-                else:
-                    result_buffer[y, x] = white
-
-        # Отображаем результат на Canvas
-        editor_instance.pixels = result_buffer
-        editor_instance.update_canvas_image()
-        messagebox.showinfo("ТМО: Объединение", "Результат объединения отображен на холсте.")
+    def evaluate(objects, operation):
+        # ТМО над любым числом объектов. Если все операнды - многоугольники, результат точный
+        # (список контуров), иначе - форма из серий пикселей (линии и кривые участвуют своей обводкой).
+        # Разность: первый объект минус объединение всех остальных.
+        # Габариты объектов проверяются до построения контуров и покрытий: пересечение объектов с общими
+        # габаритами нулевой площади пусто, а вычитаемые вне габаритов первого объекта не участвуют
+        polygonal = all(SetOperations.is_polygonal(obj) for obj in objects) # Вид результата - по всем операндам
+        empty = [] if polygonal else SpanShape()
+        boxes = [obj.bounds() for obj in objects]
+        if operation == "intersection":
+            if any(box is None for box in boxes):
+                return empty
+            x0, y0 = max(box[0] for box in boxes), max(box[1] for box in boxes)
+            x1, y1 = min(box[2] for box in boxes), min(box[3] for box in boxes)
+            if x0 >= x1 or y0 >= y1:
+                return empty
+        elif operation == "difference":
+            first = boxes[0]
+            objects = [objects[0]] + [obj for obj, box in zip(objects[1:], boxes[1:]) if first is not None and box is not None
+                                      and box[0] < first[2] and first[0] < box[2] and box[1] < first[3] and first[1] < box[3]]
+        if polygonal:
+            shapes = [obj.outline_contours() for obj in objects]
+            combine = PolygonClipper.clip
+        else:
+            shapes = [obj.coverage() for obj in objects]
+            combine = SetOperations.combine_shapes
+        if operation == "difference":
+            if len(shapes) == 1:
+                return shapes[0]
+            return combine(shapes[0], SetOperations.reduce(shapes[1:], "union", combine), "difference")
+        return SetOperations.reduce(shapes, operation, combine)
+
+    @staticmethod
+    def result(objects, operation, result_color):
+        # Результат ТМО в виде нового объекта сцены или None, если результат пуст.
+        # Операнды не изменяются, результат можно преобразовывать и снова использовать в ТМО
+        shape = SetOperations.evaluate(objects, operation)
+        if SetOperations.is_empty(shape):
+            return None
+        if isinstance(shape, SpanShape):
+            return CoverageShape(shape, result_color)
+        return Polygon(shape, "#000000", result_color)
+
+    @staticmethod
+    def add_result(editor_instance, objects, operation, result_color, title):
+        # Добавление результата ТМО на сцену поверх операндов. Результат - сохраняемый объект сцены:
+        # он пересчитывается только при изменении операндов, а отрисовывается из кэша
+        result = SetOperationResult(objects, operation, result_color)
+        if result.current() is None:
+            messagebox.showinfo(title, "Результат операции пуст.")
+            return None
+        editor_instance.add_object(result)
+        return result
+
+    @staticmethod
+    def intersection(editor_instance, objects):
+        # Пересечение всех выбранных объектов - новый объект с зеленой заливкой
+        if SetOperations.add_result(editor_instance, objects, "intersection", "#00FF00", "ТМО: Пересечение"):
+            messagebox.showinfo("ТМО: Пересечение", "Результат пересечения добавлен как новый объект.")
+
+    @staticmethod
+    def difference(editor_instance, objects):
+        # Разность A \ (B ∪ C ∪ ...) - новый объект с оранжевой заливкой
+        if SetOperations.add_result(editor_instance, objects, "difference", "#FFA500", "ТМО: Разность"):
+            messagebox.showinfo("ТМО: Разность", "Результат разности добавлен как новый объект.")
+
+    @staticmethod
+    def union(editor_instance, objects):
+        # Объединение всех выбранных объектов - новый объект с пурпурной заливкой
+        if SetOperations.add_result(editor_instance, objects, "union", "#800080", "ТМО: Объединение"):
+            messagebox.showinfo("ТМО: Объединение", "Результат объединения добавлен как новый объект.")
+
+
+# Результат ТМО как объект сцены. Хранит операнды и вычисленную фигуру (многоугольник или серии пикселей);
+# фигура пересчитывается лениво - только если изменилась геометрия какого-либо операнда
+# (или преобразован сам результат), а при перерисовке выводится из кэша
+class SetOperationResult(GraphicObject):
+    def __init__(self, operands, operation, fill_color):
+        super().__init__(color="#000000", fill_color=fill_color)
+        self.operands = list(operands) # Операнды в порядке выбора
+        self.operation = operation # "intersection" | "difference" | "union"
+        self._key = None # Состояние операндов, для которого вычислена фигура
+        self._shape = None # Вычисленная фигура: Polygon, CoverageShape или None (пустой результат)
+        # Фигуру и ключ читают и меняют главный поток (преобразования) и поток отрисовки (пересчет):
+        # проверка ключа, пересчет и преобразование фигуры выполняются под одной блокировкой
+        self._lock = threading.RLock()
+        for obj in self.operands: # Изменение операнда - изменение результата
+            obj.observers.append(self)
+
+    def object_changed(self, obj):
+        # Уведомление от операнда передается дальше подписчикам результата
+        self.notify()
+
+    def detach(self):
+        # Удаленный со сцены результат больше не пересчитывается при изменении операндов
+        for obj in self.operands:
+            if self in obj.observers:
+                obj.observers.remove(self)
+
+    @GraphicObject.color.setter
+    def color(self, value):
+        # Цвета результата переносятся на вычисленную фигуру при назначении (отрисовка их не меняет)
+        GraphicObject.color.fset(self, value)
+        self.paint(getattr(self, "_shape", None))
+
+    @GraphicObject.fill_color.setter
+    def fill_color(self, value):
+        GraphicObject.fill_color.fset(self, value)
+        self.paint(getattr(self, "_shape", None))
+
+    def paint(self, shape):
+        # Цвета результата на вычисленной фигуре
+        if shape is not None:
+            shape.color, shape.fill_color = self.color, self.fill_color
+
+    def geometry_version(self):
+        return self.version, tuple(obj.geometry_version() for obj in self.operands)
+
+    def current(self):
+        # Актуальная фигура результата (пересчет, только если операнды изменились)
+        with self._lock:
+            key = self.geometry_version()
+            if key != self._key:
+                shape = SetOperations.result(self.operands, self.operation, self.fill_color)
+                if shape is not None and self.transform is not self.IDENTITY:
+                    shape.apply_transform(self.transform)
+                self._shape, self._key = shape, key
+                # Цвета переносятся после публикации фигуры: если их одновременно меняет главный поток,
+                # фигура все равно получит последние (его setter перекрашивает уже опубликованную фигуру)
+                self.paint(shape)
+            return self._shape
+
+    def materialize(self):
+        # Вершины, центр и габариты - у вычисленной фигуры
+        shape = self.current()
+        return shape.geometry() if shape is not None else self.vertex_geometry(np.zeros((0, 2)))
+
+    def apply_transform(self, transform_matrix):
+        # Преобразование результата накапливается (см. GraphicObject) и применяется к вновь вычисленной фигуре.
+        # Если операнды не менялись, преобразование передается уже вычисленной фигуре - без повторной ТМО;
+        # иначе фигура пересчитается при первом обращении
+        with self._lock: # Поток отрисовки не увидит новую матрицу без новой версии и наоборот
+            fresh = self._key == self.geometry_version()
+            self.transform = self.transform @ np.asarray(transform_matrix, dtype=float)
+            if fresh:
+                if self._shape is not None:
+                    self._shape.apply_transform(transform_matrix)
+                # Фигура уже преобразована: ключ сразу соответствует версии, которую объявит touch,
+                # чтобы подписчики, получив уведомление, не запускали ТМО заново
+                self._key = self.version + 1, self._key[1]
+            self.touch()
+
+    def draw(self, renderer, pixel_buffer=None):
+        shape = self.current()
+        if shape is not None:
+            shape.draw(renderer, pixel_buffer)
+
+    def coverage(self):
+        shape = self.current()
+        return shape.coverage() if shape is not None else SpanShape()
+
+    def outline_contours(self):
+        shape = self.current()
+        return shape.outline_contours() if shape is not None else []
+
+    def geometry_signature(self, origin):
+        # Ключ вычисленной фигуры (ее тип различает векторный и растровый результат)
+        shape = self.current()
+        return type(shape).__name__, shape.geometry_signature(origin)
+
+    def compute_bounds(self):
+        shape = self.current()
+        return shape.bounds() if shape is not None else None
@@ -1,5 +1,6 @@
 
 from Point import *
+from GraphicObject import Flag, BezierCurve
 
 # Пример 1: Обычная точка
 uniform_point1 = np.array([100, 200, 1])
@@ -24,4 +25,45 @@ print(f"Из {uniform_vector} -> {p_vec}")
 uniform_matrix_row = np.array([[300, 600, 3]])
 p_matrix_row = Point.from_uniform(uniform_matrix_row)
 print(f"Из {uniform_matrix_row} -> {p_matrix_row}")
-# Вывод: Из [[300 600   3]] -> Point(100, 200)
\ No newline at end of file
+# Вывод: Из [[300 600   3]] -> Point(100, 200)
+
+# Пример 5: PointArray - массив координат, который ведет себя как список Point
+def coords(sequence):
+    # Координаты последовательности Point списком кортежей
+    return [(p.x, p.y) for p in sequence]
+
+points = [Point(1.4, 2.6), Point(-3, 4), Point(5.5, 6.5)]
+array = PointArray(PointArray.coordinates(points))
+print(f"Длина: {len(array)}, элементы: {coords(array)}, индекс -1: {coords([array[-1]])}, срез: {coords(array[1:])}")
+# Вывод: Длина: 3, элементы: [(1, 3), (-3, 4), (6, 6)], индекс -1: [(6, 6)], срез: [(-3, 4), (6, 6)]
+assert len(array) == 3 and all(isinstance(p, Point) for p in array) and isinstance(array[-1], Point)
+assert coords([array[-1]]) == [(6, 6)] and coords(array[1:]) == [(-3, 4), (6, 6)]
+assert coords(array) == coords(points) and isinstance(array[1:], PointArray)
+assert not array.xy.flags.writeable # Координаты меняются только присваиванием
+
+# Пример 6: Присваивание points списка Point, PointArray или массива сохраняет те же вершины
+flag = Flag(10, 50, 40, 20)
+original = coords(flag.points)
+for value in (list(flag.points), flag.points, np.asarray(flag.points)):
+    flag.points = value
+    assert coords(flag.points) == original
+print(f"Вершины после присваиваний: {coords(flag.points) == original}")
+# Вывод: Вершины после присваиваний: True
+
+# Пример 7: Векторный алгоритм Де Кастельжо совпадает с поточечным построением через Point
+def de_casteljau_points(control_points, t):
+    # Эталон: интерполяция по одной точке с округлением каждой промежуточной точки (как Point)
+    points = list(control_points)
+    while len(points) > 1:
+        points = [Point((1 - t) * p.x + t * q.x, (1 - t) * p.y + t * q.y) for p, q in zip(points, points[1:])]
+    return points[0]
+
+for control in ([Point(0, 0), Point(100, 0), Point(100, 100)],
+                [Point(10, 200), Point(-40, 7), Point(333, 91), Point(250, 260)],
+                [Point(i * 37 % 500, i * 91 % 400) for i in range(9)]):
+    n = 50 + 10 * len(control)
+    expected = [de_casteljau_points(control, i / n) for i in range(n + 1)]
+    matches = coords(BezierCurve(control).points) == coords(expected)
+    assert matches
+print(f"Точки кривых совпадают с поточечным построением: {matches}")
+# Вывод: Точки кривых совпадают с поточечным построением: True
@@ -0,0 +1,238 @@
+import random
+
+from Render import *
+from Point import Point
+from GraphicObject import Line, Cross, Flag, BezierCurve
+from Transformations import Transformations
+
+# Пример 1: Отрисовка сцены без создания окна Tkinter
+frame = FrameBuffer(200, 100)
+scene = [
+    Line(Point(10, 10), Point(190, 90), "#FF0000"),
+    Cross(50, 50, 40, "#000000", "#00FF00FF"),
+    Flag(120, 80, 60, 50, "#000000", "#0000FFFF"),
+    BezierCurve([Point(10, 90), Point(100, 0), Point(190, 90)], "#000000"),
+]
+pixels = frame.render(scene)
+print(f"Размер буфера: {pixels.shape}")
+# Вывод: Размер буфера: (100, 200, 3)
+
+# Пример 2: Центр креста залит цветом заливки
+print(f"Пиксель в центре креста: {pixels[50, 50]}")
+# Вывод: Пиксель в центре креста: [  0 255   0]
+assert tuple(pixels[50, 50]) == (0, 255, 0)
+
+# Пример 3: Повторная отрисовка очищает буфер
+frame.render([])
+print(f"Пустая сцена белая: {(frame.pixels == 255).all()}")
+# Вывод: Пустая сцена белая: True
+assert (frame.pixels == 255).all()
+
+# Пример 4: Заливка отрезками совпадает попиксельно с прежней заливкой редактора (GraphicEditor.scanline_fill):
+# кресты, флаги и случайные многоугольники, у которых пересечения со строками попадают на половины пикселей
+
+def baseline_fill(frame, points, outline_color, fill_color):
+    # Эталон: прежний алгоритм - пересечения строки с ребрами, round() концов, заливка put_pixel по пикселю
+    n = len(points)
+    edges = [[min(p.y, q.y), max(p.y, q.y), p.x if p.y < q.y else q.x, (q.x - p.x) / (q.y - p.y)]
+             for p, q in zip(points, points[1:] + points[:1]) if p.y != q.y]
+    for y in range(min(p.y for p in points), max(p.y for p in points) + 1):
+        intersections = sorted(x + slope * (y - ymin) for ymin, ymax, x, slope in edges if ymin <= y < ymax)
+        for i in range(0, len(intersections) - 1, 2):
+            for x in range(int(round(intersections[i])), int(round(intersections[i + 1])) + 1):
+                for py in (y - 1, y): # Перо put_pixel ширины 1 - квадрат 2x2 влево-вверх
+                    for px in (x - 1, x):
+                        if 0 <= px < frame.width and 0 <= py < frame.height:
+                            frame.pixels[py, px] = fill_color
+    for i in range(n):
+        frame.bresenham_line(points[i], points[(i + 1) % n], outline_color)
+
+random.seed(2)
+shapes = [Cross(40, 40, 50).points, Cross(101, 67, 37).points, Flag(20, 150, 61, 45).points, Flag(131, 140, 33, 27).points]
+shapes += [[Point(random.randint(0, 199), random.randint(0, 199)) for _ in range(random.randint(3, 9))] for _ in range(200)]
+mismatches = 0
+for points in shapes:
+    points = list(points)
+    expected, actual = FrameBuffer(200, 200), FrameBuffer(200, 200)
+    baseline_fill(expected, points, "#000000", (0, 0, 255))
+    actual.scanline_fill(points, "#000000", "#0000FF")
+    mismatches += int((expected.pixels != actual.pixels).any(axis=-1).sum())
+print(f"Фигур: {len(shapes)}, несовпадающих пикселей: {mismatches}")
+# Вывод: Фигур: 204, несовпадающих пикселей: 0
+assert mismatches == 0
+# Пример 5: Пакетная отрисовка отрезков совпадает с поотрезочным алгоритмом Брезенхэма
+segments = np.array([[5, 5, 150, 60], [190, 10, 20, 95], [100, 0, 100, 99]])
+batched = FrameBuffer(200, 100)
+batched.draw_lines(segments, "#FF0000", width=3)
+single = FrameBuffer(200, 100)
+for x1, y1, x2, y2 in segments:
+    single.bresenham_line(Point(x1, y1), Point(x2, y2), "#FF0000", width=3)
+print(f"Пакет совпадает с одиночными линиями: {np.array_equal(batched.pixels, single.pixels)}")
+# Вывод: Пакет совпадает с одиночными линиями: True
+assert np.array_equal(batched.pixels, single.pixels)
+
+# Пример 6: Сглаженная ломаная смешивает каждый пиксель один раз: покрытия общей вершины отрезков
+# суммируются (не больше 1), а не накладываются дважды, как при отрисовке отрезков по отдельности
+joint = [Point(10, 10), Point(40, 20), Point(10, 26)]
+polyline = FrameBuffer(60, 40)
+polyline.wu_polyline(joint, "#808080")
+separate = FrameBuffer(60, 40)
+separate.wu_line(joint[0], joint[1], "#808080")
+separate.wu_line(joint[1], joint[2], "#808080")
+single = FrameBuffer(1, 1)
+single.blend_pixels(np.array([0]), np.array([0]), np.array([1.0]), "#808080") # Полное покрытие, один раз
+xs, ys, alpha = FrameBuffer.wu_samples(FrameBuffer.polyline_segments(joint))
+first, second = FrameBuffer(60, 40), FrameBuffer(60, 40)
+first.wu_line(joint[0], joint[1], "#808080")
+second.wu_line(joint[1], joint[2], "#808080")
+print(f"Вершина (40, 20): покрытие {alpha[(xs == 40) & (ys == 20)].sum()}, ломаная {polyline.pixels[20, 40].tolist()}, "
+      f"отрезки по отдельности {separate.pixels[20, 40].tolist()}")
+# Вывод: Вершина (40, 20): покрытие 1.0, ломаная [128, 128, 128], отрезки по отдельности [159, 159, 159]
+assert alpha[(xs == 40) & (ys == 20)].sum() <= 1
+assert np.array_equal(polyline.pixels[20, 40], single.pixels[0, 0]) and not np.array_equal(separate.pixels[20, 40], single.pixels[0, 0])
+assert np.array_equal(polyline.pixels[10, 10], first.pixels[10, 10]) and np.array_equal(polyline.pixels[26, 10], second.pixels[26, 10])
+# Пример 7: Толстая линия - обводка заданной толщины, а не штамповка квадратов
+thick = FrameBuffer(200, 100)
+Line(Point(10, 50), Point(100, 50), "#000000", stroke_width=5).draw(thick)
+rows = np.nonzero((thick.pixels[:, :, 0] == 0).any(axis=1))[0]
+print(f"Строки толстой линии: {rows.min()}..{rows.max()}")
+# Вывод: Строки толстой линии: 48..52
+assert (rows.min(), rows.max()) == (48, 52)
+
+# Пример 8: Байт прозрачности заливки "#RRGGBBAA" учитывается
+translucent = FrameBuffer(200, 100)
+translucent.render([Cross(50, 50, 40, "#000000", "#FF000080")])
+print(f"Полупрозрачный красный на белом: {translucent.pixels[50, 50]}")
+# Вывод: Полупрозрачный красный на белом: [255 127 127]
+assert tuple(translucent.pixels[50, 50]) == (255, 127, 127)
+
+# Пример 9: Частичная перерисовка по поврежденным областям совпадает с полной отрисовкой
+moved = Cross(50, 50, 40, "#000000", "#00FF00FF")
+scene = [moved, Flag(120, 80, 60, 50, "#000000", "#0000FFFF")]
+incremental = FrameBuffer(200, 100)
+incremental.render(scene)
+Transformations.translate(moved, 30, 5)
+rects = incremental.update(scene)
+full = FrameBuffer(200, 100)
+full.render(scene)
+print(f"Перерисовано областей: {len(rects)}, совпадает с полной: {np.array_equal(incremental.pixels, full.pixels)}")
+# Вывод: Перерисовано областей: 1, совпадает с полной: True
+assert len(rects) == 1 and np.array_equal(incremental.pixels, full.pixels)
+
+# Пример 10: Изменение толщины уведомляет буфер: прежняя широкая обводка стирается при обновлении
+strokes = [Line(Point(10, 10), Point(190, 140), "#FF0000", 9), BezierCurve([Point(10, 140), Point(100, 0), Point(190, 140)], "#0000FF", 7)]
+incremental = FrameBuffer(200, 150)
+incremental.update(strokes)
+for obj in strokes:
+    obj.stroke_width = 1
+incremental.update(strokes)
+fresh = FrameBuffer(200, 150)
+fresh.render(strokes)
+print(f"После уменьшения толщины совпадает с полной перерисовкой: {np.array_equal(incremental.pixels, fresh.pixels)}")
+# Вывод: После уменьшения толщины совпадает с полной перерисовкой: True
+assert np.array_equal(incremental.pixels, fresh.pixels)
+# Пример 11: Перетаскивание поверх фонового слоя - кадр перерисовывает только перемещаемый объект,
+# а после завершения буфер совпадает с полной отрисовкой
+dragged = Flag(40, 60, 30, 30, "#000000", "#FF0000FF")
+scene = [Cross(100, 50, 60, "#000000", "#00FF00FF"), dragged, Line(Point(0, 0), Point(199, 99), "#0000FF")]
+drag = FrameBuffer(200, 100)
+drag.render(scene)
+drag.begin_drag(scene, [dragged])
+for _ in range(5):
+    Transformations.translate(dragged, 12, 1)
+    rects = drag.drag_frame()
+drag.end_drag(scene)
+full = FrameBuffer(200, 100)
+full.render(scene)
+print(f"Областей в кадре: {len(rects)}, после перетаскивания совпадает с полной: {np.array_equal(drag.pixels, full.pixels)}")
+# Вывод: Областей в кадре: 1, после перетаскивания совпадает с полной: True
+assert len(rects) == 1 and np.array_equal(drag.pixels, full.pixels)
+
+# Пример 12: На экран выводятся только области, измененные после прошлого кадра
+shown = FrameBuffer(200, 100)
+shown.render(scene)
+shown.take_exposed()
+Transformations.translate(scene[0], 5, 0)
+shown.update(scene)
+exposed = shown.take_exposed()
+x0, y0, x1, y1 = exposed[0]
+ppm = shown.region_ppm(exposed[0])
+header = b"P6\n%d %d\n255\n" % (x1 - x0, y1 - y0)
+print(f"Областей: {len(exposed)}, байт в кадре: {len(ppm)} из {shown.pixels.nbytes}")
+# Вывод: Областей: 1, байт в кадре: 13663 из 60000
+assert ppm.startswith(header) and ppm[len(header):] == shown.pixels[y0:y1, x0:x1].tobytes()
+assert shown.take_exposed() == []
+
+# Пример 13: Документ 20000x20000 из тайлов - память выделяется только под тайлы, в которые что-то нарисовано;
+# фигуры на границах тайлов выводятся так же, как в плотный буфер
+document = TiledFrameBuffer(20000, 20000)
+far = [Cross(19900, 19900, 60, "#000000", "#00FF00FF"), Flag(10000, 250, 80, 40, "#000000", "#0000FF80")]
+document.render(scene + far)
+document.update(scene + far)
+Transformations.translate(scene[0], 0, 20)
+document.update(scene + far)
+full = FrameBuffer(200, 100)
+full.render(scene)
+print(f"Тайлов: {len(document.tiles)}, памяти: {document.allocated_bytes() // 1024} КБ, "
+      f"совпадает с плотным: {np.array_equal(document.read((0, 0, 200, 100)), full.pixels)}")
+# Вывод: Тайлов: 3, памяти: 576 КБ, совпадает с плотным: True
+assert np.array_equal(document.read((0, 0, 200, 100)), full.pixels)
+assert sorted(document.tiles) == [(0, 0), (39, 0), (77, 77)]
+
+# Пример 14: Буфер номеров - выбирается объект, пиксель которого виден в точке; после перемещения
+# номера обновляются вместе с пикселями поврежденных областей
+picked = TiledFrameBuffer(400, 300, tile_size=128, ids=True)
+top = Flag(60, 80, 80, 40, "#000000", "#0000FF80")
+layers = [Cross(100, 60, 60, "#000000", "#00FF00FF"), top]
+picked.update(layers)
+before = [type(picked.pick(layers, x, y)).__name__ for x, y in ((100, 88), (100, 50), (300, 50))]
+Transformations.translate(top, 200, 0)
+stale = picked.pick(layers, 100, 50)
+picked.update(layers)
+print(f"До: {before}, пока не перерисован: {stale}, после: {picked.pick(layers, 100, 50) is layers[0]}")
+# Вывод: До: ['Cross', 'Flag', 'NoneType'], пока не перерисован: False, после: True
+assert before == ["Cross", "Flag", "NoneType"] and stale is False and picked.pick(layers, 100, 50) is layers[0]
+
+# Пример 15: Габариты объекта кэшируются до следующего преобразования и совпадают с вычисленными заново
+box = Cross(100, 60, 60, "#000000", "#00FF00FF")
+first = box.bounds()
+Transformations.rotate_around_point(box, 45, 100, 60)
+rotated = box.bounds()
+print(f"Габариты: {first} -> {rotated}, повторный вызов - тот же кортеж: {box.bounds() is rotated}")
+# Вывод: Габариты: (68, 28, 133, 93) -> (66, 26, 135, 95), повторный вызов - тот же кортеж: True
+assert rotated == box.points_bounds(box.points, 2) and box.bounds() is rotated
+
+# Пример 16: Преобразования накапливаются в матрице и не пересчитывают точки; точки вычисляются
+# от исходных при обращении, поэтому 12 поворотов на 30 градусов возвращают фигуру точно на место
+curve = BezierCurve([Point(10, 10), Point(200, 40), Point(120, 160)])
+start = curve.xy.copy()
+for _ in range(12):
+    Transformations.rotate_around_point(curve, 30, 77, 33)
+print(f"Кривая после 12 поворотов совпадает с исходной: {np.array_equal(curve.xy, start)}, "
+      f"повторное обращение - тот же массив: {curve.xy is curve.xy}")
+# Вывод: Кривая после 12 поворотов совпадает с исходной: True, повторное обращение - тот же массив: True
+assert np.array_equal(curve.xy, start) and curve.xy is curve.xy
+
+# Пример 17: Присваивание новой геометрии (points, контрольных точек) - такое же изменение, как преобразование:
+# габариты пересчитываются, а буфер стирает прежние пиксели
+assigned = [Flag(20, 60, 50, 30, "#000000", "#FF0000FF"), BezierCurve([Point(10, 150), Point(90, 100), Point(180, 190)])]
+incremental = FrameBuffer(300, 250)
+incremental.update(assigned)
+assigned[0].points = [Point(200, 200), Point(200, 170), Point(260, 170), Point(260, 200), Point(230, 185)]
+assigned[1].control_points = [Point(10, 10), Point(150, 240), Point(290, 10)]
+incremental.update(assigned)
+fresh = FrameBuffer(300, 250)
+fresh.render(assigned)
+print(f"Габариты флага: {assigned[0].bounds()}, совпадает с полной перерисовкой: {np.array_equal(incremental.pixels, fresh.pixels)}")
+# Вывод: Габариты флага: (198, 168, 263, 203), совпадает с полной перерисовкой: True
+assert assigned[0].bounds() == (198, 168, 263, 203) and np.array_equal(incremental.pixels, fresh.pixels)
+
+# Пример 18: Число точек кривой следует за числом контрольных точек, явно заданное - сохраняется
+curve = BezierCurve([Point(10, 10), Point(50, 90), Point(90, 10)])
+curve.control_points = [Point(10, 10), Point(30, 90), Point(50, 10), Point(70, 90), Point(90, 10)]
+automatic = len(curve.points)
+curve.recalculate_curve_points(20)
+curve.control_points = [Point(10, 10), Point(50, 90), Point(90, 10)]
+print(f"Точек кривой: {automatic} (50 + 10 * 5 отрезков), после явного задания: {len(curve.points)}")
+# Вывод: Точек кривой: 101 (50 + 10 * 5 отрезков), после явного задания: 21
+assert automatic == 101 and len(curve.points) == 21
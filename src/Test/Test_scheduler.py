@@ -0,0 +1,52 @@
+from Scheduler import FrameScheduler
+
+class Widget:
+    # Очередь отложенных вызовов вместо цикла событий Tk
+    def __init__(self):
+        self.queue = {}
+        self.next_id = 0
+
+    def after(self, ms, callback):
+        self.next_id += 1
+        self.queue[self.next_id] = callback
+        return self.next_id
+
+    def after_idle(self, callback):
+        return self.after(0, callback)
+
+    def after_cancel(self, call_id):
+        self.queue.pop(call_id, None)
+
+    def process(self):
+        calls, self.queue = self.queue, {}
+        for callback in calls.values():
+            callback()
+
+# Пример 1: События между кадрами сливаются - отрисовка одна, по последнему положению
+widget = Widget()
+pointer = [0, 0]
+drawn = []
+scheduler = FrameScheduler(widget, lambda: drawn.append(tuple(pointer)), frame_budget=0)
+for x in range(1, 11):
+    pointer[0] = x
+    scheduler.request()
+widget.process()
+print(f"Кадров: {scheduler.frames}, слито событий: {scheduler.stats()['coalesced']}, положение: {drawn[-1]}")
+# Вывод: Кадров: 1, слито событий: 9, положение: (10, 0)
+assert drawn == [(10, 0)]
+
+# Пример 2: flush выводит ожидающий кадр сразу, повторный flush ничего не делает
+pointer[1] = 5
+scheduler.request()
+scheduler.flush()
+scheduler.flush()
+widget.process()
+print(f"Кадров после flush: {scheduler.frames}, положение: {drawn[-1]}")
+# Вывод: Кадров после flush: 2, положение: (10, 5)
+assert scheduler.frames == 2 and drawn[-1] == (10, 5)
+
+# Пример 3: Отмененный кадр не рисуется
+scheduler.request()
+scheduler.cancel()
+widget.process()
+assert scheduler.frames == 2
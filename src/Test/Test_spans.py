@@ -0,0 +1,31 @@
+
+import numpy as np
+from Spans import SpanShape
+
+# Пример 1: Форма из отрезков строк (включительные границы, как у polygon_spans)
+a = SpanShape.from_spans([(0, 0, 9), (1, 0, 4), (1, 3, 9)])
+print(f"Серий: {len(a)}, пикселей: {a.area()}")
+# Вывод: Серий: 2, пикселей: 20
+assert len(a) == 2 and a.area() == 20
+
+# Пример 2: ТМО над сериями
+b = SpanShape.from_spans([(0, 5, 14), (2, 0, 9)])
+print(f"A ∪ B: {a.union(b).spans()}")
+# Вывод: A ∪ B: [(0, 0, 14), (1, 0, 9), (2, 0, 9)]
+print(f"A ∩ B: {a.intersection(b).spans()}")
+# Вывод: A ∩ B: [(0, 5, 9)]
+print(f"A \\ B: {a.difference(b).spans()}")
+# Вывод: A \ B: [(0, 0, 4), (1, 0, 9)]
+assert a.difference(b).spans() == [(0, 0, 4), (1, 0, 9)]
+
+# Пример 3: Совпадение с маской
+mask = np.random.default_rng(0).random((50, 60)) < 0.5
+shape = SpanShape.from_mask(mask, (10, 20))
+restored, origin = shape.to_mask()
+print(f"Маска восстановлена: {restored.sum() == mask.sum()}, попадание: {shape.contains(10 + 3, 20 + 7) == mask[7, 3]}")
+# Вывод: Маска восстановлена: True, попадание: True
+
+# Пример 4: Сплошная форма 1000x1000 занимает килобайты
+solid = SpanShape.from_mask(np.ones((1000, 1000), dtype=bool))
+print(f"Байт на серии: {solid.nbytes}, байт на маску: {1000 * 1000}")
+# Вывод: Байт на серии: 12000, байт на маску: 1000000
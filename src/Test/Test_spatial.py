@@ -0,0 +1,56 @@
+import random
+import time
+from Spatial import SpatialIndex
+from GraphicObject import Cross, Flag, BezierCurve
+from Transformations import Transformations
+from Point import Point
+
+def pick(index, scene, x, y):
+    # Первый кандидат под точкой (точную проверку формы делает редактор)
+    for obj, segments in index.candidates(scene, x, y):
+        return obj
+    return None
+
+# Пример 1: Кандидаты выдаются сверху вниз - позже добавленный объект первым
+scene = [Cross(100, 100, 60, "#000000", "#00FF00FF"), Flag(90, 90, 80, 40, "#000000", "#0000FF80")]
+index = SpatialIndex()
+for obj in scene:
+    index.add(obj)
+order = [type(obj).__name__ for obj, segments in index.candidates(scene, 100, 100)]
+print(f"Кандидаты в (100, 100): {order}, в (500, 500): {list(index.candidates(scene, 500, 500))}")
+# Вывод: Кандидаты в (100, 100): ['Flag', 'Cross'], в (500, 500): []
+assert order == ["Flag", "Cross"]
+
+# Пример 2: Преобразованный объект перезаписывается в индексе по уведомлению, удаленный - исчезает
+Transformations.translate(scene[0], 400, 400)
+moved = pick(index, scene, 500, 500) is scene[0]
+index.remove(scene[1])
+scene.pop()
+print(f"Крест найден на новом месте: {moved}, после удаления флага в (100, 100): {pick(index, scene, 100, 100)}")
+# Вывод: Крест найден на новом месте: True, после удаления флага в (100, 100): None
+assert moved and pick(index, scene, 100, 100) is None
+
+# Пример 3: У кривой Безье проверяются только отрезки рядом с точкой
+curve = BezierCurve([Point(0, 0), Point(1000, 0), Point(1000, 1000)])
+index.add(curve)
+scene.append(curve)
+(obj, segments), = index.candidates(scene, 990, 900)
+print(f"Отрезков кривой: {len(curve.points) - 1}, проверяется рядом с (990, 900): {len(segments)}")
+# Вывод: Отрезков кривой: 80, проверяется рядом с (990, 900): 5
+assert obj is curve and 0 < len(segments) < 10
+
+# Пример 4: Выбор среди 50 000 объектов документа 20000x20000 занимает доли миллисекунды
+random.seed(1)
+scene = [Cross(random.uniform(0, 20000), random.uniform(0, 20000), random.uniform(20, 80), "#000000", "#00FF00FF")
+         for _ in range(50000)]
+index = SpatialIndex()
+index.rebuild(scene)
+times = []
+for _ in range(1000):
+    start = time.perf_counter()
+    pick(index, scene, random.uniform(0, 20000), random.uniform(0, 20000))
+    times.append(time.perf_counter() - start)
+median = sorted(times)[len(times) // 2] * 1000
+print(f"Медиана выбора: {'меньше' if median < 1 else 'больше'} 1 мс")
+# Вывод: Медиана выбора: меньше 1 мс
+assert median < 1
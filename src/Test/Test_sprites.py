@@ -0,0 +1,65 @@
+import numpy as np
+from Render import FrameBuffer
+from Point import Point
+from GraphicObject import Cross, Flag, BezierCurve
+from Transformations import Transformations
+
+def direct(scene):
+    # Эталон: отрисовка каждого объекта без кэша растров
+    frame = FrameBuffer(200, 100)
+    for obj in scene:
+        obj.draw(frame)
+    return frame.pixels
+
+# Пример 1: Спрайт создается при повторной отрисовке неизменного объекта и выводится вместо растеризации
+scene = [Cross(50, 50, 40, "#000000", "#00FF00FF"), Flag(120, 80, 60, 50, "#000000", "#0000FF80"),
+         BezierCurve([Point(10, 90), Point(100, 0), Point(190, 90)], "#000000")]
+frame = FrameBuffer(200, 100)
+for _ in range(3):
+    frame.render(scene)
+stats = frame.sprites.stats()
+print(f"Спрайтов: {stats['sprites']}, попаданий: {stats['hits']}, промахов: {stats['misses']}")
+# Вывод: Спрайтов: 3, попаданий: 3, промахов: 6
+assert (stats['sprites'], stats['hits'], stats['misses']) == (3, 3, 6)
+print(f"Совпадает с прямой отрисовкой: {np.array_equal(frame.pixels, direct(scene))}")
+# Вывод: Совпадает с прямой отрисовкой: True
+assert np.array_equal(frame.pixels, direct(scene))
+
+# Пример 2: Перемещенный объект выводится прежним спрайтом в новом месте
+Transformations.translate(scene[0], 24, -10)
+frame.render(scene)
+print(f"Новых спрайтов: {frame.sprites.stats()['sprites'] - 3}, совпадает: {np.array_equal(frame.pixels, direct(scene))}")
+# Вывод: Новых спрайтов: 0, совпадает: True
+assert len(frame.sprites) == 3 and np.array_equal(frame.pixels, direct(scene))
+
+# Пример 3: Изменение цвета - новый ключ растра
+scene[1].fill_color = "#FF000080"
+frame.render(scene)
+frame.render(scene)
+print(f"Спрайтов после смены цвета: {len(frame.sprites)}")
+# Вывод: Спрайтов после смены цвета: 4
+assert len(frame.sprites) == 4 and np.array_equal(frame.pixels, direct(scene))
+
+# Пример 4: При исчерпании бюджета памяти вытесняются давно неиспользуемые спрайты
+frame.sprites.set_budget(frame.sprites.used - 1)
+print(f"Вытеснено: {frame.sprites.evictions}, памяти занято не больше бюджета: {frame.sprites.used <= frame.sprites.budget}")
+# Вывод: Вытеснено: 1, памяти занято не больше бюджета: True
+assert frame.sprites.evictions == 1 and frame.sprites.used <= frame.sprites.budget
+
+# Пример 5: Вершины на полупикселях - нечетный сдвиг дает другой растр и другой ключ, четный - прежний спрайт
+flag = Flag(20, 80, 21, 44, "#000000", "#00FF00FF") # Нечетная ширина: "хвост" флага на полупикселе
+frame = FrameBuffer(200, 100)
+frame.render([flag])
+frame.render([flag])
+key = flag.sprite_key()[1]
+Transformations.translate(flag, 1, 0)
+frame.render([flag])
+odd_key, odd_same = flag.sprite_key()[1], np.array_equal(frame.pixels, direct([flag]))
+Transformations.translate(flag, 1, 0)
+hits = frame.sprites.stats()['hits']
+frame.render([flag])
+reused = frame.sprites.stats()['hits'] == hits + 1
+print(f"Сдвиг на 1: ключ тот же {odd_key == key}, совпадает {odd_same}; сдвиг на 2: спрайт повторно {reused}, совпадает {np.array_equal(frame.pixels, direct([flag]))}")
+# Вывод: Сдвиг на 1: ключ тот же False, совпадает True; сдвиг на 2: спрайт повторно True, совпадает True
+assert odd_key != key and odd_same and flag.sprite_key()[1] == key and reused
+assert np.array_equal(frame.pixels, direct([flag]))
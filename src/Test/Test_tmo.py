@@ -0,0 +1,162 @@
+import threading
+import numpy as np
+from TMO import PolygonClipper, SetOperations, SetOperationResult
+from GraphicObject import Cross, Flag, Polygon, CoverageShape, Line
+from Render import FrameBuffer
+from Transformations import Transformations
+from Point import Point
+
+
+def raster(obj1, obj2, operation, width, height):
+    # ТМО над покрытиями объектов, нарисованная на холсте: True там, где пиксель цвета результата
+    frame = FrameBuffer(width, height)
+    frame.render([CoverageShape(SetOperations.combine_shapes(obj1.coverage(), obj2.coverage(), operation), "#00FF00")])
+    colored = np.all(frame.pixels == (0, 255, 0), axis=2)
+    assert np.all(frame.pixels[~colored] == 255) # Остальные пиксели остались белыми
+    return colored
+
+
+# Пример 1: Маски объединения, пересечения и разности двух крестов
+cross1, cross2 = Cross(70, 70, 80), Cross(110, 80, 80)
+counts = {operation: int(np.count_nonzero(raster(cross1, cross2, operation, 200, 150))) for operation in ("union", "intersection", "difference")}
+print(f"Пикселей: объединение {counts['union']}, пересечение {counts['intersection']}, разность {counts['difference']}")
+# Вывод: Пикселей: объединение 8424, пересечение 1824, разность 3300
+assert counts == {"union": 8424, "intersection": 1824, "difference": 3300}
+# Каждый крест занимает 5124 пикселя: |A ∪ B| = |A| + |B| - |A ∩ B|, |A \ B| = |A| - |A ∩ B|
+assert counts["union"] == 2 * 5124 - counts["intersection"] and counts["difference"] == 5124 - counts["intersection"]
+
+# Пример 2: Маски в габаритах совпадают с ТМО по всему холсту, в том числе у белых фигур
+def full_mask(obj, width, height):
+    # Эталон: фигура рисуется в белый буфер размера холста, принадлежность - пиксель не белый
+    frame = FrameBuffer(width, height)
+    obj.draw(frame)
+    return np.any(frame.pixels != 255, axis=2)
+
+# Флаг частично за левой и верхней границей холста, крест смещен относительно него:
+# смещения двух покрытий должны согласовываться между собой и с холстом.
+# Белые контур и заливка не видны на холсте, но входят в маску покрытия
+flag = Flag(-20, 60, 90, 80, color="#FFFFFF", fill_color="#FFFFFFFF")
+cross = Cross(60, 45, 70, color="#FFFFFF")
+flag_full = full_mask(Flag(-20, 60, 90, 80, color="#FF0000", fill_color="#FF0000FF"), 240, 180)
+cross_full = full_mask(Cross(60, 45, 70, color="#0000FF", fill_color="#0000FFFF"), 240, 180)
+reference = {
+    "union": flag_full | cross_full,
+    "intersection": flag_full & cross_full,
+    "difference": flag_full & ~cross_full,
+}
+mismatches = 0
+for operation, expected in reference.items():
+    mismatches += int(np.count_nonzero(raster(flag, cross, operation, 240, 180) != expected))
+print(f"Габариты флага: {flag.coverage().bbox()}, креста: {cross.coverage().bbox()}, несовпадающих пикселей: {mismatches}")
+# Вывод: Габариты флага: (-21, -21, 71, 61), креста: (24, 9, 96, 81), несовпадающих пикселей: 0
+assert mismatches == 0
+# Маска пересечения в своих габаритах совпадает с соответствующим участком холста
+mask, (x0, y0) = SetOperations.combine_shapes(flag.coverage(), cross.coverage(), "intersection").to_mask()
+assert np.array_equal(mask, reference["intersection"][y0:y0 + mask.shape[0], x0:x0 + mask.shape[1]])
+assert mask.sum() == reference["intersection"].sum()
+
+
+def area(contours):
+    # Площадь по формуле Гаусса (контуры результата ориентированы так, что дыры вычитаются)
+    return sum(0.5 * np.sum(c[:, 0] * np.roll(c[:, 1], -1) - np.roll(c[:, 0], -1) * c[:, 1]) for c in contours)
+
+
+# Пример 3: Пересечение двух квадратных флагов без "хвоста" - точный квадрат
+square1 = [np.array([[0, 0], [100, 0], [100, 100], [0, 100]], dtype=float)]
+square2 = [np.array([[50, 50], [150, 50], [150, 150], [50, 150]], dtype=float)]
+result = PolygonClipper.clip(square1, square2, "intersection")
+print(f"Площадь пересечения: {area(result)}")
+# Вывод: Площадь пересечения: 2500.0
+assert area(result) == 2500.0
+
+# Пример 4: Объединение и разность
+print(f"Объединение: {area(PolygonClipper.clip(square1, square2, 'union'))}, разность: {area(PolygonClipper.clip(square1, square2, 'difference'))}")
+# Вывод: Объединение: 17500.0, разность: 7500.0
+
+# Пример 5: Разность вложенных крестов - многоугольник с дырой
+outer, inner = Cross(200, 200, 200), Cross(200, 200, 80)
+ring = SetOperations.result([outer, inner], "difference", "#FFA500")
+print(f"Контуров: {len(ring.contours)}, площадь: {area(ring.contours)}")
+# Вывод: Контуров: 2, площадь: 25200.0
+assert len(ring.contours) == 2 and area(ring.contours) == 25200.0
+
+# Пример 6: Дыра не закрашивается при отрисовке
+frame = FrameBuffer(400, 400)
+frame.render([ring])
+print(f"Центр дыры: {frame.pixels[200, 200]}, кольцо: {frame.pixels[200, 130]}")
+# Вывод: Центр дыры: [255 255 255], кольцо: [255 165   0]
+assert tuple(frame.pixels[200, 200]) == (255, 255, 255) and tuple(frame.pixels[200, 130]) == (255, 165, 0)
+
+# Пример 7: Результат можно преобразовать и снова использовать в ТМО
+Transformations.rotate_around_point(ring, 45, 200, 200)
+flag = Flag(150, 300, 150, 150)
+combined = SetOperations.result([ring, flag], "union", "#800080")
+print(f"Результат повторной ТМО - многоугольник: {isinstance(combined, Polygon)}")
+# Вывод: Результат повторной ТМО - многоугольник: True
+
+# Пример 8: Непересекающиеся фигуры дают пустое пересечение
+print(f"Пустое пересечение: {SetOperations.result([Cross(50, 50, 40), Cross(300, 300, 40)], 'intersection', '#00FF00')}")
+# Вывод: Пустое пересечение: None
+
+# Пример 9: Объединение многих объектов сразу (сбалансированное дерево)
+row = [Cross(20 + 30 * i, 100, 40) for i in range(12)]
+merged = SetOperations.evaluate(row, "union")
+print(f"Контуров в объединении 12 крестов: {len(merged)}")
+# Вывод: Контуров в объединении 12 крестов: 1
+
+# Пример 10: Разность первого объекта и всех остальных
+pierced = SetOperations.evaluate([Cross(200, 200, 200), Cross(150, 200, 20), Cross(250, 200, 20)], "difference")
+print(f"Контуров (крест с двумя дырами): {len(pierced)}")
+# Вывод: Контуров (крест с двумя дырами): 3
+assert len(pierced) == 3
+
+# Пример 11: Линии участвуют в ТМО своей обводкой - результат растровый
+crossing = SetOperations.result([Line(Point(0, 200), Point(400, 200), stroke_width=5), Cross(200, 200, 100)], "intersection", "#00FF00")
+print(f"Тип: {type(crossing).__name__}, закрашено пикселей: {crossing.shape.area()}")
+# Вывод: Тип: CoverageShape, закрашено пикселей: 510
+
+# Пример 12: Результат ТМО - объект сцены, пересчитываемый только при изменении операндов
+a, b = Cross(100, 100, 100), Cross(150, 100, 100)
+result = SetOperationResult([a, b], "intersection", "#00FF00")
+first = result.current()
+print(f"Без изменений операндов фигура берется из кэша: {result.current() is first}")
+# Вывод: Без изменений операндов фигура берется из кэша: True
+Transformations.translate(b, 20, 0)
+print(f"После перемещения операнда пересчитана: {result.current() is not first}, площадь: {area(result.current().contours)}")
+# Вывод: После перемещения операнда пересчитана: True, площадь: 1500.0
+assert area(result.current().contours) == 1500.0
+
+# Пример 13: Цвет результата переносится на фигуру при назначении, отрисовка цвета не меняет
+result.fill_color = "#FF0000FF"
+shape = result.current()
+frame = FrameBuffer(300, 200)
+frame.render([result])
+print(f"Цвет заливки фигуры: {shape.fill_color}, пиксель внутри: {frame.pixels[100, 135]}")
+# Вывод: Цвет заливки фигуры: #FF0000FF, пиксель внутри: [255   0   0]
+assert shape.fill_color == "#FF0000FF" and tuple(frame.pixels[100, 135]) == (255, 0, 0)
+
+# Пример 14: Удаленный со сцены результат отписывается от операндов и больше не получает их изменений
+result.detach()
+print(f"Результат в подписчиках операндов: {result in a.observers or result in b.observers}")
+# Вывод: Результат в подписчиках операндов: False
+assert result not in a.observers and result not in b.observers
+
+# Пример 15: Преобразования из главного потока во время чтения результата потоком отрисовки
+a, b = Cross(100, 100, 100), Cross(150, 100, 100)
+result = SetOperationResult([a, b], "union", "#800080")
+first = result.current()
+done = threading.Event()
+def render_thread():
+    while not done.is_set():
+        result.bounds()
+reader = threading.Thread(target=render_thread)
+reader.start()
+for _ in range(200):
+    Transformations.translate(result, 1, 0)
+done.set()
+reader.join()
+moved = SetOperationResult([a, b], "union", "#800080")
+Transformations.translate(moved, 200, 0)
+print(f"Габариты: {result.bounds()}, как у сдвинутого сразу: {result.bounds() == moved.bounds()}, фигура та же: {result.current() is first}")
+# Вывод: Габариты: (248, 48, 403, 153), как у сдвинутого сразу: True, фигура та же: True
+assert result.bounds() == moved.bounds() and result.current() is first
@@ -0,0 +1,49 @@
+import numpy as np
+from Viewport import Viewport
+from Worker import RenderWorker
+from Render import FrameBuffer
+from GraphicObject import Cross, Flag
+
+# Пример 1: Масштаб колесом не сдвигает точку документа под курсором
+view = Viewport(400, 300, 20000, 20000)
+view.pan(-1000, -500)
+before = view.to_document(100, 50)
+view.zoom_at(0.8, 100, 50)
+print(f"Угол окна: ({view.x}, {view.y}), точка под курсором: {before} -> {view.to_document(100, 50)}")
+# Вывод: Угол окна: (975.0, 487.5), точка под курсором: (1100.0, 550.0) -> (1100.0, 550.0)
+assert view.to_document(100, 50) == before
+
+# Пример 2: Объекты вне окна не растеризуются, их области ждут, пока окно их не покроет
+scene = [Cross(100 + 900 * i, 100, 60, "#000000", "#00FF00FF") for i in range(20)] + [Flag(150, 250, 120, 60, "#000000", "#0000FF80")]
+worker = RenderWorker(400, 300, 20000, 20000)
+worker.submit("update", list(scene))
+worker.wait()
+print(f"Тайлов после отрисовки: {len(worker.buffer.tiles)}, отложено областей: {len(worker.buffer.deferred)}")
+# Вывод: Тайлов после отрисовки: 2, отложено областей: 19
+assert len(worker.buffer.tiles) == 2 and len(worker.buffer.deferred) == 19
+
+view = Viewport(400, 300, 20000, 20000)
+view.pan(-8000, 0) # Окно над десятым крестом (x = 8200)
+worker.submit("view", view.copy(), list(scene))
+worker.wait()
+(rect, pixels), = worker.take_results()[-1][1]
+reference = FrameBuffer(400, 300, origin=(8000, 0))
+reference.render(scene)
+print(f"Собран экран {rect}, совпадает с отрисовкой области: {np.array_equal(pixels, reference.pixels)}")
+# Вывод: Собран экран (0, 0, 400, 300), совпадает с отрисовкой области: True
+assert np.array_equal(pixels, reference.pixels)
+
+# Пример 3: Уменьшенный вид собирается из пирамиды уменьшенных копий документа
+view = Viewport(400, 300, 20000, 20000)
+view.zoom_at(0.5, 0, 0)
+worker.submit("view", view.copy(), list(scene))
+worker.wait()
+(rect, pixels), = worker.take_results()[-1][1]
+full = FrameBuffer(800, 600)
+full.render(scene)
+p = full.pixels.astype(np.uint16)
+halved = ((p[0::2, 0::2] + p[1::2, 0::2] + p[0::2, 1::2] + p[1::2, 1::2] + 2) >> 2).astype(np.uint8)
+print(f"Уровень пирамиды: {view.level()}, совпадает со средним по 2x2: {np.array_equal(pixels, halved)}")
+# Вывод: Уровень пирамиды: 1, совпадает со средним по 2x2: True
+assert np.array_equal(pixels, halved)
+worker.stop()
@@ -0,0 +1,59 @@
+import numpy as np
+from Worker import RenderWorker
+from Render import FrameBuffer
+from GraphicObject import Cross, Flag
+from Transformations import Transformations
+
+def reference(scene):
+    frame = FrameBuffer(300, 200)
+    frame.render(scene)
+    return frame.pixels
+
+def present(worker, front):
+    # То, что делает главный поток: перенос готовых областей в передний буфер
+    results = worker.take_results()
+    for version, tiles in results:
+        for (x0, y0, x1, y1), pixels in tiles:
+            front[y0:y1, x0:x1] = pixels
+    return results
+
+# Пример 1: Сцена рисуется в рабочем потоке, готовые области переносятся в передний буфер
+scene = [Cross(60 + 40 * i, 100, 50, "#000000", "#00FF00FF") for i in range(5)] + [Flag(100, 180, 120, 60, "#000000", "#0000FF80")]
+worker = RenderWorker(300, 200)
+front = np.full((200, 300, 3), 255, dtype=np.uint8)
+worker.submit("update", list(scene))
+worker.wait()
+present(worker, front)
+print(f"Передний буфер совпадает с полной отрисовкой: {np.array_equal(front, reference(scene))}")
+# Вывод: Передний буфер совпадает с полной отрисовкой: True
+assert np.array_equal(front, reference(scene))
+
+# Пример 2: Много быстрых изменений - итог совпадает с отрисовкой последней версии сцены
+for step in range(20):
+    Transformations.translate(scene[step % 5], 3, 2)
+    worker.submit("update", list(scene))
+worker.wait()
+results = present(worker, front)
+print(f"Последняя версия: {results[-1][0] == worker.version}, совпадает: {np.array_equal(front, reference(scene))}")
+# Вывод: Последняя версия: True, совпадает: True
+assert results[-1][0] == worker.version and np.array_equal(front, reference(scene))
+
+# Пример 3: Прерванная (устаревшая) перерисовка оставляет свои области поврежденными до следующего update
+frame = FrameBuffer(300, 200)
+frame.render(scene)
+Transformations.translate(scene[0], 0, 30)
+print(f"Прервано, перерисовано областей: {len(frame.update(scene, cancelled=lambda: True))}, ожидают: {len(frame.damaged)}")
+# Вывод: Прервано, перерисовано областей: 0, ожидают: 1
+frame.update(scene)
+assert np.array_equal(frame.pixels, reference(scene))
+
+# Пример 4: Кадры перетаскивания тоже выполняются в рабочем потоке
+worker.submit("begin_drag", list(scene), [scene[5]], 0)
+for _ in range(5):
+    Transformations.translate(scene[5], 10, -5)
+    worker.submit("drag_frame", 0)
+worker.submit("end_drag", list(scene))
+worker.wait()
+present(worker, front)
+assert worker.error is None and np.array_equal(front, reference(scene))
+worker.stop()
@@ -0,0 +1,108 @@
+import copy
+import math
+import numpy as np
+from Render import FrameBuffer
+
+
+# Окно просмотра документа: сдвиг (pan) и масштаб (zoom).
+# Экранный пиксель (sx, sy) показывает точку документа (x + sx / zoom, y + sy / zoom), где (x, y) - точка
+# документа в левом верхнем углу окна. Объекты растеризуются в документ в масштабе 1:1 и только в видимой
+# области (visible_rect), а экран собирается из пикселей документа (compose). При уменьшении пиксели берутся
+# из уровня пирамиды уменьшенных копий (TiledFrameBuffer.read с level > 0), а не растеризуются заново
+class Viewport:
+    def __init__(self, width, height, document_width, document_height, max_zoom=16):
+        self.width = width # Размер окна в пикселях экрана
+        self.height = height
+        self.document_width = document_width # Размер документа
+        self.document_height = document_height
+        self.x = 0.0 # Точка документа в левом верхнем углу окна
+        self.y = 0.0
+        self.zoom = 1.0 # Пикселей экрана на пиксель документа
+        # Наименьший масштаб - документ целиком помещается в окно
+        self.min_zoom = min(1.0, width / document_width, height / document_height)
+        self.max_zoom = max_zoom
+
+    def copy(self):
+        # Независимая копия состояния (передается потоку отрисовки)
+        return copy.copy(self)
+
+    def level(self):
+        # Уровень пирамиды для текущего масштаба: самый мелкий уровень, в котором пиксель
+        # не крупнее пикселя экрана (0 - сам документ)
+        if self.zoom >= 1:
+            return 0
+        return int(math.floor(math.log2(1 / self.zoom) + 1e-9))
+
+    def to_document(self, sx, sy):
+        # Точка документа под пикселем экрана (sx, sy)
+        return self.x + sx / self.zoom, self.y + sy / self.zoom
+
+    def to_screen(self, x, y):
+        # Положение точки документа на экране
+        return (x - self.x) * self.zoom, (y - self.y) * self.zoom
+
+    def screen_points(self, points):
+        # Вершины (список Point или массив (N, 2)) в координатах экрана - массив (N, 2)
+        return (FrameBuffer.as_xy(points) - (self.x, self.y)) * self.zoom
+
+    def visible_rect(self):
+        # Видимая часть документа (x0, y0, x1, y1), выровненная по пикселям текущего уровня пирамиды
+        step = 1 << self.level()
+        x1, y1 = self.to_document(self.width, self.height)
+        x0, y0 = math.floor(self.x / step) * step, math.floor(self.y / step) * step
+        x1, y1 = math.ceil(x1 / step) * step, math.ceil(y1 / step) * step
+        return max(x0, 0), max(y0, 0), min(x1, self.document_width), min(y1, self.document_height)
+
+    def screen_rect(self, rect):
+        # Прямоугольник экрана, на который влияют пиксели прямоугольника документа; None - он не виден
+        step = 1 << self.level() # Изменение пикселя документа меняет весь пиксель уровня пирамиды
+        x0, y0, x1, y1 = rect
+        x0, y0 = math.floor(x0 / step) * step, math.floor(y0 / step) * step
+        x1, y1 = math.ceil(x1 / step) * step, math.ceil(y1 / step) * step
+        sx0, sy0 = self.to_screen(x0, y0)
+        sx1, sy1 = self.to_screen(x1, y1)
+        sx0, sy0 = max(math.floor(sx0), 0), max(math.floor(sy0), 0)
+        sx1, sy1 = min(math.ceil(sx1), self.width), min(math.ceil(sy1), self.height)
+        return (sx0, sy0, sx1, sy1) if sx0 < sx1 and sy0 < sy1 else None
+
+    def document_rect(self, rect):
+        # Прямоугольник документа под прямоугольником экрана (с округлением наружу)
+        x0, y0 = self.to_document(rect[0], rect[1])
+        x1, y1 = self.to_document(rect[2], rect[3])
+        return math.floor(x0), math.floor(y0), math.ceil(x1), math.ceil(y1)
+
+    def pan(self, dx, dy):
+        # Сдвиг изображения на (dx, dy) пикселей экрана (вместе с курсором)
+        self.x -= dx / self.zoom
+        self.y -= dy / self.zoom
+        self.clamp()
+
+    def zoom_at(self, factor, sx, sy):
+        # Изменение масштаба в factor раз; точка документа под пикселем экрана (sx, sy) остается на месте
+        x, y = self.to_document(sx, sy)
+        self.zoom = min(max(self.zoom * factor, self.min_zoom), self.max_zoom)
+        if abs(self.zoom - round(self.zoom)) < 1e-9: # Целый масштаб без накопленной погрешности
+            self.zoom = float(round(self.zoom))
+        self.x, self.y = x - sx / self.zoom, y - sy / self.zoom
+        self.clamp()
+
+    def clamp(self):
+        # Окно не выходит за документ; при масштабе 1 и больше угол окна - целый пиксель документа
+        self.x = min(max(self.x, 0.0), max(self.document_width - self.width / self.zoom, 0.0))
+        self.y = min(max(self.y, 0.0), max(self.document_height - self.height / self.zoom, 0.0))
+        if self.zoom >= 1:
+            self.x, self.y = float(math.floor(self.x)), float(math.floor(self.y))
+
+    def compose(self, buffer, rect):
+        # Пиксели прямоугольника экрана rect из документа buffer (TiledFrameBuffer): каждому пикселю экрана
+        # соответствует ближайший пиксель уровня пирамиды; за пределами документа - белый фон
+        sx0, sy0, sx1, sy1 = rect
+        if self.zoom == 1: # Масштаб 1:1 - прямое чтение области документа
+            x, y = int(self.x), int(self.y)
+            return buffer.read((sx0 + x, sy0 + y, sx1 + x, sy1 + y))
+        level = self.level()
+        # Пиксель документа в центре каждого столбца и строки экрана, затем - пиксель уровня
+        xs = np.floor(self.x + (np.arange(sx0, sx1) + 0.5) / self.zoom).astype(np.int64) >> level
+        ys = np.floor(self.y + (np.arange(sy0, sy1) + 0.5) / self.zoom).astype(np.int64) >> level
+        region = buffer.read((int(xs[0]), int(ys[0]), int(xs[-1]) + 1, int(ys[-1]) + 1), level)
+        return region[np.ix_(ys - ys[0], xs - xs[0])]
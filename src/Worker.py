@@ -0,0 +1,131 @@
+import queue
+import threading
+from Render import TiledFrameBuffer
+from Viewport import Viewport
+
+
+# Отрисовка сцены в рабочем потоке с двойной буферизацией.
+# Поток владеет задним буфером (FrameBuffer, который отслеживает объекты сцены) и выполняет задания
+# редактора: инкрементальную перерисовку и кадры перетаскивания. Готовые области копируются из заднего
+# буфера и передаются через очередь; главный поток забирает их (take_results, вызывается через after)
+# и переносит в передний буфер, который показывается на экране, поэтому окно не ждет растеризации.
+# Каждое задание получает номер версии сцены: если пришло более новое задание, незавершенная
+# перерисовка прерывается, а ее области дорисовываются уже новым заданием.
+# Задний буфер покрывает весь документ и состоит из тайлов (TiledFrameBuffer), которые выделяются по мере
+# отрисовки. Растеризуется только видимая часть документа (окно просмотра viewport), а на экран передаются
+# области окна, собранные из документа или его уменьшенных копий в масштабе окна.
+# Задний буфер хранит и буфер номеров объектов: выбор кликом читает его, когда поток свободен (pick)
+class RenderWorker:
+    MERGEABLE = ("update", "drag_frame", "view") # Задания, из подряд идущих копий которых нужна только последняя
+
+    def __init__(self, width, height, document_width=None, document_height=None):
+        # width, height - размер окна просмотра; документ по умолчанию совпадает с ним
+        # Задний буфер: используется только рабочим потоком
+        self.buffer = TiledFrameBuffer(document_width or width, document_height or height, ids=True)
+        self.viewport = Viewport(width, height, self.buffer.width, self.buffer.height) # Копия окна просмотра
+        self.buffer.set_visible(self.viewport.visible_rect())
+        self.recompose = False # Окно просмотра изменилось: экран нужно собрать заново целиком
+        self.buffer.exposed = [] # Белый фон уже показан
+        self.version = 0 # Номер последнего поставленного задания (версия сцены)
+        self.jobs = [] # Ожидающие задания: (версия, имя метода, аргументы)
+        self.results = queue.Queue() # Готовые кадры: (версия, [(прямоугольник, пиксели), ...])
+        self.condition = threading.Condition()
+        self.running = False # Задание выполняется
+        self.stopped = False
+        self.error = None # Последнее исключение при отрисовке (буфер после него перерисовывается целиком)
+        self.thread = threading.Thread(target=self.run, name="RenderWorker", daemon=True)
+        self.thread.start()
+
+    def submit(self, job, *args):
+        # Постановка задания: имя метода FrameBuffer ("update", "begin_drag", "drag_frame", "end_drag")
+        # и его аргументы либо "view" (копия Viewport, объекты сцены) - смена окна просмотра.
+        # Вызывается из главного потока; возвращает версию сцены
+        with self.condition:
+            self.version += 1
+            if self.jobs and self.jobs[-1][1] == job and job in self.MERGEABLE:
+                self.jobs[-1] = (self.version, job, args) # Ожидающее задание того же вида заменяется новым
+            else:
+                self.jobs.append((self.version, job, args))
+            self.condition.notify_all()
+            return self.version
+
+    def damage(self, rects):
+        # Области, которые нужно перерисовать при следующем задании (например, стертые выделения)
+        with self.condition:
+            self.jobs.append((self.version, "invalidate_rects", (list(rects),)))
+            self.condition.notify_all()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.jobs and not self.stopped:
+                    self.condition.wait()
+                if self.stopped:
+                    return
+                version, job, args = self.jobs.pop(0)
+                self.running = True
+            try:
+                if job == "invalidate_rects":
+                    for rect in args[0]:
+                        self.buffer.invalidate(rect)
+                elif job == "update":
+                    self.buffer.update(*args, cancelled=lambda: self.version != version)
+                elif job == "view": # Новая видимая область: дорисовываются отложенные в ней повреждения
+                    self.viewport = args[0]
+                    self.buffer.set_visible(self.viewport.visible_rect())
+                    self.recompose = True
+                    self.buffer.update(args[1], cancelled=lambda: self.version != version)
+                else:
+                    getattr(self.buffer, job)(*args)
+            except Exception as error: # Ошибка не останавливает поток: следующий кадр перерисует все
+                self.error = error
+                self.buffer.invalidate()
+            self.results.put((version, self.compose()))
+            with self.condition:
+                self.running = False
+                self.condition.notify_all()
+
+    def compose(self):
+        # Готовые области экрана: [(прямоугольник окна, пиксели)]. Пиксели - новые массивы (задний буфер
+        # продолжит меняться, пока главный поток их переносит). Изменения вне видимой части не передаются
+        exposed = self.buffer.take_exposed()
+        viewport = self.viewport
+        if self.recompose:
+            self.recompose = False
+            rects = [(0, 0, viewport.width, viewport.height)]
+        else:
+            rects = [rect for rect in map(viewport.screen_rect, exposed) if rect is not None]
+        return [(rect, viewport.compose(self.buffer, rect)) for rect in rects]
+
+    def take_results(self):
+        # Все готовые кадры (в порядке выполнения); вызывается из главного потока
+        results = []
+        while True:
+            try:
+                results.append(self.results.get_nowait())
+            except queue.Empty:
+                return results
+
+    def pick(self, objects, x, y):
+        # Объект, видимый в точке (x, y) документа, по буферу номеров заднего буфера (см. FrameBuffer.pick).
+        # False - ответа нет: буфер еще не отрисовал последнюю версию сцены. Вызывается из главного потока;
+        # пока блокировка захвачена, поток отрисовки не начнет следующее задание
+        with self.condition:
+            if self.jobs or self.running:
+                return False
+            return self.buffer.pick(objects, x, y)
+
+    def busy(self):
+        # Есть ожидающие или выполняющиеся задания либо непринятые результаты
+        with self.condition:
+            return bool(self.jobs) or self.running or not self.results.empty()
+
+    def wait(self, timeout=None):
+        # Ожидание завершения всех заданий (для тестов и пакетной отрисовки)
+        with self.condition:
+            return self.condition.wait_for(lambda: not self.jobs and not self.running, timeout)
+
+    def stop(self):
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()